@@ -0,0 +1,80 @@
+"""Shared helpers for the benchmark and load-testing entry points."""
+
+import math
+import platform
+import subprocess
+import sys
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import polars as pl
+
+
+def percentile(sorted_samples: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted sample, `q` in [0, 100]."""
+    if not sorted_samples:
+        return math.nan
+    rank = max(1, math.ceil(q / 100 * len(sorted_samples)))
+    return sorted_samples[rank - 1]
+
+
+def summarize(samples: list[float]) -> dict[str, float | int]:
+    """Latency/duration summary in seconds."""
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered) if ordered else math.nan,
+        "min": ordered[0] if ordered else math.nan,
+        "p50": percentile(ordered, 50),
+        "p95": percentile(ordered, 95),
+        "p99": percentile(ordered, 99),
+        "max": ordered[-1] if ordered else math.nan,
+    }
+
+
+def measure[T](
+    func: Callable[..., T], repeat: int = 5
+) -> tuple[dict[str, float | int], T]:
+    """Run `func` `repeat` times and return the duration summary and the last result."""
+    samples = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples), result
+
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of the current process (None where unsupported, e.g. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # NOTE: kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _git(*args: str) -> str | None:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment() -> dict:
+    """Metadata identifying where and on which revision the numbers were taken."""
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "timestamp": datetime.now(UTC).isoformat(),
+        "git_commit": _git("rev-parse", "HEAD"),
+        "git_dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "polars": pl.__version__,
+        "polars_threads": pl.thread_pool_size(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
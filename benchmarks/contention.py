@@ -0,0 +1,191 @@
+"""
+Ingestion latency while report jobs scan the database.
+
+Inserts single readings at a fixed rate (open loop, latency measured from the
+scheduled arrival) during three phases of `--duration` seconds each:
+- idle: no report running
+- live: another process extracts reports from the live database back to back
+- replica: the same, reading a replica refreshed in the background every
+  `--replica-max-age` seconds (see db.replica)
+
+The reports run in a separate process, as with several server workers: within
+one process, the ADBC reader and the SQLAlchemy writer link different SQLite
+libraries whose file locks do not exclude each other, which would hide the
+contention.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.contention --db contention.db \
+        --populate 100000 --rate 200 --duration 10
+"""
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+import adbc_driver_sqlite.dbapi
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session
+
+from benchmarks.common import environment, summarize
+from benchmarks.generator import GridSpec, populate
+from core.models import MeasurementType
+from db import get_engine, reset_engine
+from db.config import settings
+from db.models import MeasurementDB
+
+
+def extract_reports(
+    uri: str,
+    replica_max_age_s: float | None,
+    spec: GridSpec,
+    stop,
+    completed,
+    failed,
+):
+    """Reader process: extract reports over the whole grid until stopped."""
+    # NOTE: late import, after the settings of the spawned process are set
+    settings.URI = uri
+    settings.REPLICA_MAX_AGE_S = replica_max_age_s
+    from core.services.report import ReportService
+
+    while not stop.is_set():
+        service = ReportService()
+        # NOTE: the ADBC reader has no busy timeout, a commit in progress fails
+        # it ("database is locked"); so does the first copy of the replica,
+        # after its busy timeout
+        try:
+            service._extract_data(spec.start, spec.end)
+            counter = completed
+        except (adbc_driver_sqlite.dbapi.DatabaseError, sqlite3.OperationalError):
+            counter = failed
+        service.engine.dispose()
+        with counter.get_lock():
+            counter.value += 1
+
+
+def ingest(rate: float, duration_s: float, num_components: int, sequence) -> dict:
+    """Insert readings at `rate` per second, return the latency summary."""
+    engine = get_engine()
+    epoch = datetime(2100, 1, 1, tzinfo=UTC)
+    types = list(MeasurementType)
+    samples, errors = [], 0
+    start = time.perf_counter()
+    for i in itertools.count():
+        scheduled = start + i / rate
+        if scheduled - start >= duration_s:
+            break
+        time.sleep(max(0.0, scheduled - time.perf_counter()))
+        n = next(sequence)
+        try:
+            with Session(engine) as session:
+                session.add(
+                    MeasurementDB(
+                        component_id=n % num_components + 1,
+                        timestamp=epoch + timedelta(microseconds=n),
+                        value=float(n % 1000),
+                        measurement_type=types[n % len(types)],
+                    )
+                )
+                session.commit()
+        except OperationalError:
+            # NOTE: e.g. "database is locked" after the busy timeout
+            errors += 1
+        samples.append(time.perf_counter() - scheduled)
+    return summarize(samples) | {"errors": errors}
+
+
+def run_phase(args, spec: GridSpec, sequence, replica_max_age_s=None, reports=True):
+    process = None
+    spawn = multiprocessing.get_context("spawn")
+    stop = spawn.Event()
+    completed, failed = spawn.Value("i", 0), spawn.Value("i", 0)
+    if reports:
+        process = spawn.Process(
+            target=extract_reports,
+            args=(settings.URI, replica_max_age_s, spec, stop, completed, failed),
+        )
+        process.start()
+        # NOTE: let the reader start its first scan
+        time.sleep(args.warmup)
+    try:
+        latency = ingest(args.rate, args.duration, spec.num_components, sequence)
+    finally:
+        stop.set()
+        if process:
+            process.join()
+    return {
+        "ingestion": latency,
+        "reports_completed": completed.value,
+        "reports_failed": failed.value,
+    }
+
+
+def print_table(result: dict):
+    header = f"{'phase':<10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'errors':>8}{'reports':>9}{'failed':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, phase in result["phases"].items():
+        row = phase["ingestion"]
+        print(
+            f"{name:<10}{row['p50'] * 1e3:>9.1f}{row['p95'] * 1e3:>9.1f}"
+            f"{row['p99'] * 1e3:>9.1f}{row['max'] * 1e3:>9.1f}"
+            f"{row['errors']:>8}{phase['reports_completed']:>9}"
+            f"{phase['reports_failed']:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default=None, help="SQLite file, temporary if omitted")
+    parser.add_argument("--components", type=int, default=100)
+    parser.add_argument(
+        "--populate",
+        type=int,
+        default=None,
+        help="Measurements per component to generate into --db before the run",
+    )
+    parser.add_argument("--rate", type=float, default=200.0, help="Inserts/s")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds/phase")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Seconds")
+    parser.add_argument("--replica-max-age", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="JSON file with the results")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(
+        tempfile.mkdtemp(prefix="zaphiro_bench_"), "contention.db"
+    )
+    settings.URI = f"sqlite:///{db_path}"
+    reset_engine()
+    spec = GridSpec(args.components, args.populate or 100_000, seed=args.seed)
+    if args.populate or not args.db:
+        populate(get_engine(), spec)
+
+    # NOTE: offset by the wall clock, never collides with previous runs
+    sequence = itertools.count(int(time.time()) * 1_000_000)
+    result = {
+        "environment": environment(),
+        "num_measurements": spec.num_measurements,
+        "rate": args.rate,
+        "duration_s": args.duration,
+        "phases": {
+            "idle": run_phase(args, spec, sequence, reports=False),
+            "live": run_phase(args, spec, sequence),
+            "replica": run_phase(args, spec, sequence, args.replica_max_age),
+        },
+    }
+    get_engine().dispose()
+    print_table(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
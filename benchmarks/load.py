@@ -0,0 +1,299 @@
+"""
+HTTP load generator for the API.
+
+Drives either the real `main.app` in-process (httpx ASGI transport, the app
+lifespan included) or a running server (`--url`), with a weighted mix of
+operations, in one of two modes:
+- closed loop: `--concurrency N` workers issue requests back to back
+- open loop: `--rate R` requests per second at fixed arrival times; latency is
+  measured from the scheduled arrival so that a saturated server is not hidden
+  by coordinated omission
+
+Reports throughput, p50/p95/p99/max latency and error rate per operation;
+the failures (error statuses, server errors and client exceptions) are
+counted per operation, they do not stop the run.
+
+NOTE: in-process, the ASGI transport only returns once the background tasks
+of a response are done, so `create_report` latency includes the report job;
+target a running server with `--url` to measure it as clients see it.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.load --concurrency 32 --duration 30 \
+        --mix list_components=10,add_measurement=5,get_report=3,create_report=1,token=1
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from datetime import UTC, datetime, timedelta
+
+import httpx
+from httpx import ASGITransport, AsyncClient
+
+from benchmarks.common import environment, summarize
+from benchmarks.generator import GridSpec, populate
+from core.models import MeasurementType
+from db import get_engine, reset_engine
+from db.config import settings
+from main import app
+
+DEFAULT_MIX = (
+    "token=1,list_components=10,add_measurement=5,create_report=1,get_report=3"
+)
+
+
+class LoadContext:
+    """Shared state of a load run: client, credentials and ids seen so far."""
+
+    def __init__(self, client: AsyncClient, num_components: int, seed: int):
+        self.client = client
+        self.num_components = num_components
+        self.random = random.Random(seed)
+        self.headers: dict[str, str] = {}
+        self.report_ids: list[int] = []
+        # NOTE: far-future timestamps, one microsecond apart and offset by the
+        # wall clock, never collide with existing rows (or previous runs) on
+        # the (timestamp, component, type) constraint
+        self._sequence = itertools.count()
+        self._epoch = datetime(2100, 1, 1, tzinfo=UTC) + timedelta(
+            seconds=int(time.time())
+        )
+
+    async def login(self, username: str = "manager", scope: str = "manager"):
+        response = await self.client.post(
+            "/auth/token",
+            data={"username": username, "password": username, "scope": scope},
+        )
+        response.raise_for_status()
+        return response
+
+    async def authenticate(self):
+        response = await self.login()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def op_token(ctx: LoadContext) -> httpx.Response:
+    return await ctx.login("user", "user")
+
+
+async def op_list_components(ctx: LoadContext) -> httpx.Response:
+    offset = ctx.random.randrange(max(1, ctx.num_components - 100) + 1)
+    return await ctx.client.get(
+        f"/components?limit=100&offset={offset}", headers=ctx.headers
+    )
+
+
+async def op_add_measurement(ctx: LoadContext) -> httpx.Response:
+    timestamp = ctx._epoch + timedelta(microseconds=next(ctx._sequence))
+    payload = {
+        "component_id": ctx.random.randint(1, ctx.num_components),
+        "timestamp": timestamp.isoformat(),
+        "value": round(ctx.random.uniform(0, 1000), 3),
+        "measurement_type": ctx.random.choice(list(MeasurementType)).value,
+    }
+    return await ctx.client.post("/measurements", json=payload, headers=ctx.headers)
+
+
+async def op_create_report(ctx: LoadContext) -> httpx.Response:
+    payload = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-02T00:00:00Z"}
+    response = await ctx.client.post("/reports", json=payload, headers=ctx.headers)
+    if response.is_success:
+        ctx.report_ids.append(response.json()["id"])
+    return response
+
+
+async def op_get_report(ctx: LoadContext) -> httpx.Response:
+    if not ctx.report_ids:
+        return await ctx.client.get("/reports", headers=ctx.headers)
+    report_id = ctx.random.choice(ctx.report_ids)
+    return await ctx.client.get(f"/reports/{report_id}", headers=ctx.headers)
+
+
+OPERATIONS: dict[str, Callable[[LoadContext], Awaitable[httpx.Response]]] = {
+    "token": op_token,
+    "list_components": op_list_components,
+    "add_measurement": op_add_measurement,
+    "create_report": op_create_report,
+    "get_report": op_get_report,
+}
+
+# Expected non-2xx answers that are not errors, e.g. polling a pending report
+EXPECTED_STATUS = {"get_report": {409}}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(
+                f"Unknown operation [{name}], available: {list(OPERATIONS)}"
+            )
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.status_codes: dict[str, Counter] = defaultdict(Counter)
+        self.errors: Counter = Counter()
+
+    async def run(self, ctx: LoadContext, name: str, scheduled: float | None = None):
+        start = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = await OPERATIONS[name](ctx)
+        # NOTE: any failure is counted, the load goes on (e.g. a timeout, or
+        # an error of the operation itself such as a failed authentication)
+        except Exception as e:
+            self.status_codes[name][type(e).__name__] += 1
+            self.errors[name] += 1
+            return
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+        self.status_codes[name][str(response.status_code)] += 1
+        if not response.is_success and response.status_code not in EXPECTED_STATUS.get(
+            name, ()
+        ):
+            self.errors[name] += 1
+
+    def summary(self, duration: float) -> dict:
+        results: dict[str, dict] = {}
+        for name, samples in sorted(self.latencies.items()):
+            results[name] = summarize(samples) | {
+                "throughput_rps": len(samples) / duration,
+                "error_rate": self.errors[name] / len(samples),
+                "status_codes": dict(self.status_codes[name]),
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        results["ALL"] = summarize(
+            [s for samples in self.latencies.values() for s in samples]
+        ) | {
+            "throughput_rps": total / duration,
+            "error_rate": sum(self.errors.values()) / total if total else 0.0,
+        }
+        return results
+
+
+async def closed_loop(ctx, recorder, weights, concurrency: int, duration: float):
+    deadline = time.perf_counter() + duration
+    names, cum_weights = list(weights), list(itertools.accumulate(weights.values()))
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = ctx.random.choices(names, cum_weights=cum_weights)[0]
+            await recorder.run(ctx, name)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def open_loop(ctx, recorder, weights, rate: float, duration: float):
+    names, cum_weights = list(weights), list(itertools.accumulate(weights.values()))
+    start = time.perf_counter()
+    tasks = set()
+    for i in range(int(rate * duration)):
+        scheduled = start + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = ctx.random.choices(names, cum_weights=cum_weights)[0]
+        task = asyncio.create_task(recorder.run(ctx, name, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    await asyncio.gather(*tasks)
+
+
+async def run_load(args) -> dict:
+    weights = parse_mix(args.mix)
+    recorder = Recorder()
+
+    async def drive(client: AsyncClient):
+        ctx = LoadContext(client, args.components, args.seed)
+        await ctx.authenticate()
+        start = time.perf_counter()
+        if args.rate:
+            await open_loop(ctx, recorder, weights, args.rate, args.duration)
+        else:
+            await closed_loop(ctx, recorder, weights, args.concurrency, args.duration)
+        return time.perf_counter() - start
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as c:
+            elapsed = await drive(c)
+    else:
+        # NOTE: the ASGI transport does not run the lifespan, enter it explicitly;
+        # the exceptions of the app are answered with a 500, as a server would
+        async with app.router.lifespan_context(app):
+            transport = ASGITransport(app=app, raise_app_exceptions=False)
+            async with AsyncClient(
+                transport=transport, base_url="http://load", timeout=timeout
+            ) as c:
+                elapsed = await drive(c)
+
+    return {
+        "environment": environment(),
+        "target": args.url or "in-process",
+        "mode": {"rate": args.rate} if args.rate else {"concurrency": args.concurrency},
+        "duration_s": elapsed,
+        "mix": weights,
+        "endpoints": recorder.summary(elapsed),
+    }
+
+
+def print_table(result: dict):
+    header = f"{'operation':<18}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'err %':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, row in result["endpoints"].items():
+        print(
+            f"{name:<18}{row['throughput_rps']:>9.1f}{row['p50'] * 1e3:>9.1f}"
+            f"{row['p95'] * 1e3:>9.1f}{row['p99'] * 1e3:>9.1f}{row['max'] * 1e3:>9.1f}"
+            f"{row['error_rate'] * 100:>8.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--concurrency", type=int, default=16, help="Closed loop workers")
+    mode.add_argument("--rate", type=float, default=None, help="Open loop requests/s")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted operations")
+    parser.add_argument("--url", default=None, help="Base URL, in-process if omitted")
+    parser.add_argument("--db", default=None, help="SQLite file for the in-process app")
+    parser.add_argument(
+        "--components", type=int, default=100, help="Component ids to target"
+    )
+    parser.add_argument(
+        "--populate",
+        type=int,
+        default=None,
+        help="Measurements per component to generate into --db before the run",
+    )
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="JSON file with the results")
+    args = parser.parse_args()
+
+    if args.db:
+        settings.URI = f"sqlite:///{args.db}"
+        reset_engine()
+    if args.populate:
+        populate(get_engine(), GridSpec(args.components, args.populate, seed=args.seed))
+
+    result = asyncio.run(run_load(args))
+    print_table(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Performance benchmark suite.
+
+Generates a synthetic grid at several sizes and measures, for each size:
+- bulk ingestion throughput
+- every stage of `ReportService` (extract/transform/load) over a day and the full range
+- latency of the list and read endpoints
+- peak RSS
+and, once, the rows/s of the component list serialization (ORM vs fast path).
+
+Each size runs in a fresh interpreter so that peak RSS is not inherited from
+a previous size. Results are written as JSON to diff between commits.
+
+Usage (from the repository root):
+    PYTHONPATH=src python -m benchmarks.run --sizes 1000 10000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from httpx import ASGITransport, AsyncClient
+from pydantic import TypeAdapter
+from sqlmodel import Session, SQLModel, create_engine, insert, select
+from sqlmodel.pool import StaticPool
+
+from api.routes.components import _LIST_COLUMNS, encode_components
+from api.schemas.component import ComponentResponse
+from benchmarks.common import environment, measure, peak_rss_bytes, summarize
+from benchmarks.generator import GridSpec, generate_components, populate
+from core.services.report import ReportService
+from db import get_engine, reset_engine
+from db.config import settings
+from db.models import ComponentDB, ReportDB
+from main import app
+
+
+def bench_report(spec: GridSpec, repeat: int) -> dict:
+    service = ReportService()
+    with Session(service.engine) as session:
+        db_report = ReportDB(start_date=spec.start, end_date=spec.end)
+        session.add(db_report)
+        session.commit()
+        report_id = db_report.id
+    assert report_id is not None
+
+    results = {}
+    windows = {
+        "1d": (spec.start, spec.start + timedelta(days=1)),
+        "full": (spec.start, spec.end),
+    }
+    for window, (start, end) in windows.items():
+        # NOTE: the loop variables bound as defaults (ruff B023)
+        extract, df = measure(
+            lambda start=start, end=end: service._extract_data(start, end), repeat
+        )
+        # NOTE: the path of the report jobs, see ReportService.run_report_task
+        transform, kpis = measure(
+            lambda df=df: service._collect_kpis(df.lazy()), repeat
+        )
+        load, _ = measure(
+            lambda kpis=kpis: service._update_db_status(
+                report_id, "completed", service._to_report_json(kpis)
+            ),
+            repeat,
+        )
+        results[window] = {
+            "rows": df.height,
+            "extract": extract,
+            "transform": transform,
+            "load": load,
+            "rows_per_s": df.height / extract["p50"] if extract["p50"] else None,
+        }
+    service.engine.dispose()
+    return results | {"report_id": report_id}
+
+
+async def bench_endpoints(report_id: int, repeat: int) -> dict:
+    endpoints = {
+        "GET /components?limit=100": "/components?limit=100",
+        "GET /components?limit=1000": "/components?limit=1000",
+        "GET /components?name_search": "/components?name_search=TR_00001",
+        "GET /reports": "/reports",
+        "GET /reports/{id}": f"/reports/{report_id}",
+    }
+    results = {}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://bench"
+    ) as client:
+        response = await client.post(
+            "/auth/token",
+            data={"username": "manager", "password": "manager", "scope": "manager"},
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        for name, url in endpoints.items():
+            samples = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                samples.append(time.perf_counter() - start)
+                response.raise_for_status()
+            results[name] = summarize(samples) | {"bytes": len(response.content)}
+    return results
+
+
+def bench_list_serialization(num_components: int, page: int, repeat: int) -> dict:
+    """Rows/s of a list page: ORM instances + response validation vs column tuples."""
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    components = generate_components(GridSpec(num_components=num_components))
+    with Session(engine) as session:
+        session.execute(insert(ComponentDB), components.to_dicts())
+        session.commit()
+
+        adapter = TypeAdapter(list[ComponentResponse])
+
+        def orm_path():
+            rows = session.exec(select(ComponentDB).limit(page)).all()
+            return adapter.dump_json(
+                adapter.validate_python(rows, from_attributes=True)
+            )
+
+        def fast_path():
+            return encode_components(session.exec(select(*_LIST_COLUMNS).limit(page)))
+
+        results = {}
+        for name, func in {"orm": orm_path, "fast": fast_path}.items():
+            timings, payload = measure(func, repeat)
+            results[name] = timings | {
+                "rows_per_s": page / timings["p50"],
+                "bytes": len(payload),
+            }
+    engine.dispose()
+    return results | {
+        "speedup": results["fast"]["rows_per_s"] / results["orm"]["rows_per_s"]
+    }
+
+
+def run_single(spec: GridSpec, workdir: str, repeat: int, keep: bool) -> dict:
+    """Benchmark one data size inside the current process."""
+    db_path = os.path.join(workdir, f"bench_{spec.num_measurements}.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    settings.URI = f"sqlite:///{db_path}"
+    reset_engine()
+
+    start = time.perf_counter()
+    written = populate(get_engine(), spec)
+    elapsed = time.perf_counter() - start
+    ingestion = {
+        "rows": written,
+        "seconds": elapsed,
+        "rows_per_s": written / elapsed,
+        "db_bytes": os.path.getsize(db_path),
+    }
+
+    report = bench_report(spec, repeat)
+    endpoints = asyncio.run(bench_endpoints(report.pop("report_id"), repeat * 4))
+
+    get_engine().dispose()
+    if not keep:
+        os.remove(db_path)
+    return {
+        "num_components": spec.num_components,
+        "measurements_per_component": spec.measurements_per_component,
+        "num_measurements": spec.num_measurements,
+        "ingestion": ingestion,
+        "report": report,
+        "endpoints": endpoints,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--components", type=int, default=100)
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Measurements per component, one benchmark run per size",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", default=None)
+    parser.add_argument("--output", default=None, help="JSON file (stdout if omitted)")
+    parser.add_argument("--keep", action="store_true", help="Keep the databases")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    workdir = args.workdir or tempfile.mkdtemp(prefix="zaphiro_bench_")
+
+    if args.single:
+        spec = GridSpec(args.components, args.sizes[0], seed=args.seed)
+        result = run_single(spec, workdir, args.repeat, args.keep)
+        with open(args.output, "w") as f:
+            json.dump(result, f)
+        return
+
+    runs = []
+    for size in args.sizes:
+        result_path = os.path.join(workdir, f"result_{size}.json")
+        # fmt: off
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.run", "--single",
+                "--components", str(args.components), "--sizes", str(size),
+                "--repeat", str(args.repeat), "--seed", str(args.seed),
+                "--workdir", workdir, "--output", result_path,
+            ] + (["--keep"] if args.keep else []),
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        # fmt: on
+        with open(result_path) as f:
+            runs.append(json.load(f))
+        os.remove(result_path)
+
+    serialization = bench_list_serialization(10_000, 1000, args.repeat * 4)
+    output = json.dumps(
+        {
+            "environment": environment(),
+            "seed": args.seed,
+            "runs": runs,
+            "list_serialization": serialization,
+        },
+        indent=2,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+On-demand request profiler.
+
+A manager adds the `X-Profile: 1` header to a request to run it under the
+sampling profiler of `core.profiling`; a fraction of all the requests can
+also be profiled (`PROFILESAMPLE_RATE`). Both are bounded together by
+`PROFILEMAX_PER_MINUTE`, so the profiler is safe to leave enabled.
+
+The response of a profiled request carries its `X-Profile-Id` (the
+`X-Request-ID` of the request, if any), to fetch the collapsed stacks from
+`GET /profiles/{id}`. The sync endpoints of the routers using
+`ProfiledRoute` are sampled in their worker thread too.
+"""
+
+import inspect
+import random
+import time
+import uuid
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth import Scopes
+from auth.utils import get_token_scopes
+from core.config import settings
+from core.profiling import (
+    ProfileStore,
+    RateLimiter,
+    RequestProfile,
+    StackSampler,
+    sampled_thread,
+)
+from core.utils import PROFILE, get_logger
+
+logger = get_logger("profiler", PROFILE)
+
+profile_store = ProfileStore(settings.STORED)
+profile_limiter = RateLimiter(settings.MAX_PER_MINUTE)
+
+
+def _requested_by_manager(headers: Headers) -> bool:
+    if headers.get("x-profile") != "1":
+        return False
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and Scopes.MANAGER.value in get_token_scopes(
+        token
+    )
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose sync endpoint registers its worker thread to the sampler."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = sampled_thread(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        wanted = _requested_by_manager(headers) or (
+            random.random() < settings.SAMPLE_RATE
+        )
+        if not wanted or not profile_limiter.acquire():
+            await self.app(scope, receive, send)
+            return
+
+        request_id = headers.get("x-request-id") or uuid.uuid4().hex
+
+        async def send_with_id(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)["X-Profile-Id"] = request_id
+            await send(message)
+
+        start = time.perf_counter()
+        sampler = StackSampler(settings.INTERVAL_MS / 1000)
+        try:
+            with sampler:
+                await self.app(scope, receive, send_with_id)
+        finally:
+            duration_s = time.perf_counter() - start
+            profile_store.add(
+                RequestProfile(
+                    request_id=request_id,
+                    method=scope["method"],
+                    path=scope["path"],
+                    duration_s=duration_s,
+                    samples=sampler.samples,
+                    collapsed=sampler.collapsed(),
+                )
+            )
+            logger.log(
+                PROFILE,
+                f"Profiled {scope['method']} {scope['path']} [{request_id}] "
+                f"in {duration_s:.3f}s ({sampler.samples} samples)",
+            )
@@ -1,8 +1,8 @@
 from fastapi import APIRouter
 
-from . import components, measurements, reports
+from . import components, measurements, profiles, reports
 import auth.routes
-from api.dependencies import UserDep
+from api.dependencies import ManagerDep, UserDep
 
 router = APIRouter()
 router.include_router(auth.routes.router)
@@ -10,3 +10,4 @@ router.include_router(auth.routes.router)
 router.include_router(components.router, dependencies=[UserDep])
 router.include_router(measurements.router, dependencies=[UserDep])
 router.include_router(reports.router, dependencies=[UserDep])
+router.include_router(profiles.router, dependencies=[ManagerDep])
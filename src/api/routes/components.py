@@ -1,13 +1,80 @@
-from fastapi import APIRouter, HTTPException, status, Query
-from api.schemas.component import ComponentResponse, ComponentCreate, ComponentUpdate
+import csv
+import io
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+from operator import itemgetter
+from typing import Annotated
+from fastapi import APIRouter, Body, HTTPException, Response, UploadFile, status, Query
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from pydantic_core import to_json
+from api.schemas.component import (
+    COMPONENT_RESPONSE_FIELDS,
+    ComponentDeleteResponse,
+    ComponentImportResponse,
+    ComponentImportResult,
+    ComponentResponse,
+    ComponentCreate,
+    ComponentUpdate,
+)
+from api.schemas.measurement import (
+    LatestMeasurementsResponse,
+    MeasurementSeriesResponse,
+)
 from db.models import ComponentDB
 from sqlalchemy.exc import IntegrityError
 from api.dependencies import SessionDep
-from core.models import ComponentType
+from api.middleware import ProfiledRoute
+from core.models import (
+    ComponentType,
+    ConflictPolicy,
+    DownsamplingMode,
+    ImportOutcome,
+    MeasurementType,
+)
+from core.services.component import ComponentService
+from core.services.latest import last_values
+from core.services.timeseries import TimeSeriesService
 from sqlmodel import select, col
 from api.dependencies import ManagerDep
 
-router = APIRouter(prefix="/components", tags=["components"])
+router = APIRouter(prefix="/components", tags=["components"], route_class=ProfiledRoute)
+
+# Column projection of the list endpoint, and per-type getters of the response fields
+_LIST_FIELDS = (
+    "id",
+    "name",
+    "substation",
+    "component_type",
+    "capacity_mva",
+    "length_km",
+    "voltage_kv",
+    "status",
+)
+_LIST_COLUMNS = tuple(col(getattr(ComponentDB, field)) for field in _LIST_FIELDS)
+_COLUMN_INDEX = {field: i for i, field in enumerate(_LIST_FIELDS)}
+_FIELD_GETTERS = {
+    component_type: (fields, itemgetter(*(_COLUMN_INDEX[f] for f in fields)))
+    for component_type, fields in COMPONENT_RESPONSE_FIELDS.items()
+}
+
+# Upper bound of the components of a single bulk import
+MAX_IMPORT_COMPONENTS = 10_000
+_IMPORT_ADAPTER = TypeAdapter(list[ComponentCreate])
+
+
+def encode_components(rows: Iterable[Sequence]) -> bytes:
+    """
+    Serialize `_LIST_COLUMNS` tuples to the JSON of `list[ComponentResponse]`.
+    Rows are read from the database (already constrained), so the payloads are
+    assembled directly instead of validating one Pydantic model per row.
+    """
+    payloads = []
+    for row in rows:
+        fields, getter = _FIELD_GETTERS[row[3]]
+        payloads.append(dict(zip(fields, getter(row))))
+    return to_json(payloads)
 
 
 @router.post(
@@ -43,6 +110,104 @@ def create_component(
     return db_component
 
 
+def _import_components(
+    db: SessionDep, components: list[ComponentCreate], on_conflict: ConflictPolicy
+) -> ComponentImportResponse:
+    """Shared by the JSON and CSV bulk imports, once the batch is validated."""
+    keys = Counter((c.name, c.substation) for c in components)
+    duplicates = [
+        f"{name}@{substation}" for (name, substation), n in keys.items() if n > 1
+    ]
+    if duplicates:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Duplicated (name, substation) in the import: {duplicates[:10]}",
+        )
+
+    outcomes = ComponentService(db).import_components(
+        [c.model_dump() for c in components], on_conflict
+    )
+    counts = Counter(outcome for _, outcome in outcomes)
+    return ComponentImportResponse(
+        on_conflict=on_conflict,
+        created=counts[ImportOutcome.CREATED],
+        updated=counts[ImportOutcome.UPDATED],
+        skipped=counts[ImportOutcome.SKIPPED],
+        results=[
+            ComponentImportResult(
+                row=i, id=id, name=c.name, substation=c.substation, outcome=outcome
+            )
+            for i, (c, (id, outcome)) in enumerate(zip(components, outcomes))
+        ],
+    )
+
+
+@router.post("/bulk", response_model=ComponentImportResponse, dependencies=[ManagerDep])
+def import_components(
+    components: Annotated[
+        list[ComponentCreate], Body(min_length=1, max_length=MAX_IMPORT_COMPONENTS)
+    ],
+    db: SessionDep,
+    on_conflict: ConflictPolicy = Query(
+        ConflictPolicy.SKIP, description="Policy for existing (name, substation)"
+    ),
+) -> ComponentImportResponse:
+    """
+    Create many components at once, in a single transaction.
+    The whole batch is validated first: one invalid component rejects all.
+
+    Accessible by: manager role only.
+    """
+    return _import_components(db, components, on_conflict)
+
+
+@router.post(
+    "/bulk/csv", response_model=ComponentImportResponse, dependencies=[ManagerDep]
+)
+def import_components_csv(
+    file: UploadFile,
+    db: SessionDep,
+    on_conflict: ConflictPolicy = Query(
+        ConflictPolicy.SKIP, description="Policy for existing (name, substation)"
+    ),
+) -> ComponentImportResponse:
+    """
+    Same as the JSON bulk import, from a CSV file with a header row
+    (name, substation, component_type and the type-specific columns).
+    Empty cells are treated as missing values.
+
+    Accessible by: manager role only.
+    """
+    try:
+        text = io.TextIOWrapper(file.file, encoding="utf-8-sig")
+        rows = [
+            {key: value for key, value in row.items() if key and value}
+            for row in csv.DictReader(text)
+        ]
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Invalid CSV file: {e}",
+        )
+    if not 0 < len(rows) <= MAX_IMPORT_COMPONENTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Expected between 1 and {MAX_IMPORT_COMPONENTS} rows, got {len(rows)}",
+        )
+
+    try:
+        components = _IMPORT_ADAPTER.validate_python(rows)
+    except ValidationError as e:
+        # NOTE: locations are (row, type, field), as for the JSON body
+        raise RequestValidationError(
+            [
+                {**error, "loc": ("file", *error["loc"])}
+                for error in e.errors(include_url=False, include_context=False)
+            ]
+        )
+    return _import_components(db, components, on_conflict)
+
+
 @router.put("/{id}", response_model=ComponentResponse, dependencies=[ManagerDep])
 def update_component(
     id: int,
@@ -112,15 +277,41 @@ def delete_component(
         )
 
     # 3. Perform the deletion
-    # Because of cascade_delete=True in the model,
-    # SQLAlchemy/SQLModel will handle the measurements table cleanup.
-    db.delete(db_component)
-    db.commit()
+    # NOTE: set-based deletes in chunks, the measurements are never loaded
+    db.expunge(db_component)
+    ComponentService(db).delete([id])
 
     # 4. Return No Content
     return None
 
 
+@router.delete("", response_model=ComponentDeleteResponse, dependencies=[ManagerDep])
+def delete_components(
+    db: SessionDep,
+    substation: str | None = Query(None, description="Filter by substation"),
+    component_type: ComponentType | None = Query(None, description="Filter by type"),
+) -> ComponentDeleteResponse:
+    """
+    Delete all the components matching the filters, with their measurements.
+    At least one filter is required.
+
+    Accessible by: manager role only.
+    """
+    if not substation and not component_type:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="At least one filter (substation, component_type) is required.",
+        )
+
+    service = ComponentService(db)
+    components, measurements = service.delete(
+        service.find_ids(substation, component_type)
+    )
+    return ComponentDeleteResponse(
+        deleted_components=components, deleted_measurements=measurements
+    )
+
+
 @router.get("", response_model=list[ComponentResponse])
 def list_components(
     db: SessionDep,
@@ -129,12 +320,14 @@ def list_components(
     component_type: ComponentType | None = Query(None, description="Filter by type"),
     limit: int | None = Query(100, ge=1, le=1000, description="Set to null for all"),
     offset: int = Query(0, ge=0),
-) -> list[ComponentDB]:
+) -> Response:
     """
     Retrieve components with search, filtering, and pagination.
     If limit is omitted, returns default batch.
     """
-    statement = select(ComponentDB)
+    # NOTE: plain column tuples (no ORM instances) encoded straight to JSON,
+    # the response_model above only documents the payload
+    statement = select(*_LIST_COLUMNS)
 
     if name_search:
         statement = statement.where(col(ComponentDB.name).contains(name_search))
@@ -148,4 +341,72 @@ def list_components(
     if limit is not None:
         statement = statement.offset(offset).limit(limit)
 
-    return list(db.exec(statement).all())
+    return Response(
+        content=encode_components(db.exec(statement)), media_type="application/json"
+    )
+
+
+@router.get("/latest", response_model=list[LatestMeasurementsResponse])
+def get_latest_measurements(
+    component_id: list[int] | None = Query(None, description="All if omitted"),
+) -> Response:
+    """
+    Last known reading of every measurement type of the components, served
+    from memory (see core.services.latest) whatever the history size.
+    Components without any reading are omitted.
+    """
+    payloads = [
+        {
+            "component_id": component,
+            "measurements": {
+                measurement_type: {"timestamp": timestamp, "value": value}
+                for measurement_type, (timestamp, value) in values.items()
+            },
+        }
+        for component, values in sorted(last_values.get(component_id).items())
+    ]
+    return Response(content=to_json(payloads), media_type="application/json")
+
+
+@router.get("/{id}/measurements", response_model=MeasurementSeriesResponse)
+def get_component_measurements(
+    id: int,
+    db: SessionDep,
+    measurement_type: MeasurementType,
+    start: datetime = Query(..., description="Start of the time range (inclusive)"),
+    end: datetime = Query(..., description="End of the time range (inclusive)"),
+    points: int = Query(1000, ge=3, le=10000, description="Target number of points"),
+    mode: DownsamplingMode = Query(DownsamplingMode.BUCKETS),
+) -> dict:
+    """
+    Downsampled time series of a component for charting.
+
+    The response size is bounded by `points`, whatever the raw row count:
+    `buckets` returns min/avg/max per fixed-width bucket, `lttb` returns
+    representative raw points (Largest-Triangle-Three-Buckets). The ranges
+    compacted into rollups come at the resolution of the rollups.
+    """
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="The end of the time range must be after its start.",
+        )
+    if not db.get(ComponentDB, id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=f"Component {id} not found"
+        )
+
+    service = TimeSeriesService(db.get_bind().engine)
+    raw_count, series = service.downsample(
+        id, measurement_type, start, end, points, mode
+    )
+    key = "points" if mode == DownsamplingMode.LTTB else "buckets"
+    return {
+        "component_id": id,
+        "measurement_type": measurement_type,
+        "start": start,
+        "end": end,
+        "mode": mode,
+        "raw_count": raw_count,
+        key: series.to_dicts(),
+    }
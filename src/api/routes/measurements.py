@@ -1,11 +1,23 @@
-from fastapi import APIRouter, HTTPException, status
+from datetime import datetime
+import polars as pl
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from api.schemas.measurement import MeasurementCreate, MeasurementResponse
+from core.models import MeasurementType
+from core.services.export import ExportFormat, MeasurementExportService
+from core.services.latest import last_values
+from db.chunks import ChunkStore, DuplicateMeasurementError
+from db.config import MeasurementStorage, settings
 from db.models import MeasurementDB, ComponentDB
+from db.shards import measurement_session
 from api.dependencies import SessionDep
 from sqlalchemy.exc import IntegrityError
 from api.dependencies import ManagerDep
+from api.middleware import ProfiledRoute
 
-router = APIRouter(prefix="/measurements", tags=["measurements"])
+router = APIRouter(
+    prefix="/measurements", tags=["measurements"], route_class=ProfiledRoute
+)
 
 
 @router.post(
@@ -31,18 +43,87 @@ def add_measurement(
             detail=f"Component with ID {measurement_data.component_id} not found.",
         )
 
-    # 2. Map Pydantic model to SQLModel
-    db_measurement = MeasurementDB(**measurement_data.model_dump())
+    # NOTE: the measurements may live in a shard of their own, see db.shards
+    with measurement_session(measurement_data.component_id, db) as shard_db:
+        if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+            try:
+                ChunkStore().append(
+                    shard_db, pl.DataFrame([measurement_data.model_dump()])
+                )
+            except DuplicateMeasurementError as e:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+            last_values.update(**measurement_data.model_dump())
+            return MeasurementResponse(id=None, **measurement_data.model_dump())
+
+        # 2. Map Pydantic model to SQLModel
+        db_measurement = MeasurementDB(**measurement_data.model_dump())
 
-    # 3. Persist to Database
-    try:
-        db.add(db_measurement)
-        db.commit()
+        # 3. Persist to Database
+        try:
+            shard_db.add(db_measurement)
+            shard_db.commit()
+            shard_db.refresh(db_measurement)
+        except IntegrityError:
+            shard_db.rollback()
+            # NOTE: we could return HTTP_200_OK to be "silent" about sensor duplicates
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Measurement already exists for this timestamp and type.",
+            )
+        last_values.update(**measurement_data.model_dump())
         return db_measurement
-    except IntegrityError:
-        db.rollback()
-        # NOTE: we could return HTTP_200_OK to be "silent" about sensor duplicates
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {
+                ExportFormat.NDJSON.media_type: {},
+                ExportFormat.ARROW.media_type: {},
+            },
+            "description": "Raw measurements, streamed as they are read.",
+        }
+    },
+)
+def export_measurements(
+    db: SessionDep,
+    start: datetime,
+    end: datetime,
+    component_id: list[int] = Query(..., min_length=1, max_length=1000),
+    measurement_type: list[MeasurementType] | None = Query(None),
+    format: ExportFormat = Query(ExportFormat.NDJSON),
+) -> StreamingResponse:
+    """
+    Export the raw measurements of a set of components over a period.
+
+    The rows are streamed page by page, as NDJSON lines or as an Arrow IPC
+    stream, sorted by component, type and time. Ranges holding readings
+    compacted into rollups (older than the retention) are refused.
+    """
+    if end <= start:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="The end of the time range must be after its start.",
+        )
+
+    service = MeasurementExportService(db.get_bind().engine)
+    compacted_until = service.compacted_until(
+        component_id, start, end, measurement_type
+    )
+    if compacted_until is not None:
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Measurement already exists for this timestamp and type.",
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=(
+                f"The readings before {compacted_until.isoformat()} are compacted"
+                " into rollups and cannot be exported."
+            ),
         )
+
+    filename = f"measurements_{start:%Y%m%dT%H%M%S}_{end:%Y%m%dT%H%M%S}.{format.value}"
+    return StreamingResponse(
+        service.stream(format, component_id, start, end, measurement_type),
+        media_type=format.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
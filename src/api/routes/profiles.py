@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import PlainTextResponse
+
+from api.middleware import ProfiledRoute, profile_store
+from api.schemas.profile import ProfileResponse
+from core.profiling import RequestProfile
+
+router = APIRouter(prefix="/profiles", tags=["profiles"], route_class=ProfiledRoute)
+
+
+@router.get("", response_model=list[ProfileResponse])
+def list_profiles() -> list[RequestProfile]:
+    """
+    List the latest request profiles, most recent first
+
+    Accessible by managers only
+    """
+    return profile_store.list()
+
+
+@router.get(
+    "/{request_id}",
+    response_class=PlainTextResponse,
+    responses={
+        200: {
+            "content": {"text/plain": {}},
+            "description": "Collapsed stacks, one 'root;...;leaf count' per line.",
+        }
+    },
+)
+def get_profile(request_id: str) -> PlainTextResponse:
+    """
+    Get the profile of a request sent with `X-Profile: 1` (or sampled), as
+    collapsed stacks to feed flame graph tools (e.g. `flamegraph.pl`, speedscope)
+
+    Accessible by managers only
+    """
+    profile = profile_store.get(request_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return PlainTextResponse(profile.collapsed)
@@ -1,85 +1,335 @@
-from fastapi import APIRouter, BackgroundTasks, HTTPException, status
+from collections.abc import AsyncIterator
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from core.models import QueryProfile
+from core.notifications import is_finished, report_notifier
+from core.profiling import sampled_thread
 from core.services.report import ReportService
-from sqlmodel import select, col
+from sqlalchemy import Engine
+from sqlmodel import Session, select, col
+import anyio
+import anyio.to_thread
 import json
 
-from api.schemas.report import ReportRequest, ReportResponse, ReportDetailResponse
+from api.schemas.report import (
+    BatchReportRequest,
+    ReportRequest,
+    ReportResponse,
+    ReportDetailResponse,
+    ReportListResponse,
+    ReportStats,
+)
 from api.dependencies import SessionDep
+from db.config import settings
 from db.models import ReportDB
 from api.dependencies import ManagerDep
+from api.middleware import ProfiledRoute
+
+router = APIRouter(prefix="/reports", tags=["reports"], route_class=ProfiledRoute)
+
+# Bound of a long-poll, proxies commonly close idle connections after 60s
+MAX_WAIT_SECONDS = 60
+SSE_KEEPALIVE_SECONDS = 15
+
+
+def _report_detail(db_report: ReportDB) -> dict:
+    report = db_report.model_dump()
+    if report["result_json"] is not None:
+        report["result_json"] = json.loads(report["result_json"])
+    return report
+
 
-router = APIRouter(prefix="/reports", tags=["reports"])
+@sampled_thread
+def _load_report(engine: Engine, id: int) -> ReportDB | None:
+    # NOTE: short-lived session, waiting requests must not hold a connection
+    with Session(engine) as session:
+        return session.get(ReportDB, id)
 
 
 @router.get("/{id}", response_model=ReportDetailResponse)
-def get_report(id: int, db: SessionDep):
+async def get_report(
+    id: int,
+    db: SessionDep,
+    wait: float = Query(
+        0,
+        ge=0,
+        le=MAX_WAIT_SECONDS,
+        description="Seconds to wait for the report to finish before answering",
+    ),
+):
     """
     Get the specific results of a report
 
     Accessible by all users
+
+    With `wait`, a report still running is awaited (long-poll): the request
+    answers as soon as the report finishes, or with 409 after `wait` seconds.
     """
-    db_report = db.get(ReportDB, id)
+    engine = db.get_bind().engine
+    with report_notifier.subscribe(id) as finished:
+        db_report = await anyio.to_thread.run_sync(_load_report, engine, id)
+        if wait and db_report and not is_finished(db_report.status):
+            with anyio.move_on_after(wait):
+                await finished.wait()
+            db_report = await anyio.to_thread.run_sync(_load_report, engine, id)
+
     if not db_report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
         )
 
+    if db_report.status == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report failed: {db_report.error_message}",
+        )
+
     if db_report.status != "completed" or db_report.result_json is None:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT, 
                 detail="Report is not ready yet"
             )
 
-    report = db_report.model_dump()
-    report["result_json"] = json.loads(report["result_json"])
-    return report
+    return _report_detail(db_report)
+
+
+@router.get("/{id}/stats", response_model=ReportStats)
+def get_report_stats(id: int, db: SessionDep) -> ReportDB:
+    """
+    Get the resources used by the job of a report: rows and bytes extracted,
+    wall and CPU time of the extract/transform/load stages, peak memory.
+    The reports of a batch share the totals of the batch job (see `batch_id`)
+
+    Accessible by all users
+    """
+    db_report = db.get(ReportDB, id)
+    if not db_report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+        )
+    return db_report
+
+
+@router.get("/{id}/profile", response_model=QueryProfile, dependencies=[ManagerDep])
+def get_report_profile(id: int, db: SessionDep) -> QueryProfile:
+    """
+    Get the optimized plans and per-node timings of the KPI queries of a report
+    created with `debug`
+
+    Accessible by managers only
+    """
+    db_report = db.get(ReportDB, id)
+    if not db_report or db_report.query_profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Report profile not found"
+        )
+    return QueryProfile.model_validate_json(db_report.query_profile)
+
+
+def _sse(event: str, data: str) -> bytes:
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+async def _report_events(engine: Engine, id: int) -> AsyncIterator[bytes]:
+    """Status events of a report until it finishes, with keep-alive comments."""
+    last_status = None
+    while True:
+        with report_notifier.subscribe(id) as finished:
+            db_report = await anyio.to_thread.run_sync(_load_report, engine, id)
+            if db_report is None:
+                return
+            if db_report.status != last_status:
+                last_status = db_report.status
+                detail = ReportDetailResponse.model_validate(_report_detail(db_report))
+                event = "failed" if db_report.status.startswith("failed") else "status"
+                yield _sse(event, detail.model_dump_json())
+            if is_finished(db_report.status):
+                return
+            # NOTE: the timeout also re-reads the status, notifications are in-process
+            with anyio.move_on_after(SSE_KEEPALIVE_SECONDS):
+                await finished.wait()
+            if not finished.is_set():
+                yield b": keep-alive\n\n"
+
+
+@router.get(
+    "/{id}/events",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"text/event-stream": {}},
+            "description": "Status events of the report, until it finishes.",
+        }
+    },
+)
+async def report_events(id: int, db: SessionDep) -> StreamingResponse:
+    """
+    Stream the status of a report as Server-Sent Events
+
+    Accessible by all users
+
+    An event is sent with the current status, then at each change: `status`
+    (with the results once completed) or `failed`; the stream then ends.
+    """
+    engine = db.get_bind().engine
+    if not await anyio.to_thread.run_sync(_load_report, engine, id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Report not found"
+        )
+    return StreamingResponse(
+        _report_events(engine, id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
 
 
 @router.post(
     "",
-    response_model=ReportResponse,
+    response_model=ReportResponse | ReportDetailResponse,
     status_code=status.HTTP_202_ACCEPTED,
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": ReportDetailResponse,
+            "description": "Small report, computed inline",
+        }
+    },
     dependencies=[ManagerDep],
 )
 def create_report(
     request: ReportRequest,
     background_tasks: BackgroundTasks,
+    response: Response,
     db: SessionDep,
-) -> ReportDB:
+) -> ReportDB | ReportResponse | dict:
     """
     Generate a report asynchronously
 
     Accessible by manager only
 
     Returns the report metadata immediately while Polars works in the background.
+    With `mode=preview`, the KPIs are computed from a bounded sample of the
+    measurements, annotated with sample sizes and confidence intervals.
+    With `debug`, the optimized plans and per-node timings of the KPI queries
+    are stored too, see `GET /reports/{id}/profile`.
+    With `scope`, only the readings of the matching substations, component
+    types, component ids and measurement types are read.
+    With `granularities`, the averages per 15 minutes, hour, day and/or week
+    are computed too, the coarser buckets rolled up from the finest one.
+
+    Reports reading few rows (counted on the timestamp index, up to
+    `INLINE_REPORT_MAX_ROWS`) are computed inline instead, and returned
+    complete with a 201. The estimated duration of the queued ones is
+    extrapolated from the readings of a few time slices of the period.
     """
     # 1. Create the database record to track progress
     new_report = ReportDB(
         start_date=request.start_date,
         end_date=request.end_date,
         status="pending",
+        scope=request.scope.model_dump_json() if request.scope else None,
     )
     db.add(new_report)
     db.commit()
     db.refresh(new_report)
+    assert new_report.id is not None
 
-    # 2. Exploit the service to run Polars in a background thread
+    # 2. Small reports are cheaper to compute than to schedule and poll
+    # NOTE: the count stops past the threshold, whatever the period
     report_service = ReportService()
-    background_tasks.add_task(
-        report_service.run_report_task,
+    estimated_rows = report_service.estimate_rows(
+        request.start_date,
+        request.end_date,
+        request.scope,
+        limit=settings.INLINE_REPORT_MAX_ROWS,
+    )
+    rows = report_service.rows_to_read(estimated_rows, request.mode)
+    args = (
         new_report.id,
         request.start_date,
         request.end_date,
+        request.mode,
+        # A capped count is a bound only: a preview task counts again
+        estimated_rows if estimated_rows <= settings.INLINE_REPORT_MAX_ROWS else None,
+        request.debug,
+        request.scope,
+        request.granularities,
+    )
+    if rows <= settings.INLINE_REPORT_MAX_ROWS:
+        report_service.run_report_task(*args)
+        db.refresh(new_report)
+        response.status_code = status.HTTP_201_CREATED
+        return _report_detail(new_report)
+
+    # 3. Exploit the service to run Polars in a background thread
+    background_tasks.add_task(sampled_thread(report_service.run_report_task), *args)
+    # NOTE: past the threshold, the capped count says nothing of the duration
+    extrapolated_rows = report_service.extrapolate_rows(
+        request.start_date, request.end_date, request.scope
+    )
+    return ReportResponse(
+        **new_report.model_dump(),
+        estimated_duration=report_service.estimate_duration(
+            report_service.rows_to_read(extrapolated_rows, request.mode)
+        ),
     )
-    return new_report
 
 
-@router.get("", response_model=list[ReportResponse])
-def list_reports(db: SessionDep) -> list[ReportDB]:
+@router.post(
+    "/batch",
+    response_model=list[ReportResponse],
+    status_code=status.HTTP_202_ACCEPTED,
+    dependencies=[ManagerDep],
+)
+def create_batch_report(
+    request: BatchReportRequest,
+    background_tasks: BackgroundTasks,
+    db: SessionDep,
+) -> list[ReportDB]:
     """
-    List all available reports
+    Generate the same report over many periods asynchronously
+
+    Accessible by managers only
+
+    One report is created per period, in the order of the request. The
+    measurements of the whole range are extracted once and the reports of all
+    periods computed together, which is cheaper than one request per period
+    when the periods overlap or are contiguous (e.g. the weeks of a quarter).
+    """
+    scope = request.scope.model_dump_json() if request.scope else None
+    new_reports = [
+        ReportDB(start_date=period.start_date, end_date=period.end_date, scope=scope)
+        for period in request.periods
+    ]
+    db.add_all(new_reports)
+    db.flush()
+    for new_report in new_reports:
+        new_report.batch_id = new_reports[0].id
+    db.commit()
+    for new_report in new_reports:
+        db.refresh(new_report)
+
+    windows = []
+    for new_report, period in zip(new_reports, request.periods, strict=True):
+        assert new_report.id is not None
+        windows.append((new_report.id, period.start_date, period.end_date))
+    background_tasks.add_task(
+        sampled_thread(ReportService().run_batch_report_task), windows, request.scope
+    )
+    return new_reports
+
+
+@router.get("", response_model=list[ReportListResponse])
+def list_reports(db: SessionDep) -> list[ReportListResponse]:
+    """
+    List all available reports, with the resources their jobs used
 
     Accessible by all users
     """
     statement = select(ReportDB).order_by(col(ReportDB.id).desc())
-    return list(db.exec(statement).all())
+    return [
+        ReportListResponse(
+            **ReportResponse.model_validate(db_report).model_dump(),
+            stats=ReportStats.model_validate(db_report),
+        )
+        for db_report in db.exec(statement).all()
+    ]
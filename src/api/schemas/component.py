@@ -3,7 +3,7 @@
 from typing import Literal, Annotated
 
 from pydantic import BaseModel, Field
-from core.models import ComponentType, SwitchStatus
+from core.models import ComponentType, ConflictPolicy, ImportOutcome, SwitchStatus
 
 
 # --- Base Schema ---
@@ -108,3 +108,38 @@ ComponentResponse = Annotated[
     TransformerResponse | LineResponse | SwitchResponse,
     Field(discriminator="component_type"),
 ]
+
+
+class ComponentDeleteResponse(BaseModel):
+    """Outcome of a bulk deletion."""
+
+    deleted_components: int
+    deleted_measurements: int
+
+
+class ComponentImportResult(BaseModel):
+    """Outcome of one imported component, in input order."""
+
+    row: int
+    id: int
+    name: str
+    substation: str
+    outcome: ImportOutcome
+
+
+class ComponentImportResponse(BaseModel):
+    """Outcome of a bulk import."""
+
+    on_conflict: ConflictPolicy
+    created: int
+    updated: int
+    skipped: int
+    results: list[ComponentImportResult]
+
+
+# Response fields of each component type, in serialization order
+# NOTE: used by the list endpoint to build payloads without per-row validation
+COMPONENT_RESPONSE_FIELDS: dict[ComponentType, tuple[str, ...]] = {
+    model.model_fields["component_type"].default: tuple(model.model_fields)
+    for model in (TransformerResponse, LineResponse, SwitchResponse)
+}
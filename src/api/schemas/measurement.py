@@ -2,7 +2,7 @@
 
 from datetime import datetime, UTC
 from pydantic import BaseModel, Field, ConfigDict
-from core.models import MeasurementType
+from core.models import DownsamplingMode, MeasurementType
 
 
 class MeasurementCreate(BaseModel):
@@ -17,10 +17,48 @@ class MeasurementCreate(BaseModel):
 class MeasurementResponse(BaseModel):
     """Measurement response schema."""
 
-    id: int
+    # NOTE: readings stored in chunks have no id of their own
+    id: int | None
     component_id: int
     timestamp: datetime
     value: float
     measurement_type: MeasurementType
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class MeasurementBucket(BaseModel):
+    """Aggregated values of a fixed-width time bucket (labelled by its start)."""
+
+    timestamp: datetime
+    min: float
+    avg: float
+    max: float
+    count: int
+
+
+class MeasurementPoint(BaseModel):
+    """A single (possibly downsampled) reading."""
+
+    timestamp: datetime
+    value: float
+
+
+class MeasurementSeriesResponse(BaseModel):
+    """Downsampled series of one measurement type of a component."""
+
+    component_id: int
+    measurement_type: MeasurementType
+    start: datetime
+    end: datetime
+    mode: DownsamplingMode
+    raw_count: int
+    buckets: list[MeasurementBucket] | None = None
+    points: list[MeasurementPoint] | None = None
+
+
+class LatestMeasurementsResponse(BaseModel):
+    """Last known reading of each measurement type of a component."""
+
+    component_id: int
+    measurements: dict[MeasurementType, MeasurementPoint]
@@ -0,0 +1,16 @@
+"""Request profile API schemas."""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict
+
+
+class ProfileResponse(BaseModel):
+    request_id: str
+    method: str
+    path: str
+    duration_s: float
+    samples: int
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,25 +1,80 @@
 """Report API schemas."""
 
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
-from core.models import FinalReportSchema
+from pydantic import BaseModel, ConfigDict, Field, Json
+from core.models import FinalReportSchema, ReportGranularity, ReportMode, ReportScope
 
+# Bound of the windows of a batch, i.e. of the reports created by one request
+MAX_BATCH_WINDOWS = 500
 
-class ReportRequest(BaseModel):
+
+class ReportPeriod(BaseModel):
     start_date: datetime
     end_date: datetime
 
 
+class ReportRequest(ReportPeriod):
+    # Preview: approximate KPIs from a bounded sample, with confidence intervals
+    mode: ReportMode = ReportMode.EXACT
+    # Capture the plans and per-node timings of the KPI queries
+    debug: bool = False
+    # Only the matching components and measurement types, all by default
+    scope: ReportScope | None = None
+    # Averages per time bucket, at every granularity in one report
+    granularities: list[ReportGranularity] = Field(
+        default_factory=list, max_length=len(ReportGranularity)
+    )
+
+
+class BatchReportRequest(BaseModel):
+    # One report per window, windows may overlap
+    periods: list[ReportPeriod] = Field(min_length=1, max_length=MAX_BATCH_WINDOWS)
+    # Same scope for every window
+    scope: ReportScope | None = None
+
+
+class ReportStats(BaseModel):
+    """Resource accounting of the report job (all null until it finishes)."""
+
+    # Set for the reports of a batch (the id of its first report): the stats
+    # are then the totals of the batch job, the same for all its reports
+    batch_id: int | None = None
+    rows_extracted: int | None = None
+    bytes_extracted: int | None = None
+    extract_wall_s: float | None = None
+    extract_cpu_s: float | None = None
+    transform_wall_s: float | None = None
+    transform_cpu_s: float | None = None
+    load_wall_s: float | None = None
+    load_cpu_s: float | None = None
+    peak_rss_bytes: int | None = None
+    # Only with tracemalloc enabled (PYTHONTRACEMALLOC=1)
+    peak_traced_bytes: int | None = None
+    polars_threads: int | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class ReportResponse(BaseModel):
     id: int
     status: str
     created_at: datetime
     start_date: datetime
     end_date: datetime
+    # Stored as JSON on the report
+    scope: Json[ReportScope] | None = None
+    error_message: str | None = None
+    # Set when the report is queued: rough time to completion, in seconds
+    # (a lower bound, the rows are counted up to the inline threshold only)
+    estimated_duration: float | None = None
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class ReportListResponse(ReportResponse):
+    stats: ReportStats
+
+
 class ReportDetailResponse(ReportResponse):
     # Instead of a raw string, we use the actual domain schema
     result_json: FinalReportSchema | None = None
@@ -117,6 +117,19 @@ async def get_current_user(
     return user
 
 
+def get_token_scopes(token: str) -> list[str]:
+    """Scopes granted by a valid token to an existing user, else none."""
+    try:
+        payload = jwt.decode(
+            token, settings.JWT_KEY.get_secret_value(), algorithms=[settings.JWT_ALG]
+        )
+    except InvalidTokenError:
+        return []
+    if get_user(fake_users_db, username=payload.get("sub", "")) is None:
+        return []
+    return payload.get("scope", "").split(" ")
+
+
 async def check_current_user_manager(
     current_user: Annotated[User, Depends(get_current_user)],
 ):
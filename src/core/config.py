@@ -0,0 +1,19 @@
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    # On-demand request profiler, see api.middleware
+    # Fraction of all the requests profiled without being asked (0 disables it)
+    SAMPLE_RATE: float = 0.0
+    # Bound of the profiled requests, opt-in or sampled, across the process
+    MAX_PER_MINUTE: int = 6
+    INTERVAL_MS: float = 5.0
+    # Latest profiles kept in memory
+    STORED: int = 50
+
+    model_config = SettingsConfigDict(
+        env_prefix="PROFILE",
+    )
+
+
+settings = Settings()
@@ -4,8 +4,8 @@ These models represent the core business entities independent of storage or API.
 """
 
 from enum import Enum
-from pydantic import BaseModel
-from datetime import date
+from pydantic import BaseModel, Field
+from datetime import date, datetime
 
 
 # --- Domain Enums ---
@@ -26,8 +26,58 @@ class ComponentType(str, Enum):
     SWITCH = "SWITCH"
 
 
+class ReportMode(str, Enum):
+    EXACT = "exact"
+    PREVIEW = "preview"
+
+
+class ReportGranularity(str, Enum):
+    """Time buckets of the report averages, finest first (Polars durations)."""
+
+    FIFTEEN_MINUTES = "15m"
+    HOUR = "1h"
+    DAY = "1d"
+    # NOTE: weeks start on Monday
+    WEEK = "1w"
+
+
+class DownsamplingMode(str, Enum):
+    BUCKETS = "buckets"
+    LTTB = "lttb"
+
+
+class ConflictPolicy(str, Enum):
+    """What to do with an imported component whose (name, substation) exists."""
+
+    SKIP = "skip"
+    UPDATE = "update"
+
+
+class ImportOutcome(str, Enum):
+    CREATED = "created"
+    UPDATED = "updated"
+    SKIPPED = "skipped"
+
+
 # --- Report Domain Models ---
 
+# Bound of the component ids of a report scope, as for the exports
+MAX_SCOPE_COMPONENTS = 1000
+
+
+class ReportScope(BaseModel):
+    """Optional filters of a report: each one narrows it, None keeps all."""
+
+    substation: list[str] | None = Field(None, min_length=1)
+    component_type: list[ComponentType] | None = Field(None, min_length=1)
+    component_id: list[int] | None = Field(
+        None, min_length=1, max_length=MAX_SCOPE_COMPONENTS
+    )
+    measurement_type: list[MeasurementType] | None = Field(None, min_length=1)
+
+    def filters_components(self) -> bool:
+        return any((self.substation, self.component_type, self.component_id))
+
 
 # KPI 1
 class ComponentTypeCount(BaseModel):
@@ -53,6 +103,47 @@ class DailyAverage(BaseModel):
     measurement_type: str
     component_type: str
     avg_value: float
+    # Preview reports only: sampled readings and 95% confidence interval of the mean
+    sample_size: int | None = None
+    ci_low: float | None = None
+    ci_high: float | None = None
+    # Approximate percentiles, see FinalReportSchema.quantile_accuracy
+    p5: float | None = None
+    p50: float | None = None
+    p95: float | None = None
+
+
+# KPI 5
+class SubstationAverage(BaseModel):
+    substation: str
+    measurement_type: str
+    component_count: int
+    avg_value: float
+
+
+# KPI 6
+class ValueQuantiles(BaseModel):
+    measurement_type: str
+    component_type: str
+    count: int
+    p5: float
+    p50: float
+    p95: float
+
+
+# KPI 7
+class BucketAverage(BaseModel):
+    bucket: datetime
+    measurement_type: str
+    component_type: str
+    avg_value: float
+    # Readings averaged, the rolled up ones included
+    count: int
+
+
+class GranularityAverages(BaseModel):
+    granularity: ReportGranularity
+    averages: list[BucketAverage]
 
 
 class ReportSummary(BaseModel):
@@ -61,6 +152,49 @@ class ReportSummary(BaseModel):
     line_length_by_voltage: list[LineLength]
 
 
+class ReportSampling(BaseModel):
+    """How a preview report sampled the measurements."""
+
+    # One reading out of `stride`, selected by a hash of its row id
+    stride: int
+    estimated_rows: int
+    sampled_rows: int
+
+
 class FinalReportSchema(BaseModel):
     summary: ReportSummary
     daily_averages: list[DailyAverage]
+    # NOTE: empty in the reports stored before the breakdown was introduced
+    substation_averages: list[SubstationAverage] = []
+    # Percentiles over the whole period, merged from the daily ones
+    value_quantiles: list[ValueQuantiles] = []
+    # Relative error bound of the percentiles: within this fraction of the
+    # exact (lower) quantile, of the readings read (see the sampling)
+    quantile_accuracy: float | None = None
+    # Requested granularities only, finest first
+    bucket_averages: list[GranularityAverages] = []
+    # Preview reports only, the summary counts the components seen in the sample
+    sampling: ReportSampling | None = None
+
+
+class QueryNodeTiming(BaseModel):
+    node: str
+    # Microseconds since the start of the query
+    start_us: int
+    end_us: int
+
+
+class KpiQueryProfile(BaseModel):
+    name: str
+    # Optimized plan: check the filters pushed down to the scans
+    plan: str
+    wall_s: float
+    nodes: list[QueryNodeTiming]
+
+
+class QueryProfile(BaseModel):
+    """Plans and per-node timings of the KPI queries of a debug report."""
+
+    # Plan of the joint execution: subplans shared by the queries show as CACHE nodes
+    combined_plan: str
+    queries: list[KpiQueryProfile]
@@ -0,0 +1,82 @@
+"""
+In-process notification of the reports reaching a terminal status.
+
+Requests waiting for a report (long-poll, Server-Sent Events) subscribe to it
+and sleep on an event, holding no database session nor thread; the report
+task, running in a worker thread, wakes them up once its status is written.
+
+NOTE: notifications do not cross processes. With several workers, waiters
+still re-read the status on timeouts, so they are only woken up later.
+"""
+
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import anyio
+import anyio.from_thread
+from anyio.lowlevel import EventLoopToken, current_token
+
+from core.utils import get_logger
+
+logger = get_logger("app", "DEBUG")
+
+
+def is_finished(status: str) -> bool:
+    """Whether a report status is terminal: completed or failed."""
+    # NOTE: reports failed before the error_message column read "failed: <error>"
+    return status == "completed" or status.startswith("failed")
+
+
+class ReportNotifier:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: dict[int, dict[anyio.Event, EventLoopToken]] = defaultdict(dict)
+
+    @contextmanager
+    def subscribe(self, report_id: int) -> Iterator[anyio.Event]:
+        """
+        Event set at the next notification of the report. Subscribe before
+        reading the status, so that a completion in between is not missed.
+        """
+        event = anyio.Event()
+        with self._lock:
+            self._waiters[report_id][event] = current_token()
+        try:
+            yield event
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(report_id, {})
+                waiters.pop(event, None)
+                if not waiters:
+                    self._waiters.pop(report_id, None)
+
+    def notify(self, report_id: int):
+        """Wake up the subscribers of the report, from any thread."""
+        with self._lock:
+            waiters = self._waiters.pop(report_id, {})
+        loops: dict[EventLoopToken, list[anyio.Event]] = defaultdict(list)
+        for event, token in waiters.items():
+            loops[token].append(event)
+        # NOTE: one round trip per event loop, not per waiter
+        for token, events in loops.items():
+            try:
+                anyio.from_thread.run_sync(_set_all, events, token=token)
+            except RuntimeError:
+                # Already in the event loop thread (or its loop is closed)
+                _set_all(events)
+        if waiters:
+            logger.debug(f"Notified {len(waiters)} waiters of report {report_id}")
+
+    def waiters(self, report_id: int) -> int:
+        with self._lock:
+            return len(self._waiters.get(report_id, {}))
+
+
+def _set_all(events: list[anyio.Event]):
+    for event in events:
+        event.set()
+
+
+report_notifier = ReportNotifier()
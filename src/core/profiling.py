@@ -0,0 +1,289 @@
+"""
+Resource accounting of background jobs (e.g. the reports) and sampling
+profiler of requests.
+
+A `JobProfiler` measures the wall and CPU time of the stages of a job, and
+its peak memory: the resident set size sampled by a thread, plus the peak of
+the Python allocations when `tracemalloc` is enabled (`PYTHONTRACEMALLOC=1`).
+
+A `StackSampler` records the Python stacks of the busy threads at a fixed
+interval, as collapsed stacks ("root;...;leaf count", the input of the
+flame graph tools). Unlike cProfile, it sees the worker threads running the
+sync endpoints and background tasks, and its cost does not grow with the
+number of function calls. It only keeps the stacks running for the context
+that entered it, i.e. for one request, not its concurrent ones: the sync
+endpoints and background tasks register their worker thread to the sampler
+of their request for the time of their call, see `sampled_thread`.
+
+NOTE: CPU time, RSS and tracemalloc are per process: they include the
+Polars threads of the job, but also the work of concurrent requests and jobs.
+"""
+
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from types import FrameType
+from typing import Self
+
+import polars as pl
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss_bytes() -> int | None:
+    """Resident set size of the process (Linux only, None elsewhere)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+@dataclass
+class StageStats:
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+
+
+class JobProfiler:
+    def __init__(self, sample_interval_s: float = 0.02):
+        self.sample_interval_s = sample_interval_s
+        self.stages: dict[str, StageStats] = {}
+        self.peak_rss_bytes: int | None = None
+        self.peak_traced_bytes: int | None = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    def _sample_rss(self):
+        rss = current_rss_bytes()
+        if rss is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes or 0, rss)
+
+    def _run_sampler(self):
+        while not self._stop.wait(self.sample_interval_s):
+            self._sample_rss()
+
+    def __enter__(self) -> Self:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._sample_rss()
+        self._sampler = threading.Thread(target=self._run_sampler, daemon=True)
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        self._sample_rss()
+        if tracemalloc.is_tracing():
+            self.peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageStats]:
+        """Account the time spent in the block to the stage `name`."""
+        stats = self.stages.setdefault(name, StageStats())
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield stats
+        finally:
+            stats.wall_s += time.perf_counter() - wall
+            stats.cpu_s += time.process_time() - cpu
+            self._sample_rss()
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Flat `<stage>_wall_s`, `<stage>_cpu_s` and peak memory figures."""
+        summary: dict[str, float | int | None] = {}
+        for name, stats in self.stages.items():
+            summary[f"{name}_wall_s"] = stats.wall_s
+            summary[f"{name}_cpu_s"] = stats.cpu_s
+        summary["peak_rss_bytes"] = self.peak_rss_bytes
+        summary["peak_traced_bytes"] = self.peak_traced_bytes
+        summary["polars_threads"] = pl.thread_pool_size()
+        return summary
+
+
+# Modules whose frames at the top of a stack mean the thread is idle
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "thread.py")
+
+# The sampler of the current request, inherited by the calls it runs in threads
+_active_sampler: ContextVar["StackSampler | None"] = ContextVar(
+    "active_sampler", default=None
+)
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def sampled_thread[**P, R](func: Callable[P, R]) -> Callable[P, R]:
+    """
+    Wrap a function run in a worker thread (a sync endpoint, a background
+    task) to register the thread to the sampler of its request, if any, for
+    the time of the call. The context of the request is copied to the thread.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        sampler = _active_sampler.get()
+        if sampler is None:
+            return func(*args, **kwargs)
+        with sampler.sampling_thread():
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+class StackSampler:
+    """
+    Collapsed Python stacks of the busy threads, sampled by a thread.
+    Only the threads running for the context that entered the sampler are
+    kept: its own thread while it runs the frame that entered the sampler
+    (i.e. not the concurrent asyncio tasks of the event loop), and the worker
+    threads registered to it (see `sampled_thread`).
+    """
+
+    def __init__(self, interval_s: float = 0.005):
+        self.interval_s = interval_s
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._owner_thread: int | None = None
+        self._owner_frame: FrameType | None = None
+        self._token: Token | None = None
+        self._threads: set[int] = set()
+
+    def _samples_thread(self, thread_id: int, frames: list[FrameType]) -> bool:
+        if thread_id == self._owner_thread:
+            # NOTE: the event loop thread runs the concurrent requests too, the
+            # frame (or coroutine) that entered is on the stack of its own only
+            return self._owner_frame in frames
+        return thread_id in self._threads
+
+    @contextmanager
+    def sampling_thread(self) -> Iterator[None]:
+        """Sample the current thread too within the block (reentrant)."""
+        thread_id = threading.get_ident()
+        if thread_id in self._threads:
+            yield
+            return
+        self._threads.add(thread_id)
+        try:
+            yield
+        finally:
+            self._threads.discard(thread_id)
+
+    def _sample(self):
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or frame.f_code.co_filename.endswith(_IDLE_MODULES):
+                continue
+            frames = []
+            while frame is not None:
+                frames.append(frame)
+                frame = frame.f_back
+            frames.reverse()
+            if self._samples_thread(thread_id, frames):
+                self.stacks[";".join(map(_frame_label, frames))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self._sample()
+
+    def __enter__(self) -> Self:
+        self._owner_thread = threading.get_ident()
+        self._owner_frame = sys._getframe(1)
+        self._token = _active_sampler.set(self)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        if self._token:
+            _active_sampler.reset(self._token)
+        self._owner_frame = None
+
+    def collapsed(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()
+        )
+
+
+class RateLimiter:
+    """At most `limit` acquisitions per sliding `period_s`, thread-safe."""
+
+    def __init__(self, limit: int, period_s: float = 60.0):
+        self.limit = limit
+        self.period_s = period_s
+        self._lock = threading.Lock()
+        self._times: deque[float] = deque()
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._times and now - self._times[0] >= self.period_s:
+                self._times.popleft()
+            if len(self._times) >= self.limit:
+                return False
+            self._times.append(now)
+            return True
+
+    def reset(self):
+        with self._lock:
+            self._times.clear()
+
+
+@dataclass
+class RequestProfile:
+    request_id: str
+    method: str
+    path: str
+    duration_s: float
+    samples: int
+    collapsed: str
+    created_at: datetime = field(default_factory=lambda: datetime.now(UTC))
+
+
+class ProfileStore:
+    """The latest request profiles, by request id."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._profiles: OrderedDict[str, RequestProfile] = OrderedDict()
+
+    def add(self, profile: RequestProfile):
+        with self._lock:
+            self._profiles[profile.request_id] = profile
+            self._profiles.move_to_end(profile.request_id)
+            while len(self._profiles) > self.capacity:
+                self._profiles.popitem(last=False)
+
+    def get(self, request_id: str) -> RequestProfile | None:
+        with self._lock:
+            return self._profiles.get(request_id)
+
+    def list(self) -> list[RequestProfile]:
+        with self._lock:
+            return list(reversed(self._profiles.values()))
+
+    def reset(self):
+        with self._lock:
+            self._profiles.clear()
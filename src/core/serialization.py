@@ -0,0 +1,113 @@
+"""
+JSON documents of Pydantic models written straight from Polars frames.
+
+`frame_json(frame, model)` writes the JSON array that Pydantic would write
+for a list of `model` built from the rows of the frame, without building one
+model per row: the columns are checked and cast once against the fields of
+the model, then written by Polars. Both write the floats as their shortest
+round-trip representation, non-finite values as null; only the sign of the
+positive exponents (|v| >= 1e16) differs across pydantic-core versions, and
+is normalized to the one of the installed version.
+
+Supported fields: int, float, str, bool, date, UTC datetime and str Enum,
+optional or not.
+"""
+
+import json
+import re
+import types
+from datetime import date, datetime
+from enum import Enum
+from typing import Union, get_args, get_origin
+
+import polars as pl
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from pydantic_core import to_json
+
+_DTYPES: dict[type, pl.DataType | type[pl.DataType]] = {
+    bool: pl.Boolean,
+    int: pl.Int64,
+    float: pl.Float64,
+    str: pl.String,
+    date: pl.Date,
+    datetime: pl.Datetime("us", "UTC"),
+}
+
+
+# NOTE: Polars writes 1e+20, some pydantic-core versions 1e20
+_EXPONENT_SIGN = b"e+" in to_json(1e20)
+
+
+def _field_type(field: FieldInfo) -> tuple[type | None, bool]:
+    """The type of a field, and whether it is optional."""
+    annotation = field.annotation
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0], True
+    return annotation, False
+
+
+def _column(frame: pl.DataFrame, name: str, field: FieldInfo) -> pl.Expr:
+    field_type, optional = _field_type(field)
+    if isinstance(field_type, type) and issubclass(field_type, Enum):
+        # NOTE: the cast to an Enum rejects the values out of it
+        dtype = pl.Enum([member.value for member in field_type])
+    elif isinstance(field_type, type) and field_type in _DTYPES:
+        dtype = _DTYPES[field_type]
+    else:
+        raise TypeError(f"Unsupported type of the field {name}: {field.annotation}")
+
+    if name in frame.columns:
+        column = pl.col(name).cast(dtype)
+    elif field.is_required():
+        raise ValueError(f"Missing column of the required field {name}")
+    else:
+        column = pl.lit(field.get_default(), dtype)
+
+    if field_type is date:
+        column = column.dt.to_string("%Y-%m-%d")
+    elif field_type is datetime:
+        # NOTE: as Pydantic, the microseconds only when there are some
+        column = (
+            pl.when(column.dt.microsecond() == 0)
+            .then(column.dt.to_string("%Y-%m-%dT%H:%M:%SZ"))
+            .otherwise(column.dt.to_string("%Y-%m-%dT%H:%M:%S%.6fZ"))
+        )
+    elif isinstance(dtype, pl.Enum):
+        column = column.cast(pl.String)
+    if not optional and name in frame.columns and frame[name].null_count():
+        raise ValueError(f"Null values in the required field {name}")
+    return column.alias(name)
+
+
+def frame_json(frame: pl.DataFrame, model: type[BaseModel]) -> str:
+    """The rows of the frame as a JSON array of `model`."""
+    document = frame.select(
+        _column(frame, name, field) for name, field in model.model_fields.items()
+    ).write_json()
+    floats = [
+        re.escape(name)
+        for name, field in model.model_fields.items()
+        if _field_type(field)[0] is float
+    ]
+    if floats and not _EXPONENT_SIGN:
+        # NOTE: a key followed by a number, never within a string value,
+        # where the quotes are escaped
+        exponent = re.compile(rf'("(?:{"|".join(floats)})":-?[0-9.]+e)\+')
+        document = exponent.sub(r"\1", document)
+    return document
+
+
+def model_json(model: type[BaseModel], members: dict[str, str]) -> str:
+    """A JSON object of `model` from the JSON of each one of its fields."""
+    if set(members) != set(model.model_fields):
+        raise ValueError(
+            f"Fields of {model.__name__}: {list(model.model_fields)}, got {list(members)}"
+        )
+    return (
+        "{"
+        + ",".join(f"{json.dumps(name)}:{members[name]}" for name in model.model_fields)
+        + "}"
+    )
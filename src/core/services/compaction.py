@@ -0,0 +1,53 @@
+"""
+Scheduled retention of the raw measurements, see db.rollups.
+
+With `settings.RETENTION_DAYS` set, the application compacts the raw
+readings older than the retention into rollups every
+`settings.COMPACTION_INTERVAL_S`, in a worker thread, then returns the freed
+pages to the file system. The same job runs offline with
+`python -m db.migrations compact`.
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import anyio
+import anyio.to_thread
+
+from core.utils import get_logger, timer
+from db.config import settings
+from db.rollups import compact, incremental_vacuum
+from db.shards import shard_engines
+
+logger = get_logger("app", "DEBUG")
+
+
+class CompactionService:
+    def __init__(self, retention_days: int | None = None):
+        retention_days = retention_days or settings.RETENTION_DAYS
+        if retention_days is None:
+            raise ValueError("No retention to compact to, set RETENTION_DAYS")
+        self.retention = timedelta(days=retention_days)
+
+    @timer
+    def run(self, now: datetime | None = None) -> int:
+        """
+        Compact every measurement database (or shard).
+
+        Returns:
+            Number of raw readings replaced by rollups
+        """
+        cutoff = (now or datetime.now(UTC)) - self.retention
+        compacted = 0
+        for engine in shard_engines():
+            compacted += compact(engine, cutoff)
+            incremental_vacuum(engine)
+        return compacted
+
+    async def run_periodically(self, interval_s: float | None = None):
+        """Run the compaction forever, e.g. for the lifetime of the application."""
+        while True:
+            try:
+                await anyio.to_thread.run_sync(self.run)
+            except Exception:
+                logger.exception("Compaction failed")
+            await anyio.sleep(interval_s or settings.COMPACTION_INTERVAL_S)
@@ -0,0 +1,164 @@
+"""
+Component operations done set-based in SQL: bulk import and deletion.
+"""
+
+from collections.abc import Sequence
+
+from sqlalchemy import delete, tuple_
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, col, func, select
+
+from core.models import ComponentType, ConflictPolicy, ImportOutcome
+from core.services.latest import last_values
+from core.utils import get_logger, timer
+from db.models import (
+    ComponentDB,
+    MeasurementChunkDB,
+    MeasurementDB,
+    MeasurementRollupDB,
+)
+from db.operations import chunked, delete_in_chunks
+from db.shards import measurement_sessions
+
+logger = get_logger("app", "DEBUG")
+
+# Columns set by an import, the type-specific ones are reset when missing
+_IMPORT_COLUMNS = (
+    "name",
+    "substation",
+    "component_type",
+    "capacity_mva",
+    "length_km",
+    "voltage_kv",
+    "status",
+)
+
+ComponentKey = tuple[str, str]
+
+
+class ComponentService:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def find_ids(
+        self,
+        substation: str | None = None,
+        component_type: ComponentType | None = None,
+    ) -> list[int]:
+        statement = select(ComponentDB.id)
+        if substation:
+            statement = statement.where(ComponentDB.substation == substation)
+        if component_type:
+            statement = statement.where(ComponentDB.component_type == component_type)
+        return [i for i in self.session.exec(statement) if i is not None]
+
+    def _find_keys(self, keys: Sequence[ComponentKey]) -> dict[ComponentKey, int]:
+        """Ids of the existing components among `keys`."""
+        found: dict[ComponentKey, int] = {}
+        # NOTE: two SQL variables per key
+        for chunk in chunked(keys, 250):
+            statement = select(
+                ComponentDB.name, ComponentDB.substation, ComponentDB.id
+            ).where(
+                tuple_(col(ComponentDB.name), col(ComponentDB.substation)).in_(chunk)
+            )
+            found.update(
+                ((name, sub), id)
+                for name, sub, id in self.session.exec(statement)
+                if id is not None
+            )
+        return found
+
+    @timer
+    def import_components(
+        self, components: Sequence[dict], on_conflict: ConflictPolicy
+    ) -> list[tuple[int, ImportOutcome]]:
+        """
+        Upsert validated components keyed on (name, substation), in a single
+        transaction. An update replaces the component, as PUT does.
+
+        Args:
+            components: Dumps of `ComponentCreate`, unique on (name, substation)
+
+        Returns:
+            Id and outcome of each component, in input order
+        """
+        rows = [
+            {c: component.get(c) for c in _IMPORT_COLUMNS} for component in components
+        ]
+        keys = [(c["name"], c["substation"]) for c in components]
+        existing = self._find_keys(keys)
+
+        statement = insert(ComponentDB)
+        if on_conflict == ConflictPolicy.UPDATE:
+            statement = statement.on_conflict_do_update(
+                index_elements=["name", "substation"],
+                set_={c: statement.excluded[c] for c in _IMPORT_COLUMNS[2:]},
+            )
+        else:
+            statement = statement.on_conflict_do_nothing(
+                index_elements=["name", "substation"]
+            )
+
+        try:
+            if rows:
+                self.session.execute(statement, rows)
+            ids = self._find_keys(keys)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        conflict = (
+            ImportOutcome.UPDATED
+            if on_conflict == ConflictPolicy.UPDATE
+            else ImportOutcome.SKIPPED
+        )
+        outcomes = [
+            (ids[key], conflict if key in existing else ImportOutcome.CREATED)
+            for key in keys
+        ]
+        logger.info(
+            f"Imported {len(rows)} components ({len(rows) - len(existing)} new, "
+            f"{len(existing)} {conflict.value})"
+        )
+        return outcomes
+
+    @timer
+    def delete(self, component_ids: Sequence[int]) -> tuple[int, int]:
+        """
+        Delete components and their measurements without loading any row.
+        Measurements go first, in bounded chunks (one transaction each), then
+        the components themselves.
+
+        Returns:
+            Number of deleted components and measurements
+        """
+        measurements = 0
+        for session, shard_ids in measurement_sessions(component_ids, self.session):
+            for ids in chunked(shard_ids):
+                measurements += delete_in_chunks(
+                    session, MeasurementDB, col(MeasurementDB.component_id).in_(ids)
+                )
+                # Readings stored as chunks, see db.chunks
+                in_ids = col(MeasurementChunkDB.component_id).in_(ids)
+                readings = select(func.sum(MeasurementChunkDB.count)).where(in_ids)
+                measurements += session.exec(readings).one() or 0
+                delete_in_chunks(session, MeasurementChunkDB, in_ids)
+                # Readings rolled up by the compaction, see db.rollups
+                in_ids = col(MeasurementRollupDB.component_id).in_(ids)
+                readings = select(func.sum(MeasurementRollupDB.value_count)).where(
+                    in_ids
+                )
+                measurements += session.exec(readings).one() or 0
+                delete_in_chunks(session, MeasurementRollupDB, in_ids)
+
+        components = 0
+        for ids in chunked(component_ids):
+            statement = delete(ComponentDB).where(col(ComponentDB.id).in_(ids))
+            components += self.session.connection().execute(statement).rowcount
+        self.session.commit()
+        last_values.remove(component_ids)
+
+        logger.info(f"Deleted {components} components and {measurements} measurements")
+        return components, measurements
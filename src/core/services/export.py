@@ -0,0 +1,296 @@
+"""
+Streaming export of raw measurements.
+
+Rows are read in pages (keyset pagination in export order) and encoded page by
+page, so memory stays constant and the first bytes are sent as soon as the
+first page is read, whatever the size of the export. Measurements stored as
+chunks (see db.chunks) are read a few chunks at a time, decoded. The export
+is of raw readings only: the ranges compacted into rollups (see db.rollups)
+are not exportable, see `compacted_until`.
+"""
+
+import io
+from collections.abc import Callable, Iterator
+from datetime import datetime, timedelta
+from enum import Enum
+
+import polars as pl
+import pyarrow as pa
+from sqlalchemy import Engine
+from sqlmodel import Session, col, func, select
+
+from core.models import MeasurementType
+from core.utils import get_logger
+from db.chunks import MEASUREMENT_SCHEMA, ChunkStore, measurement_filters
+from db.config import MeasurementStorage, settings
+from db.instrumentation import read_database_adbc
+from db.models import MeasurementRollupDB
+from db.rollups import bucket_floor
+from db.shards import measurement_engines
+from db.timestamps import parse_timestamp, sql_timestamp, to_utc
+
+logger = get_logger("app", "DEBUG")
+
+EXPORT_SCHEMA = pl.Schema(
+    {
+        "id": pl.Int64,
+        "component_id": pl.Int64,
+        "measurement_type": pl.String,
+        "timestamp": pl.Datetime("us", "UTC"),
+        "value": pl.Float64,
+    }
+)
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    ARROW = "arrow"
+
+    @property
+    def media_type(self) -> str:
+        if self == ExportFormat.ARROW:
+            return "application/vnd.apache.arrow.stream"
+        return "application/x-ndjson"
+
+
+# Query of the series `(component_ids, measurement_types)`, after a key if any
+SeriesQuery = Callable[[list[int], list[MeasurementType], int | str | None], str]
+
+
+def _sql_literal(value: int | str) -> str:
+    """Render a key read back from the database (text or epoch timestamp)."""
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(int(value))
+
+
+class MeasurementExportService:
+    # Chunks decoded per batch (each holds up to `settings.CHUNK_SECONDS` of readings)
+    CHUNKS_PER_BATCH = 16
+
+    def __init__(self, engine: Engine, batch_rows: int = 65_536):
+        self.engine = engine
+        self.batch_rows = batch_rows
+
+    def compacted_until(
+        self,
+        component_ids: list[int],
+        start: datetime,
+        end: datetime,
+        measurement_types: list[MeasurementType] | None = None,
+    ) -> datetime | None:
+        """
+        End of the last rollup bucket of the range, None if none of its
+        readings were compacted (on the index of the rollups).
+        """
+        rollups = MeasurementRollupDB
+        statement = select(func.max(rollups.bucket_start)).where(
+            col(rollups.measurement_type).in_(
+                measurement_types or list(MeasurementType)
+            ),
+            col(rollups.bucket_start).between(bucket_floor(start), end),
+        )
+        last: datetime | None = None
+        shards = measurement_engines(sorted(set(component_ids)), self.engine)
+        for engine, ids in shards.items():
+            with Session(engine) as session:
+                bucket = session.exec(
+                    statement.where(col(rollups.component_id).in_(ids))
+                ).one()
+            if bucket is not None and (last is None or bucket > last):
+                last = bucket
+        if last is None:
+            return None
+        return last + timedelta(seconds=settings.ROLLUP_SECONDS)
+
+    @staticmethod
+    def _query(
+        component_ids: list[int],
+        measurement_types: list[MeasurementType],
+        start: datetime,
+        end: datetime,
+        after: int | str | None = None,
+    ) -> str:
+        # NOTE: listing the types explicitly, even when all are exported, lets
+        # SQLite seek the (component_id, measurement_type, timestamp) index on
+        # the time range and read rows in index order without sorting
+        ids = ", ".join(str(int(component_id)) for component_id in component_ids)
+        types = ", ".join(f"'{MeasurementType(t).value}'" for t in measurement_types)
+        # NOTE: a single lower bound, SQLite seeks only one of them
+        lower = (
+            f"timestamp >= {sql_timestamp(start)}"
+            if after is None
+            else f"timestamp > {_sql_literal(after)}"
+        )
+        return f"""
+            SELECT id, component_id, measurement_type, timestamp, value
+            FROM measurements
+            WHERE component_id IN ({ids})
+              AND measurement_type IN ({types})
+              AND {lower} AND timestamp <= {sql_timestamp(end)}
+            ORDER BY component_id, measurement_type, timestamp
+        """
+
+    @staticmethod
+    def _chunk_query(
+        component_ids: list[int],
+        measurement_types: list[MeasurementType],
+        start: datetime,
+        end: datetime,
+        after: int | str | None = None,
+    ) -> str:
+        # NOTE: the chunks of a series do not overlap, in bucket order their
+        # readings are in time order
+        filters = [
+            f"last_timestamp >= {sql_timestamp(start)}",
+            f"first_timestamp <= {sql_timestamp(end)}",
+            *measurement_filters(component_ids, measurement_types),
+        ]
+        if after is not None:
+            filters.append(f"bucket_start > {_sql_literal(after)}")
+        return f"""
+            SELECT component_id, measurement_type, bucket_start, count,
+                   timestamp_data, value_data
+            FROM measurement_chunks
+            WHERE {" AND ".join(filters)}
+            ORDER BY component_id, measurement_type, bucket_start
+        """
+
+    @staticmethod
+    def _pages(
+        engine: Engine,
+        query: SeriesQuery,
+        key: str,
+        component_ids: list[int],
+        measurement_types: list[MeasurementType],
+        limit: int,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Pages of at most `limit` rows of `query`, in export order. Each page is
+        a short read resuming after the last row read, `key` being unique within
+        a series. ADBC reads hold off the writes to the file (see
+        db.instrumentation), a cursor left open at the pace of the client would
+        stall ingestion.
+        """
+        # (component ids, types, key after which to resume), in export order
+        pending: list[tuple[list[int], list[MeasurementType], int | str | None]] = [
+            (component_ids, measurement_types, None)
+        ]
+        while pending:
+            ids, types, after = pending.pop(0)
+            df = read_database_adbc(f"{query(ids, types, after)} LIMIT {limit}", engine)
+            if df.height:
+                yield df
+            if df.height < limit:
+                continue
+            last = df.row(-1, named=True)
+            component_id = last["component_id"]
+            measurement_type = last["measurement_type"]
+            # NOTE: the rest of the series of the last row, then the next ones;
+            # each read seeks the index from the start of its first series
+            next_types = [t for t in types if t.value > measurement_type]
+            next_ids = [i for i in ids if i > component_id]
+            pending[:0] = [
+                group
+                for group in (
+                    ([component_id], [MeasurementType(measurement_type)], last[key]),
+                    ([component_id], next_types, None),
+                    (next_ids, types, None),
+                )
+                if group[0] and group[1]
+            ]
+
+    def _iter_chunk_frames(
+        self,
+        engine: Engine,
+        component_ids: list[int],
+        measurement_types: list[MeasurementType],
+        start: datetime,
+        end: datetime,
+    ) -> Iterator[pl.DataFrame]:
+        """Readings decoded from the chunks, `CHUNKS_PER_BATCH` chunks at a time."""
+        in_range = pl.col("timestamp").is_between(to_utc(start), to_utc(end))
+        pages = self._pages(
+            engine,
+            lambda ids, types, after: self._chunk_query(ids, types, start, end, after),
+            "bucket_start",
+            component_ids,
+            measurement_types,
+            self.CHUNKS_PER_BATCH,
+        )
+        for page in pages:
+            df = ChunkStore.decode(page).filter(in_range)
+            # NOTE: readings stored in chunks have no id of their own
+            yield df.select(
+                pl.lit(None, pl.Int64).alias("id"), *MEASUREMENT_SCHEMA
+            ).cast(EXPORT_SCHEMA)
+
+    def iter_frames(
+        self,
+        component_ids: list[int],
+        start: datetime,
+        end: datetime,
+        measurement_types: list[MeasurementType] | None = None,
+    ) -> Iterator[pl.DataFrame]:
+        """
+        Batches of measurements with parsed timestamps, in export order
+        (shard by shard if the measurements are sharded).
+        """
+        # NOTE: sorted by value, as SQLite orders them
+        types = sorted(
+            map(MeasurementType, measurement_types or MeasurementType),
+            key=lambda t: t.value,
+        )
+        shards = measurement_engines(sorted(set(component_ids)), self.engine)
+        for engine, ids in shards.items():
+            if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+                yield from self._iter_chunk_frames(engine, ids, types, start, end)
+                continue
+            pages = self._pages(
+                engine,
+                lambda ids, types, after: self._query(ids, types, start, end, after),
+                "timestamp",
+                ids,
+                types,
+                self.batch_rows,
+            )
+            for page in pages:
+                df = page.with_columns(parse_timestamp())
+                yield df.select(
+                    pl.col(name).cast(t) for name, t in EXPORT_SCHEMA.items()
+                )
+
+    def stream(
+        self,
+        export_format: ExportFormat,
+        component_ids: list[int],
+        start: datetime,
+        end: datetime,
+        measurement_types: list[MeasurementType] | None = None,
+    ) -> Iterator[bytes]:
+        """Encoded export, one chunk per record batch."""
+        logger.debug(
+            f"Exporting components {component_ids} from {start} to {end} "
+            f"as {export_format.value}"
+        )
+        frames = self.iter_frames(component_ids, start, end, measurement_types)
+        if export_format == ExportFormat.NDJSON:
+            for df in frames:
+                yield df.write_ndjson().encode()
+        else:
+            yield from self._stream_arrow(frames)
+
+    @staticmethod
+    def _stream_arrow(frames: Iterator[pl.DataFrame]) -> Iterator[bytes]:
+        """Arrow IPC stream: the schema first, then one message per batch."""
+        schema = pl.DataFrame(schema=EXPORT_SCHEMA).to_arrow().schema
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for df in frames:
+                for batch in df.to_arrow().to_batches():
+                    writer.write_batch(batch)
+                    yield sink.getvalue()
+                    sink.seek(0)
+                    sink.truncate()
+        # End-of-stream marker (and the schema alone for an empty export)
+        yield sink.getvalue()
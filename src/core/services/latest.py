@@ -0,0 +1,146 @@
+"""
+In-memory last known value per component and measurement type.
+
+The latest reading of every (component, measurement type) is kept in memory,
+updated by the ingestion and warmed from the database at startup, so that an
+overview of the whole grid costs O(components) whatever the history size.
+Late readings (older than the stored one) do not replace it.
+
+NOTE: the cache is per process. With several workers, each one only sees the
+readings it ingested since its own warm-up.
+"""
+
+import json
+import threading
+from collections.abc import Iterable, Sequence
+from datetime import datetime
+
+import polars as pl
+from sqlmodel import Session, select
+
+from core.models import MeasurementType
+from core.utils import get_logger, timer
+from db.chunks import ChunkStore
+from db.config import MeasurementStorage, settings
+from db.instrumentation import read_database_adbc
+from db.models import ComponentDB
+from db.shards import measurement_engines
+from db.timestamps import parse_timestamp, to_utc
+
+logger = get_logger("app", "DEBUG")
+
+# (timestamp, value) of the latest reading
+LastValue = tuple[datetime, float]
+
+
+def _latest_query(component_ids: Sequence[int]) -> str:
+    """One index seek per (component, type): the latest row, or chunk."""
+    ids = json.dumps([int(i) for i in component_ids])
+    types = json.dumps([t.value for t in MeasurementType])
+    if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+        return f"""
+            SELECT m.component_id, m.measurement_type, m.count,
+                   m.timestamp_data, m.value_data
+            FROM json_each('{ids}') c
+            CROSS JOIN json_each('{types}') t
+            JOIN measurement_chunks m ON m.id = (
+                SELECT id FROM measurement_chunks
+                WHERE component_id = c.value AND measurement_type = t.value
+                ORDER BY bucket_start DESC LIMIT 1
+            )
+        """
+    return f"""
+        SELECT m.component_id, m.measurement_type, m.timestamp, m.value
+        FROM json_each('{ids}') c
+        CROSS JOIN json_each('{types}') t
+        JOIN measurements m ON m.id = (
+            SELECT id FROM measurements
+            WHERE component_id = c.value AND measurement_type = t.value
+            ORDER BY timestamp DESC LIMIT 1
+        )
+    """
+
+
+class LastValueCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values: dict[int, dict[str, LastValue]] = {}
+
+    def update(
+        self,
+        component_id: int,
+        measurement_type: MeasurementType | str,
+        timestamp: datetime,
+        value: float,
+    ):
+        key = MeasurementType(measurement_type).value
+        timestamp = to_utc(timestamp)
+        with self._lock:
+            values = self._values.setdefault(component_id, {})
+            current = values.get(key)
+            if current is None or timestamp >= current[0]:
+                values[key] = (timestamp, value)
+
+    def remove(self, component_ids: Iterable[int]):
+        with self._lock:
+            for component_id in component_ids:
+                self._values.pop(component_id, None)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def get(
+        self, component_ids: Iterable[int] | None = None
+    ) -> dict[int, dict[str, LastValue]]:
+        """Latest readings of the components (all the known ones by default)."""
+        with self._lock:
+            if component_ids is None:
+                return {i: dict(values) for i, values in self._values.items()}
+            return {
+                i: dict(self._values[i]) for i in component_ids if i in self._values
+            }
+
+    @timer
+    def warm(self, session: Session) -> int:
+        """
+        Load the latest reading of every component from the database (or
+        its shards), replacing the cached ones. Readings compacted into
+        rollups (see db.rollups) are not readings of their own, and ignored.
+
+        Returns:
+            Number of cached (component, measurement type) values
+        """
+        component_ids = [
+            i for i in session.exec(select(ComponentDB.id)) if i is not None
+        ]
+        values: dict[int, dict[str, LastValue]] = {}
+        for engine, ids in measurement_engines(
+            component_ids, session.get_bind().engine
+        ).items():
+            df = read_database_adbc(_latest_query(ids), engine)
+            if df.is_empty():
+                continue
+            if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+                df = (
+                    ChunkStore.decode(df)
+                    .group_by("component_id", "measurement_type")
+                    .agg(pl.all().sort_by("timestamp").last())
+                )
+            else:
+                df = df.with_columns(parse_timestamp())
+            for component_id, measurement_type, timestamp, value in df.select(
+                "component_id", "measurement_type", "timestamp", "value"
+            ).iter_rows():
+                values.setdefault(component_id, {})[measurement_type] = (
+                    timestamp,
+                    value,
+                )
+        with self._lock:
+            self._values = values
+        count = sum(len(v) for v in values.values())
+        logger.info(f"Warmed the last values of {len(values)} components ({count})")
+        return count
+
+
+last_values = LastValueCache()
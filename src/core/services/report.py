@@ -2,62 +2,405 @@
 # NOTE: Note that pl.read_database_uri is likely to be faster than pl.read_database if you are using a SQLAlchemy or DBAPI2 connection as these connections may load the data row-wise into Python before copying the data again to the column-wise Apache Arrow format.
 
 # REF: https://fastapi.tiangolo.com/advanced/advanced-dependencies/#background-tasks-and-dependencies-with-yield-technical-details
+import math
+import time
 import polars as pl
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
 from datetime import datetime
-from db.models import ReportDB
-from core.models import FinalReportSchema, ComponentType
+from sqlalchemy import Engine
+from db.models import ComponentDB, ReportDB
+from core.models import (
+    BucketAverage,
+    ComponentType,
+    ComponentTypeCount,
+    DailyAverage,
+    FinalReportSchema,
+    GranularityAverages,
+    KpiQueryProfile,
+    LineLength,
+    MeasurementType,
+    QueryNodeTiming,
+    QueryProfile,
+    ReportGranularity,
+    ReportMode,
+    ReportSampling,
+    ReportScope,
+    ReportSummary,
+    SubstationAverage,
+    TransformerCapacity,
+    ValueQuantiles,
+)
+from core.notifications import report_notifier
+from core.profiling import JobProfiler
+from core.serialization import frame_json, model_json
 from core.utils import get_logger, timer
-from sqlmodel import create_engine, text
-from db.config import settings
+from sqlmodel import col, create_engine, select, text
+from db.chunks import MEASUREMENT_SCHEMA, ChunkStore, measurement_filters
+from db.config import MeasurementStorage, settings
+from db.instrumentation import count_reads, instrument_engine, read_database_adbc
+from db.rollups import bucket_floor, read_rollups
+from db.replica import replica_engine
+from db.shards import shard_engines, sharded
+from db.sketches import RELATIVE_ACCURACY, quantiles, sketch_bin, sketch_bins
+from db.timestamps import parse_timestamp, sql_timestamp, to_utc
 from sqlmodel import Session
+from pydantic_core import to_json
 
 logger = get_logger("app", "DEBUG")
 
 
+# Knuth multiplicative hash of the row id: a deterministic sample that does not
+# follow the insertion pattern (e.g. the measurement types interleaved by id)
+_ROW_HASH = "((m.id * 2654435761) % 4294967296)"
+
+
+def _sample_filter(stride: int) -> str:
+    return f"AND {_ROW_HASH} % {stride} = 0" if stride > 1 else ""
+
+
+# (component ids, measurement types) a report reads, None meaning all
+ScopeFilter = tuple[list[int] | None, list[MeasurementType] | None]
+
+
+def _scope_sql(scope_filter: ScopeFilter, alias: str = "") -> str:
+    return "".join(f"AND {f} " for f in measurement_filters(*scope_filter, alias))
+
+
+@dataclass
+class JobStats:
+    """Resource accounting of a report job, persisted on its `ReportDB` row."""
+
+    rows_extracted: int
+    bytes_extracted: int
+    profile: dict[str, float | int | None]
+
+    def columns(self) -> dict:
+        return {
+            "rows_extracted": self.rows_extracted,
+            "bytes_extracted": self.bytes_extracted,
+            **self.profile,
+        }
+
+
+# Names of the KPI queries, in the order of `_kpi_queries`
+KPI_QUERIES = (
+    "components_by_type",
+    "transformer_capacity_by_voltage",
+    "line_length_by_voltage",
+    "daily_averages",
+    "substation_averages",
+    "value_quantiles",
+    "bucket_averages",
+)
+
+
+def _profile_query(query: pl.LazyFrame) -> tuple[pl.DataFrame, list[QueryNodeTiming]]:
+    """Collect a query with its per-node timings, where Polars supports it."""
+    try:
+        result, timings = query.profile()
+    except (AttributeError, pl.exceptions.ComputeError):
+        # NOTE: the per-node profiler fails on some plans ("no data to time",
+        # e.g. when no node reports its timing) and is gone from later Polars
+        # versions: time the query as a whole
+        start = time.perf_counter()
+        result = query.collect()
+        elapsed_us = int((time.perf_counter() - start) * 1_000_000)
+        return result, [QueryNodeTiming(node="query", start_us=0, end_us=elapsed_us)]
+    return result, [
+        QueryNodeTiming(node=node, start_us=start, end_us=end)
+        for node, start, end in timings.iter_rows()
+    ]
+
+
 class ReportService:
+    # Bound of the rows a preview report reads, i.e. of its extract/transform time
+    PREVIEW_SAMPLE_ROWS = 100_000
+    # Normal quantile of the 95% confidence intervals
+    Z_95 = 1.96
+    # Extract and transform throughput, order of magnitude from the benchmarks
+    ROWS_PER_SECOND = 500_000
+    # Time slices counted to extrapolate the rows of a queued report
+    SAMPLE_SLICES = 16
+
     def __init__(self):
-        self.engine = create_engine(
-            settings.URI, connect_args={"check_same_thread": False}
+        self.engine = instrument_engine(
+            create_engine(settings.URI, connect_args={"check_same_thread": False})
         )
 
     @property
     def db_uri(self):
         return f"{self.engine.url.render_as_string(hide_password=False)}"
 
+    def rows_to_read(self, estimated_rows: int, mode: ReportMode) -> int:
+        if mode == ReportMode.PREVIEW:
+            return min(estimated_rows, self.PREVIEW_SAMPLE_ROWS)
+        return estimated_rows
+
+    def estimate_duration(self, rows: int) -> float:
+        """Rough duration in seconds of a report reading `rows` rows."""
+        return rows / self.ROWS_PER_SECOND
+
     @timer
-    def run_report_task(self, report_id: int, start_date: datetime, end_date: datetime):
-        """Entry point for the background task."""
+    def run_report_task(
+        self,
+        report_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        mode: ReportMode = ReportMode.EXACT,
+        estimated_rows: int | None = None,
+        debug: bool = False,
+        scope: ReportScope | None = None,
+        granularities: list[ReportGranularity] | None = None,
+    ):
+        """
+        Entry point for the background task (or the inline execution).
+        With `debug`, the plans and timings of the KPI queries are stored too.
+        With `scope`, only the matching components and measurement types are read.
+        With `granularities`, the averages per bucket of each one are added.
+        """
+        profiler = JobProfiler()
         try:
-            # 1. EXTRACT
-            df = self._extract_data(start_date, end_date)
-
-            if df.is_empty():
-                self._update_db_status(report_id, "completed", None)
-                return
+            with profiler, count_reads() as reads:
+                # 1. EXTRACT
+                with profiler.stage("extract"):
+                    sampling = None
+                    if mode == ReportMode.PREVIEW:
+                        if estimated_rows is None:
+                            estimated_rows = self.estimate_rows(
+                                start_date, end_date, scope
+                            )
+                        stride = max(
+                            1, math.ceil(estimated_rows / self.PREVIEW_SAMPLE_ROWS)
+                        )
+                        sampling = ReportSampling(
+                            stride=stride, estimated_rows=estimated_rows, sampled_rows=0
+                        )
+                    df = self._extract_data(
+                        start_date, end_date, sampling.stride if sampling else 1, scope
+                    )
 
-            # 2. TRANSFORM (Domain Logic)
-            # We convert to lazy immediately to allow Polars to optimize
-            report_domain_model = self._transform_to_kpis(df.lazy())
+                # 2. TRANSFORM (Domain Logic)
+                # We convert to lazy immediately to allow Polars to optimize
+                results = query_profile = None
+                with profiler.stage("transform"):
+                    if not df.is_empty():
+                        if sampling:
+                            sampling.sampled_rows = df.height
+                        if debug:
+                            results, query_profile = self._profile_kpis(
+                                df.lazy(), sampling, granularities
+                            )
+                        else:
+                            results = self._collect_kpis(
+                                df.lazy(), sampling, granularities
+                            )
 
-            # 3. LOAD
-            self._update_db_status(report_id, "completed", report_domain_model)
+                # 3. LOAD (serialization, the write is accounted by its commit)
+                with profiler.stage("load"):
+                    result_json = (
+                        self._to_report_json(results, sampling) if results else None
+                    )
+            stats = JobStats(df.height, reads.bytes, profiler.summary())
+            self._update_db_status(
+                report_id,
+                "completed",
+                result_json,
+                stats,
+                query_profile=query_profile.model_dump_json()
+                if query_profile
+                else None,
+            )
         except Exception as e:
             logger.error(f"Task {report_id} failed: {e}", exc_info=True)
-            self._update_db_status(report_id, f"failed: {str(e)}", None)
+            self._update_db_status(report_id, "failed", error_message=str(e))
         finally:
             self.engine.dispose()
 
+    def _scope_filter(self, scope: ReportScope | None) -> ScopeFilter:
+        """
+        Resolve the component filters of a scope to the ids of the matching
+        components (on the substation and type indexes of the components).
+        """
+        if scope is None:
+            return None, None
+        component_ids = None
+        if scope.filters_components():
+            statement = select(ComponentDB.id)
+            if scope.substation:
+                statement = statement.where(
+                    col(ComponentDB.substation).in_(scope.substation)
+                )
+            if scope.component_type:
+                statement = statement.where(
+                    col(ComponentDB.component_type).in_(scope.component_type)
+                )
+            if scope.component_id:
+                statement = statement.where(col(ComponentDB.id).in_(scope.component_id))
+            with Session(self.engine) as session:
+                # NOTE: primary keys, never NULL (narrows the Optional of the model)
+                component_ids = [i for i in session.exec(statement) if i is not None]
+        measurement_types = scope.measurement_type
+        if component_ids is not None and measurement_types is None:
+            # NOTE: every type, so that the (component, type, timestamp) index
+            # serves the whole condition with a range scan per pair
+            measurement_types = list(MeasurementType)
+        return component_ids, measurement_types
+
+    @staticmethod
+    def _readings_query(start: datetime, end: datetime, scope_sql: str) -> str:
+        """Rows `n` to sum: one per reading, or one per chunk header."""
+        if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+            return f"""
+                SELECT count AS n FROM measurement_chunks
+                WHERE last_timestamp >= {sql_timestamp(start)}
+                  AND first_timestamp <= {sql_timestamp(end)}
+                {scope_sql}
+            """
+        return f"""
+            SELECT 1 AS n FROM measurements
+            WHERE timestamp BETWEEN {sql_timestamp(start)} AND {sql_timestamp(end)}
+            {scope_sql}
+        """
+
+    @staticmethod
+    def _rollups_query(start: datetime, end: datetime, scope_sql: str) -> str:
+        return f"""
+            SELECT 1 AS n FROM measurement_rollups
+            WHERE bucket_start BETWEEN {sql_timestamp(bucket_floor(start))}
+                                   AND {sql_timestamp(end)}
+            {scope_sql}
+        """
+
+    def _count(self, queries: list[str], limit: int | None = None) -> int:
+        """Sum of the `n` of the queries over the shards, stopping past `limit`."""
+        total = 0
+        for engine in shard_engines() if sharded() else [self.engine]:
+            with engine.connect() as conn:
+                for query in queries:
+                    # NOTE: every row counts at least 1, so limit + 1 rows of
+                    # what is left are enough to exceed the limit
+                    capped = "" if limit is None else f"LIMIT {limit - total + 1}"
+                    query = f"SELECT coalesce(sum(n), 0) FROM ({query} {capped})"
+                    total += conn.execute(text(query)).scalar_one()
+                    if limit is not None and total > limit:
+                        return total
+        return total
+
+    @timer
+    def estimate_rows(
+        self,
+        start: datetime,
+        end: datetime,
+        scope: ReportScope | None = None,
+        limit: int | None = None,
+    ) -> int:
+        """
+        Rows a report reads in the period: readings, counted on the timestamp
+        index (or chunk headers), and rollups (see db.rollups).
+        With `limit`, the count stops past `limit` rows, so it costs O(limit):
+        the result is exact up to `limit`, and greater than it otherwise.
+        """
+        scope_sql = _scope_sql(self._scope_filter(scope))
+        return self._count(
+            [
+                self._readings_query(start, end, scope_sql),
+                self._rollups_query(start, end, scope_sql),
+            ],
+            limit,
+        )
+
+    @timer
+    def extrapolate_rows(
+        self,
+        start: datetime,
+        end: datetime,
+        scope: ReportScope | None = None,
+        sample_rows: int = 10_000,
+    ) -> int:
+        """
+        Rows a report reads in the period, for a duration estimate. The raw
+        readings are counted in `SAMPLE_SLICES` time slices spread over the
+        period, widened until they hold `sample_rows` readings (or cover it),
+        and extrapolated: the cost is O(sample_rows) whatever the period.
+        Chunk headers and rollups are summaries, they are counted in full.
+        """
+        scope_sql = _scope_sql(self._scope_filter(scope))
+        summaries = [self._rollups_query(start, end, scope_sql)]
+        if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+            summaries.append(self._readings_query(start, end, scope_sql))
+            return self._count(summaries)
+
+        period = (end - start) / self.SAMPLE_SLICES
+        # Fraction of the period counted, multiplied by 4 at each round
+        fraction = 1 / 4**5
+        while fraction < 1:
+            slices = []
+            for i in range(self.SAMPLE_SLICES):
+                # NOTE: each slice at another phase of its stratum (golden ratio
+                # sequence), readings on a time grid would be hit or missed by
+                # evenly spaced slices; half-open, a reading counts once
+                phase = i + (i * 0.618_033_988_75) % 1 * (1 - fraction)
+                lower = sql_timestamp(start + phase * period)
+                upper = sql_timestamp(start + (phase + fraction) * period)
+                slices.append(
+                    f"""
+                    SELECT 1 AS n FROM measurements
+                    WHERE timestamp >= {lower} AND timestamp < {upper}
+                    {scope_sql}
+                    """
+                )
+            sampled = self._count(slices)
+            if sampled >= sample_rows:
+                return self._count(summaries) + round(sampled / fraction)
+            fraction *= 4
+        return self._count([*summaries, self._readings_query(start, end, scope_sql)])
+
     @timer
-    def _extract_data(self, start: datetime, end: datetime) -> pl.DataFrame:
-        """I/O Layer: Purely responsible for getting data out of SQLite."""
-        start_str = start.strftime('%Y-%m-%d %H:%M:%S')
-        end_str = end.strftime('%Y-%m-%d %H:%M:%S')
+    def _extract_data(
+        self,
+        start: datetime,
+        end: datetime,
+        stride: int = 1,
+        scope: ReportScope | None = None,
+    ) -> pl.DataFrame:
+        """
+        I/O Layer: Purely responsible for getting data out of SQLite.
+        With `stride` > 1, only a deterministic 1/stride sample is read.
+        With `scope`, the filters are part of the SQL query: the rows out of
+        the scope are never read (see the composite indexes of the readings).
+        With `settings.REPLICA_MAX_AGE_S` set, reads a replica (see db.replica).
+        """
+        scope_filter = self._scope_filter(scope)
+        if sharded() or settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+            return self._extract_fan_out(start, end, stride, scope_filter)
+
+        # NOTE: the sample filter only uses the row id, stored in the timestamp
+        # index, so the rows left out are never read from the table
+        # NOTE: the readings compacted into rollups (see db.rollups) are read
+        # as their means weighted by their counts, the raw readings weigh 1
+        # NOTE: the raw readings have an empty sketch rather than NULL, the
+        # ADBC driver types a column from its first rows
         query = f"""
-            SELECT m.component_id, m.value, m.measurement_type, m.timestamp,
-                   c.component_type, c.voltage_kv, c.capacity_mva, c.length_km
+            SELECT m.component_id, m.value, 1 AS weight, X'' AS sketch,
+                   m.measurement_type,
+                   m.timestamp, c.component_type, c.substation, c.voltage_kv,
+                   c.capacity_mva, c.length_km
             FROM measurements m
             JOIN components c ON m.component_id = c.id
-            WHERE m.timestamp BETWEEN '{start_str}' AND '{end_str}'
+            WHERE m.timestamp BETWEEN {sql_timestamp(start)} AND {sql_timestamp(end)}
+            {_scope_sql(scope_filter, "m")}
+            {_sample_filter(stride)}
+            UNION ALL
+            SELECT r.component_id, r.value_sum / r.value_count, r.value_count,
+                   coalesce(r.sketch, X''), r.measurement_type, r.bucket_start, c.component_type,
+                   c.substation, c.voltage_kv, c.capacity_mva, c.length_km
+            FROM measurement_rollups r
+            JOIN components c ON r.component_id = c.id
+            WHERE r.bucket_start BETWEEN {sql_timestamp(bucket_floor(start))}
+                                     AND {sql_timestamp(end)}
+            {_scope_sql(scope_filter, "r")}
         """
         # NOTE: DOES NOT work
         # TODO: SQLAlchemy and SQLModel differs in the exec/execution
@@ -86,7 +429,10 @@ class ReportService:
 
         # NOTE: works
         logger.debug(f"Report service extracting from db URI: {self.db_uri}")
-        df = pl.read_database_uri(query=query, uri=self.db_uri, engine="adbc")
+        df = read_database_adbc(query, replica_engine(self.engine))
+        if not df.is_empty():
+            # NOTE: epoch storage lands as integers, cast without string parsing
+            df = df.with_columns(parse_timestamp())
 
         # NOTE: works
         # df = pl.read_database(query=text(query), connection=self.engine)
@@ -94,54 +440,335 @@ class ReportService:
         logger.info(f"Extraction complete. Rows: {df.height}, Columns: {df.width}")
         return df
 
+    def _read_measurements(
+        self,
+        engine: Engine,
+        start: datetime,
+        end: datetime,
+        stride: int = 1,
+        scope_filter: ScopeFilter = (None, None),
+    ) -> pl.DataFrame:
+        """
+        I/O Layer: the measurements of one shard (or database), without join,
+        raw (weight 1) and rolled up (see db.rollups).
+        """
+        if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+            df = ChunkStore.read(engine, start, end, *scope_filter).gather_every(stride)
+        else:
+            query = f"""
+                SELECT m.component_id, m.measurement_type, m.timestamp, m.value
+                FROM measurements m
+                WHERE m.timestamp BETWEEN {sql_timestamp(start)}
+                                      AND {sql_timestamp(end)}
+                {_scope_sql(scope_filter, "m")}
+                {_sample_filter(stride)}
+            """
+            df = read_database_adbc(query, engine)
+            if df.is_empty():
+                df = pl.DataFrame(schema=MEASUREMENT_SCHEMA)
+            else:
+                df = df.with_columns(parse_timestamp()).cast(MEASUREMENT_SCHEMA)
+        return pl.concat(
+            [
+                df.with_columns(weight=pl.lit(1, pl.Int64), sketch=pl.lit(b"")),
+                read_rollups(engine, start, end, *scope_filter),
+            ]
+        )
+
+    @timer
+    def _extract_fan_out(
+        self,
+        start: datetime,
+        end: datetime,
+        stride: int = 1,
+        scope_filter: ScopeFilter = (None, None),
+    ) -> pl.DataFrame:
+        """
+        I/O Layer: same columns as `_extract_data`, with the measurements read
+        from every shard in parallel (the drivers release the GIL), then
+        joined with the components of the main database.
+        """
+        # NOTE: the replicas (if any) are refreshed once per extraction
+        main = replica_engine(self.engine)
+        engines = (
+            [replica_engine(engine) for engine in shard_engines()]
+            if sharded()
+            else [main]
+        )
+        with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+            # NOTE: in a copy of the context, to account the reads to the job
+            futures = [
+                pool.submit(
+                    copy_context().run,
+                    self._read_measurements,
+                    engine,
+                    start,
+                    end,
+                    stride,
+                    scope_filter,
+                )
+                for engine in engines
+            ]
+            frames = [future.result() for future in futures]
+        components = read_database_adbc(
+            """
+            SELECT id AS component_id, component_type, substation, voltage_kv,
+                   capacity_mva, length_km
+            FROM components
+            """,
+            main,
+        )
+        df = pl.concat(frames, rechunk=False).join(
+            components.with_columns(pl.col("component_id").cast(pl.Int64)),
+            on="component_id",
+        )
+        logger.info(
+            f"Extraction complete from {len(engines)} shards. "
+            f"Rows: {df.height}, Columns: {df.width}"
+        )
+        return df
+
     @timer
-    def _transform_to_kpis(self, ldf: pl.LazyFrame) -> FinalReportSchema:
+    def _transform_to_kpis(
+        self,
+        ldf: pl.LazyFrame,
+        sampling: ReportSampling | None = None,
+        granularities: list[ReportGranularity] | None = None,
+    ) -> FinalReportSchema:
         """
         Domain Layer: Pure transformation logic.
         Takes a LazyFrame, returns a Pydantic Domain Model.
+        With `sampling`, the daily averages come with their sample size and
+        95% confidence interval.
+        """
+        results = self._collect_kpis(ldf, sampling, granularities)
+        return self._to_report(results, sampling)
+
+    def _collect_kpis(
+        self,
+        ldf: pl.LazyFrame,
+        sampling: ReportSampling | None = None,
+        granularities: list[ReportGranularity] | None = None,
+    ) -> list[pl.DataFrame]:
+        # COLLECT: One single execution for all computations
+        # Polars runs these in parallel where possible
+        return pl.collect_all(
+            self._kpi_queries(ldf, sampling, granularities=granularities)
+        )
+
+    def _kpi_queries(
+        self,
+        ldf: pl.LazyFrame,
+        sampling: ReportSampling | None = None,
+        by: list[str] | None = None,
+        granularities: list[ReportGranularity] | None = None,
+    ) -> list[pl.LazyFrame]:
+        """
+        The lazy KPI computations, in the order of `_to_report`.
+        With `by`, every KPI is computed per group of these columns.
         """
+        by = by or []
+
         # Schema Normalization
         schema = ldf.collect_schema()
         logger.debug(f"Extracted schema: {schema}")
 
-        # Check the type using the collected schema
+        # Check the type using the collected schema (already parsed when extracted)
         if schema["timestamp"] == pl.String:
             ldf = ldf.with_columns(pl.col("timestamp").str.to_datetime())
 
         # Logic for unique components (metadata)
-        unique_ldf = ldf.unique(subset=["component_id"])
+        unique_ldf = ldf.unique(subset=[*by, "component_id"])
 
         # Define the computations (Lazy)
-        count_by_type = unique_ldf.group_by("component_type").agg(
-            pl.len().alias("count")
+        # NOTE: sorted, the groups come out of group_by in any order
+        count_by_type = (
+            unique_ldf.group_by([*by, "component_type"])
+            .agg(pl.len().alias("count"))
+            .sort([*by, "component_type"])
         )
 
         trans_cap = (
             unique_ldf.filter(
                 pl.col("component_type") == ComponentType.TRANSFORMER.value
             )
-            .group_by("voltage_kv")
+            .group_by([*by, "voltage_kv"])
             .agg(pl.col("capacity_mva").sum().alias("total_capacity_mva"))
+            .sort([*by, "voltage_kv"])
         )
 
         line_len = (
             unique_ldf.filter(pl.col("component_type") == ComponentType.LINE.value)
-            .group_by("voltage_kv")
+            .group_by([*by, "voltage_kv"])
             .agg(pl.col("length_km").sum().alias("total_length_km"))
+            .sort([*by, "voltage_kv"])
         )
 
+        # Rolled up readings weigh their count, see db.rollups
+        if "weight" not in schema:
+            ldf = ldf.with_columns(weight=pl.lit(1, pl.Int64))
+        weighted_mean = (pl.col("value") * pl.col("weight")).sum() / pl.col(
+            "weight"
+        ).sum()
+        daily_aggs = [weighted_mean.alias("avg_value")]
+        if sampling:
+            # Normal approximation with the finite population correction of
+            # a 1/stride sample: the interval is empty when nothing is left out.
+            # A rollup is one mean weighing its count: weighted variance over
+            # the effective sample size (Kish), i.e. std / sqrt(n) unweighted
+            fpc = math.sqrt(1 - 1 / sampling.stride)
+            weight = pl.col("weight")
+            weighted_var = (weight * (pl.col("value") - weighted_mean) ** 2).sum() / (
+                weight.sum()
+            )
+            effective_size = weight.sum() ** 2 / (weight**2).sum()
+            half_width = (
+                pl.when(effective_size > 1)
+                .then(self.Z_95 * fpc * (weighted_var / (effective_size - 1)).sqrt())
+                .otherwise(0.0)
+            )
+            daily_aggs += [
+                pl.len().alias("sample_size"),
+                (weighted_mean - half_width).alias("ci_low"),
+                (weighted_mean + half_width).alias("ci_high"),
+            ]
+        # Quantile sketches (see db.sketches): the raw readings are binned,
+        # the rollups bring the bins of the readings they replace
+        if "sketch" not in schema:
+            ldf = ldf.with_columns(sketch=pl.lit(b""))
+        daily_keys = [*by, "day", "measurement_type", "component_type"]
+        dated = ldf.with_columns(pl.col("timestamp").dt.truncate("1d").alias("day"))
+        raw = pl.col("sketch").bin.size() == 0
+        daily_bins = pl.concat(
+            [
+                dated.filter(raw).select(
+                    *daily_keys, bin=sketch_bin(pl.col("value")), count="weight"
+                ),
+                dated.filter(~raw)
+                .select(*daily_keys, bins=sketch_bins(pl.col("sketch")))
+                .explode("bins")
+                .unnest("bins"),
+            ]
+        )
         daily_avg = (
-            ldf.with_columns(pl.col("timestamp").dt.truncate("1d").alias("day"))
-            .group_by(["day", "measurement_type", "component_type"])
-            .agg(pl.col("value").mean().alias("avg_value"))
-            .sort(["day", "component_type"])
+            dated.group_by(daily_keys)
+            .agg(daily_aggs)
+            .join(
+                quantiles(daily_bins, daily_keys).drop("count"),
+                on=daily_keys,
+                how="left",
+            )
+            .sort([*by, "day", "component_type", "measurement_type"])
+        )
+        # The day sketches merged over the whole period
+        value_quantiles = quantiles(
+            daily_bins, [*by, "measurement_type", "component_type"]
+        ).sort([*by, "measurement_type", "component_type"])
+        substation_avg = (
+            ldf.group_by([*by, "substation", "measurement_type"])
+            .agg(
+                pl.col("component_id").n_unique().alias("component_count"),
+                weighted_mean.alias("avg_value"),
+            )
+            .sort([*by, "substation", "measurement_type"])
         )
+        return [
+            count_by_type,
+            trans_cap,
+            line_len,
+            daily_avg,
+            substation_avg,
+            value_quantiles,
+            self._bucket_averages(ldf, by, granularities or []),
+        ]
 
-        # COLLECT: One single execution for all computations
-        # Polars runs these in parallel where possible
-        results = pl.collect_all([count_by_type, trans_cap, line_len, daily_avg])
+    @staticmethod
+    def _bucket_averages(
+        ldf: pl.LazyFrame, by: list[str], granularities: list[ReportGranularity]
+    ) -> pl.LazyFrame:
+        """
+        The averages per bucket of every granularity, finest first: the
+        readings are summed and counted once per bucket of the finest one,
+        the coarser buckets are rolled up from these partial aggregates.
+        NOTE: the rollups (see db.rollups) count at the start of their bucket.
+        """
+        keys = [*by, "bucket", "measurement_type", "component_type"]
+        # Ordered finest first, each bucket is a union of buckets of the finer ones
+        granularities = [g for g in ReportGranularity if g in granularities]
+        if not granularities:
+            schema = ldf.collect_schema()
+            return pl.LazyFrame(
+                schema={
+                    **{column: schema[column] for column in by},
+                    "granularity": pl.String,
+                    "bucket": schema["timestamp"],
+                    "measurement_type": schema["measurement_type"],
+                    "component_type": schema["component_type"],
+                    "avg_value": pl.Float64,
+                    "count": pl.Int64,
+                }
+            )
+        finest = (
+            ldf.with_columns(
+                bucket=pl.col("timestamp").dt.truncate(granularities[0].value)
+            )
+            .group_by(keys)
+            .agg(
+                (pl.col("value") * pl.col("weight")).sum().alias("value_sum"),
+                pl.col("weight").sum().alias("count"),
+            )
+        )
+        return pl.concat(
+            [
+                finest.with_columns(pl.col("bucket").dt.truncate(granularity.value))
+                .group_by(keys)
+                .agg(pl.col("value_sum").sum(), pl.col("count").sum())
+                .select(
+                    *by,
+                    pl.lit(granularity.value).alias("granularity"),
+                    "bucket",
+                    "measurement_type",
+                    "component_type",
+                    (pl.col("value_sum") / pl.col("count")).alias("avg_value"),
+                    pl.col("count").cast(pl.Int64),
+                )
+                .sort(keys)
+                for granularity in granularities
+            ]
+        )
+
+    def _profile_kpis(
+        self,
+        ldf: pl.LazyFrame,
+        sampling: ReportSampling | None = None,
+        granularities: list[ReportGranularity] | None = None,
+    ) -> tuple[list[pl.DataFrame], QueryProfile]:
+        """
+        Debug variant of `_collect_kpis`: the KPI queries run one by one,
+        profiled, and their optimized plans are captured.
+        """
+        queries = self._kpi_queries(ldf, sampling, granularities=granularities)
+        results, profiles = [], []
+        for name, query in zip(KPI_QUERIES, queries, strict=True):
+            start = time.perf_counter()
+            result, nodes = _profile_query(query)
+            results.append(result)
+            profiles.append(
+                KpiQueryProfile(
+                    name=name,
+                    plan=query.explain(),
+                    wall_s=time.perf_counter() - start,
+                    nodes=nodes,
+                )
+            )
+        profile = QueryProfile(combined_plan=pl.explain_all(queries), queries=profiles)
+        return results, profile
 
-        # Map back to Domain Model
+    @staticmethod
+    def _to_report(
+        results: list[pl.DataFrame], sampling: ReportSampling | None = None
+    ) -> FinalReportSchema:
+        """Map the collected KPIs back to the Domain Model."""
         return FinalReportSchema(
             summary={
                 "components_by_type": results[0].to_dicts(),
@@ -151,11 +778,165 @@ class ReportService:
             daily_averages=results[3]
             .with_columns(pl.col("day").dt.to_string("%Y-%m-%d"))
             .to_dicts(),
+            substation_averages=results[4].to_dicts(),
+            value_quantiles=results[5].to_dicts(),
+            quantile_accuracy=RELATIVE_ACCURACY,
+            bucket_averages=[
+                {"granularity": granularity, "averages": averages.to_dicts()}
+                for (granularity,), averages in results[6]
+                .partition_by("granularity", as_dict=True, include_key=False)
+                .items()
+            ],
+            sampling=sampling,
+        )
+
+    @staticmethod
+    def _to_report_json(
+        results: list[pl.DataFrame], sampling: ReportSampling | None = None
+    ) -> str:
+        """
+        The JSON of `_to_report(results, sampling)`, byte for byte, written
+        from the frames (see core.serialization) without a model per row.
+        """
+        bucket_averages = ",".join(
+            model_json(
+                GranularityAverages,
+                {
+                    "granularity": to_json(granularity).decode(),
+                    "averages": frame_json(averages, BucketAverage),
+                },
+            )
+            for (granularity,), averages in results[6]
+            .partition_by("granularity", as_dict=True, include_key=False)
+            .items()
+        )
+        return model_json(
+            FinalReportSchema,
+            {
+                "summary": model_json(
+                    ReportSummary,
+                    {
+                        "components_by_type": frame_json(
+                            results[0], ComponentTypeCount
+                        ),
+                        "transformer_capacity_by_voltage": frame_json(
+                            results[1], TransformerCapacity
+                        ),
+                        "line_length_by_voltage": frame_json(results[2], LineLength),
+                    },
+                ),
+                "daily_averages": frame_json(results[3], DailyAverage),
+                "substation_averages": frame_json(results[4], SubstationAverage),
+                "value_quantiles": frame_json(results[5], ValueQuantiles),
+                "quantile_accuracy": to_json(RELATIVE_ACCURACY).decode(),
+                "bucket_averages": f"[{bucket_averages}]",
+                "sampling": sampling.model_dump_json() if sampling else "null",
+            },
+        )
+
+    @staticmethod
+    def _tag_windows(
+        df: pl.DataFrame, windows: list[tuple[int, datetime, datetime]]
+    ) -> pl.DataFrame:
+        """
+        One row per (reading, window containing it), the window identified by
+        its report id. Overlapping windows duplicate their common readings.
+        """
+        bounds = pl.DataFrame(
+            {
+                "report_id": [report_id for report_id, _, _ in windows],
+                "window_start": [to_utc(start) for _, start, _ in windows],
+                "window_end": [to_utc(end) for _, _, end in windows],
+            },
+            schema={
+                "report_id": pl.Int64,
+                "window_start": pl.Datetime("us", "UTC"),
+                "window_end": pl.Datetime("us", "UTC"),
+            },
         )
+        # NOTE: inequality join (IEJoin), vectorized and without the cross product
+        return df.join_where(
+            bounds,
+            pl.col("timestamp") >= pl.col("window_start"),
+            pl.col("timestamp") <= pl.col("window_end"),
+        ).drop("window_start", "window_end")
+
+    @timer
+    def run_batch_report_task(
+        self,
+        windows: list[tuple[int, datetime, datetime]],
+        scope: ReportScope | None = None,
+    ):
+        """
+        Entry point for the background task of a batch of reports, one per
+        (report_id, start_date, end_date) window: the union range is extracted
+        once and the KPIs of all windows are computed in a single execution.
+        The `scope` applies to every window.
+        """
+        report_ids = [report_id for report_id, _, _ in windows]
+        profiler = JobProfiler()
+        try:
+            with profiler, count_reads() as reads:
+                # 1. EXTRACT
+                with profiler.stage("extract"):
+                    df = self._extract_data(
+                        min(start for _, start, _ in windows),
+                        max(end for _, _, end in windows),
+                        scope=scope,
+                    )
+
+                # 2. TRANSFORM
+                reports: dict[int, list[pl.DataFrame]] = {}
+                with profiler.stage("transform"):
+                    tagged = self._tag_windows(df, windows) if not df.is_empty() else df
+                    if not tagged.is_empty():
+                        reports = self._transform_windows(tagged)
+
+                # 3. LOAD (serialization, the writes are accounted by their commit)
+                with profiler.stage("load"):
+                    results = {
+                        report_id: self._to_report_json(report)
+                        for report_id, report in reports.items()
+                    }
+            stats = JobStats(df.height, reads.bytes, profiler.summary())
+            for report_id in report_ids:
+                self._update_db_status(
+                    report_id, "completed", results.get(report_id), stats
+                )
+        except Exception as e:
+            logger.exception(f"Batch {report_ids} failed")
+            for report_id in report_ids:
+                self._update_db_status(report_id, "failed", error_message=str(e))
+        finally:
+            self.engine.dispose()
+
+    def _transform_windows(self, tagged: pl.DataFrame) -> dict[int, list[pl.DataFrame]]:
+        """The KPI frames of every window of the tagged readings, in one execution."""
+        results = pl.collect_all(self._kpi_queries(tagged.lazy(), by=["report_id"]))
+        per_window = [
+            result.partition_by("report_id", as_dict=True, maintain_order=True)
+            for result in results
+        ]
+        empty = [result.clear().drop("report_id") for result in results]
+        return {
+            report_id: [
+                partitions[(report_id,)].drop("report_id")
+                if (report_id,) in partitions
+                else empty[i]
+                for i, partitions in enumerate(per_window)
+            ]
+            for report_id in tagged["report_id"].unique()
+        }
 
     @timer
     def _update_db_status(
-        self, report_id: int, status: str, report: FinalReportSchema | None
+        self,
+        report_id: int,
+        status: str,
+        result_json: str | None = None,
+        stats: JobStats | None = None,
+        error_message: str | None = None,
+        query_profile: str | None = None,
     ):
         """Storage Layer: Persistence logic."""
         logger.debug(f"Report Service updating to db: {self.engine.url}")
@@ -163,7 +944,12 @@ class ReportService:
             db_report = session.get(ReportDB, report_id)
             if db_report:
                 db_report.status = status
-                if report:
-                    db_report.result_json = report.model_dump_json()
+                db_report.result_json = result_json
+                db_report.error_message = error_message
+                db_report.query_profile = query_profile
+                if stats:
+                    db_report.sqlmodel_update(stats.columns())
                 session.add(db_report)
                 session.commit()
+        # Wake up the requests waiting for the report (long-poll, SSE)
+        report_notifier.notify(report_id)
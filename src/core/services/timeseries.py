@@ -0,0 +1,192 @@
+"""
+Server-side downsampling of a component measurement series.
+
+The raw series of one (component, measurement type) over a time range is read
+through the (component_id, measurement_type, timestamp) index (or decoded from
+its chunks, see db.chunks) and reduced to a bounded number of points, either
+as fixed-width buckets (min/avg/max) or with the Largest-Triangle-Three-Buckets
+algorithm, which keeps the visual shape. The ranges compacted into rollups
+(see db.rollups) come at the resolution of the rollups: one reading per
+rollup bucket, its mean weighted by its count, with its min and max.
+REF: https://skemman.is/bitstream/1946/15343/3/SS_MSthesis.pdf (LTTB)
+"""
+
+import math
+from datetime import datetime, timedelta
+
+import numpy as np
+import polars as pl
+from sqlalchemy import Engine
+
+from core.models import DownsamplingMode, MeasurementType
+from core.utils import get_logger, timer
+from db.chunks import ChunkStore
+from db.config import MeasurementStorage, settings
+from db.instrumentation import read_database_adbc
+from db.rollups import bucket_floor
+from db.shards import measurement_engines
+from db.timestamps import parse_timestamp, sql_timestamp, to_utc
+
+logger = get_logger("app", "DEBUG")
+
+# Raw readings weigh 1 and are their own min and max
+SERIES_SCHEMA = pl.Schema(
+    {
+        "timestamp": pl.Datetime("us", "UTC"),
+        "value": pl.Float64,
+        "weight": pl.Int64,
+        "min": pl.Float64,
+        "max": pl.Float64,
+    }
+)
+
+
+class TimeSeriesService:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    @timer
+    def read_series(
+        self,
+        component_id: int,
+        measurement_type: MeasurementType,
+        start: datetime,
+        end: datetime,
+    ) -> pl.DataFrame:
+        """
+        I/O Layer: readings and rollups (`SERIES_SCHEMA`) sorted by time. The
+        rollup of the bucket holding `start` is included, at its bucket start.
+        """
+        engine = next(iter(measurement_engines([component_id], self.engine)))
+        series = f"""
+            component_id = {int(component_id)}
+            AND measurement_type = '{MeasurementType(measurement_type).value}'
+        """
+        rollups = read_database_adbc(
+            f"""
+            SELECT bucket_start AS timestamp, value_sum / value_count AS value,
+                   value_count AS weight, value_min AS min, value_max AS max
+            FROM measurement_rollups
+            WHERE {series}
+              AND bucket_start BETWEEN {sql_timestamp(bucket_floor(start))}
+                                   AND {sql_timestamp(end)}
+            """,
+            engine,
+        )
+        frames = []
+        if not rollups.is_empty():
+            frames.append(rollups.with_columns(parse_timestamp()).cast(SERIES_SCHEMA))
+        if settings.MEASUREMENT_STORAGE == MeasurementStorage.CHUNKS:
+            readings = ChunkStore.read(
+                engine, start, end, [component_id], [measurement_type]
+            )
+        else:
+            readings = read_database_adbc(
+                f"""
+                SELECT timestamp, value
+                FROM measurements
+                WHERE {series}
+                  AND timestamp BETWEEN {sql_timestamp(start)} AND {sql_timestamp(end)}
+                """,
+                engine,
+            )
+            if not readings.is_empty():
+                readings = readings.with_columns(parse_timestamp())
+        if not readings.is_empty():
+            value = pl.col("value").cast(pl.Float64)
+            frames.append(
+                readings.select(
+                    "timestamp",
+                    value,
+                    pl.lit(1, pl.Int64).alias("weight"),
+                    value.alias("min"),
+                    value.alias("max"),
+                )
+            )
+        if not frames:
+            return pl.DataFrame(schema=SERIES_SCHEMA)
+        return pl.concat(frames).sort("timestamp")
+
+    @staticmethod
+    def bucket(
+        df: pl.DataFrame, start: datetime, end: datetime, points: int
+    ) -> pl.DataFrame:
+        """
+        Fixed-width buckets over [start, end] with min/avg/max and count of
+        the readings, a rollup counting as its readings.
+        """
+        start = to_utc(start)
+        span_us = (to_utc(end) - start) // timedelta(microseconds=1)
+        width_us = max(1, math.ceil(span_us / points))
+        offset = (pl.col("timestamp") - pl.lit(start)).dt.total_microseconds()
+        # NOTE: rows exactly on `end` belong to the last bucket, the rollup of
+        # a bucket started before `start` to the first one
+        bucket = (offset // width_us).clip(0, points - 1)
+        weight = pl.col("weight")
+        return (
+            df.lazy()
+            .group_by(bucket.alias("bucket"))
+            .agg(
+                pl.col("min").min(),
+                ((pl.col("value") * weight).sum() / weight.sum()).alias("avg"),
+                pl.col("max").max(),
+                weight.sum().alias("count"),
+            )
+            .sort("bucket")
+            .select(
+                (
+                    pl.lit(start)
+                    + pl.duration(microseconds=pl.col("bucket") * width_us)
+                ).alias("timestamp"),
+                "min",
+                "avg",
+                "max",
+                "count",
+            )
+            .collect()
+        )
+
+    @staticmethod
+    def lttb(df: pl.DataFrame, points: int) -> pl.DataFrame:
+        """Largest-Triangle-Three-Buckets on a time-sorted series."""
+        n = df.height
+        if points >= n or points < 3:
+            return df.select("timestamp", "value")
+
+        # NOTE: relative time in float64 keeps the triangle areas precise
+        t = df["timestamp"].dt.epoch("us").to_numpy()
+        x = (t - t[0]).astype(np.float64)
+        y = df["value"].to_numpy()
+
+        # First and last points are kept, the rest is split in points - 2 buckets
+        edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+        selected = np.empty(points, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        a = 0
+        for i in range(points - 2):
+            lo, hi = edges[i], edges[i + 1]
+            next_hi = edges[i + 2] if i + 2 < len(edges) else n
+            avg_x, avg_y = x[hi:next_hi].mean(), y[hi:next_hi].mean()
+            area = np.abs(
+                (x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a])
+            )
+            a = lo + int(area.argmax())
+            selected[i + 1] = a
+        return df.select("timestamp", "value")[selected]
+
+    def downsample(
+        self,
+        component_id: int,
+        measurement_type: MeasurementType,
+        start: datetime,
+        end: datetime,
+        points: int,
+        mode: DownsamplingMode,
+    ) -> tuple[int, pl.DataFrame]:
+        """Return the count of readings and the downsampled series."""
+        df = self.read_series(component_id, measurement_type, start, end)
+        readings = int(df["weight"].sum())
+        logger.debug(f"Downsampling {df.height} rows to {points} points ({mode.value})")
+        if mode == DownsamplingMode.LTTB:
+            return readings, self.lttb(df, points)
+        return readings, self.bucket(df, start, end, points)
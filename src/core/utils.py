@@ -3,6 +3,7 @@ import os
 import platform
 import sys
 import time
+from collections.abc import Callable
 from typing import Final, Literal
 
 from colorama import Fore, Style
@@ -148,10 +149,12 @@ def get_logger(
     return logger
 
 
-def timer(func, logger_name: str = "profiler", logger_level: int = PROFILE):
+def timer[**P, R](
+    func: Callable[P, R], logger_name: str = "profiler", logger_level: int = PROFILE
+) -> Callable[P, R]:
     logger = get_logger(logger_name, logger_level)
 
-    def wrapper(*args, **kwargs):
+    def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
         start_time = time.perf_counter()
         try:
             result = func(*args, **kwargs)
@@ -1,6 +1,8 @@
 from sqlmodel import SQLModel, create_engine, Session
 from sqlalchemy import Engine
 from db.config import settings
+from db.instrumentation import instrument_engine
+from db.schema import create_schema
 
 # NOTE: using a dict to store the singleton engine but can be hot-swapped, e.g. testing
 _engine_container: dict[str, Engine] = {"engine": None}
@@ -9,8 +11,8 @@ _engine_container: dict[str, Engine] = {"engine": None}
 def get_engine():
     if _engine_container["engine"] is None:
         # This will use whatever URI is currently set in config
-        _engine_container["engine"] = create_engine(
-            settings.URI, connect_args={"check_same_thread": False}
+        _engine_container["engine"] = instrument_engine(
+            create_engine(settings.URI, connect_args={"check_same_thread": False})
         )
     return _engine_container["engine"]
 
@@ -23,7 +25,21 @@ def get_session():
 
 def reset_engine():
     _engine_container["engine"] = None
+    # NOTE: late import, the shards depend on this module
+    from db.replica import reset_replicas
+    from db.shards import reset_shard_engines
+
+    reset_shard_engines()
+    reset_replicas()
 
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(get_engine())
+    """
+    Create the tables of a new database (and of its shards). Existing
+    databases must be at the current schema version, see db.schema.
+    """
+    create_schema(get_engine(), SQLModel.metadata.sorted_tables)
+
+    from db.shards import create_shard_tables
+
+    create_shard_tables()
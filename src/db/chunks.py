@@ -0,0 +1,255 @@
+"""
+Compressed time-series chunk storage of the measurements.
+
+Readings of one (component, measurement type) falling in the same fixed time
+bucket (`settings.CHUNK_SECONDS`) are stored together in one row:
+- timestamps: microseconds since the epoch, delta-of-delta encoded (regular
+  sampling yields runs of zeros), zigzag mapped to unsigned
+- values: float64 bit patterns XOR-ed with the previous value, as in Gorilla
+  (REF: https://www.vldb.org/pvldb/vol8/p1816-teller.pdf); the bit-level
+  leading/trailing zeros packing is replaced by a byte shuffle and zlib,
+  which compresses the same redundancy and vectorizes with NumPy
+
+The decode of a whole chunk is a handful of array operations, with no
+per-sample Python code.
+"""
+
+import threading
+import zlib
+from collections.abc import Sequence
+from datetime import datetime
+
+import numpy as np
+import polars as pl
+from sqlalchemy import Engine
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from core.models import MeasurementType
+from db.config import settings
+from db.instrumentation import read_database_adbc
+from db.models import MeasurementChunkDB
+from db.timestamps import from_epoch_us, sql_timestamp, to_utc
+
+MEASUREMENT_SCHEMA = pl.Schema(
+    {
+        "component_id": pl.Int64,
+        "measurement_type": pl.String,
+        "timestamp": pl.Datetime("us", "UTC"),
+        "value": pl.Float64,
+    }
+)
+
+
+def measurement_filters(
+    component_ids: Sequence[int] | None = None,
+    measurement_types: Sequence[MeasurementType] | None = None,
+    alias: str = "",
+) -> list[str]:
+    """
+    SQL conditions restricting measurement rows (or chunks, rollups) to some
+    components and types, None meaning all. An empty sequence matches nothing.
+    """
+    prefix = f"{alias}." if alias else ""
+    filters = []
+    if component_ids is not None:
+        ids = ", ".join(str(int(i)) for i in component_ids) or "NULL"
+        filters.append(f"{prefix}component_id IN ({ids})")
+    if measurement_types is not None:
+        types = ", ".join(f"'{MeasurementType(t).value}'" for t in measurement_types)
+        filters.append(f"{prefix}measurement_type IN ({types or 'NULL'})")
+    return filters
+
+
+class DuplicateMeasurementError(Exception):
+    """A reading already exists for this component, type and timestamp."""
+
+
+# --- Codec ---
+def _shuffle(words: np.ndarray) -> bytes:
+    """Group the bytes by significance, so that zlib sees the zero runs."""
+    return np.ascontiguousarray(words.view(np.uint8).reshape(-1, 8).T).tobytes()
+
+
+def _unshuffle(data: bytes) -> np.ndarray:
+    matrix = np.frombuffer(data, dtype=np.uint8).reshape(8, -1)
+    return np.ascontiguousarray(matrix.T).view(np.uint64).ravel()
+
+
+def encode_timestamps(timestamps_us: np.ndarray) -> bytes:
+    """Sorted epoch microseconds -> [first, first delta, deltas of deltas...]."""
+    t = np.asarray(timestamps_us, dtype=np.int64)
+    words = np.concatenate([t[:1], np.diff(t[:2]), np.diff(t, n=2)])
+    zigzag = (words << 1) ^ (words >> 63)
+    return zlib.compress(_shuffle(zigzag.view(np.uint64)))
+
+
+def decode_timestamps(data: bytes) -> np.ndarray:
+    zigzag = _unshuffle(zlib.decompress(data))
+    words = (zigzag >> np.uint64(1)).view(np.int64) ^ -(zigzag & np.uint64(1)).view(
+        np.int64
+    )
+    if len(words) < 2:
+        return words
+    deltas = np.cumsum(words[1:])
+    return np.concatenate([words[:1], words[0] + np.cumsum(deltas)])
+
+
+def encode_values(values: np.ndarray) -> bytes:
+    bits = np.asarray(values, dtype=np.float64).view(np.uint64)
+    xored = bits.copy()
+    xored[1:] ^= bits[:-1]
+    return zlib.compress(_shuffle(xored))
+
+
+def decode_values(data: bytes) -> np.ndarray:
+    return np.bitwise_xor.accumulate(_unshuffle(zlib.decompress(data))).view(np.float64)
+
+
+# --- Storage ---
+def _upsert_statement():
+    statement = insert(MeasurementChunkDB)
+    return statement.on_conflict_do_update(
+        index_elements=["component_id", "measurement_type", "bucket_start"],
+        set_={
+            c: statement.excluded[c]
+            for c in (
+                "first_timestamp",
+                "last_timestamp",
+                "count",
+                "timestamp_data",
+                "value_data",
+            )
+        },
+    )
+
+
+class ChunkStore:
+    """Append and read measurements stored as compressed chunks."""
+
+    # NOTE: appends are read-modify-write, serialized within the process
+    _append_lock = threading.Lock()
+
+    def __init__(self, chunk_seconds: int | None = None):
+        self.chunk_us = (chunk_seconds or settings.CHUNK_SECONDS) * 1_000_000
+
+    def append(self, session: Session, df: pl.DataFrame) -> int:
+        """
+        Merge new readings (component_id, measurement_type, timestamp, value)
+        into their chunks, in a single transaction.
+
+        Raises:
+            DuplicateMeasurementError: if a reading already exists (nothing is written)
+
+        Returns:
+            Number of appended readings
+        """
+        df = df.select(
+            pl.col("component_id").cast(pl.Int64),
+            pl.col("measurement_type").cast(pl.String),
+            pl.col("timestamp").dt.convert_time_zone("UTC").dt.epoch("us"),
+            pl.col("value").cast(pl.Float64),
+        ).with_columns(bucket=pl.col("timestamp") - pl.col("timestamp") % self.chunk_us)
+        key = pl.struct("component_id", "measurement_type", "timestamp")
+        if df.select(key.is_duplicated().any()).item():
+            raise DuplicateMeasurementError("Duplicated readings in the batch.")
+
+        with self._append_lock:
+            try:
+                rows = [
+                    self._merge(session, component_id, measurement_type, bucket, group)
+                    for (component_id, measurement_type, bucket), group in df.group_by(
+                        "component_id", "measurement_type", "bucket"
+                    )
+                ]
+                if rows:
+                    session.execute(_upsert_statement(), rows)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        return df.height
+
+    @staticmethod
+    def _merge(
+        session: Session,
+        component_id: int,
+        measurement_type: str,
+        bucket: int,
+        group: pl.DataFrame,
+    ) -> dict:
+        """New content of a chunk: the stored readings plus `group`, sorted."""
+        t = group["timestamp"].to_numpy()
+        v = group["value"].to_numpy()
+        chunk = session.exec(
+            select(MeasurementChunkDB).where(
+                MeasurementChunkDB.component_id == component_id,
+                MeasurementChunkDB.measurement_type == measurement_type,
+                MeasurementChunkDB.bucket_start == from_epoch_us(bucket),
+            )
+        ).first()
+        if chunk:
+            stored_t = decode_timestamps(chunk.timestamp_data)
+            if np.isin(t, stored_t).any():
+                raise DuplicateMeasurementError(
+                    "Measurement already exists for this timestamp and type."
+                )
+            t = np.concatenate([stored_t, t])
+            v = np.concatenate([decode_values(chunk.value_data), v])
+        order = np.argsort(t, kind="stable")
+        t, v = t[order], v[order]
+        return {
+            "component_id": component_id,
+            "measurement_type": MeasurementType(measurement_type),
+            "bucket_start": from_epoch_us(bucket),
+            "first_timestamp": from_epoch_us(int(t[0])),
+            "last_timestamp": from_epoch_us(int(t[-1])),
+            "count": len(t),
+            "timestamp_data": encode_timestamps(t),
+            "value_data": encode_values(v),
+        }
+
+    @staticmethod
+    def decode(chunks: pl.DataFrame) -> pl.DataFrame:
+        """Expand chunk rows (with their blobs) into one row per reading."""
+        if chunks.is_empty():
+            return pl.DataFrame(schema=MEASUREMENT_SCHEMA)
+        counts = chunks["count"].to_numpy()
+        t = np.concatenate([decode_timestamps(b) for b in chunks["timestamp_data"]])
+        v = np.concatenate([decode_values(b) for b in chunks["value_data"]])
+        return pl.DataFrame(
+            {
+                "component_id": np.repeat(chunks["component_id"].to_numpy(), counts),
+                "measurement_type": np.repeat(
+                    chunks["measurement_type"].to_numpy(), counts
+                ),
+                "timestamp": pl.Series(t).cast(pl.Datetime("us", "UTC")),
+                "value": v,
+            },
+            schema=MEASUREMENT_SCHEMA,
+        )
+
+    @staticmethod
+    def read(
+        engine: Engine,
+        start: datetime,
+        end: datetime,
+        component_ids: Sequence[int] | None = None,
+        measurement_types: Sequence[MeasurementType] | None = None,
+    ) -> pl.DataFrame:
+        """
+        Readings in [start, end], decoded from the overlapping chunks.
+        Chunks crossing the range boundaries are decoded whole, then filtered.
+        """
+        filters = [
+            f"last_timestamp >= {sql_timestamp(start)}",
+            f"first_timestamp <= {sql_timestamp(end)}",
+            *measurement_filters(component_ids, measurement_types),
+        ]
+        query = f"""
+            SELECT component_id, measurement_type, count, timestamp_data, value_data
+            FROM measurement_chunks
+            WHERE {" AND ".join(filters)}
+        """
+        df = ChunkStore.decode(read_database_adbc(query, engine))
+        return df.filter(pl.col("timestamp").is_between(to_utc(start), to_utc(end)))
@@ -1,11 +1,58 @@
 # Storage Database
 
+from enum import Enum
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
+class TimestampStorage(str, Enum):
+    TEXT = "text"
+    EPOCH_US = "epoch_us"
+
+
+class MeasurementStorage(str, Enum):
+    ROWS = "rows"
+    CHUNKS = "chunks"
+
+
 class Settings(BaseSettings):
     URI: str = "sqlite:///database.db"
 
+    # Statements slower than this threshold are logged with their query plan
+    SLOW_QUERY_MS: float = 200.0
+    EXPLAIN_SLOW_QUERIES: bool = True
+
+    # Encoding of the measurement timestamps, see db.timestamps
+    # NOTE: existing databases must be converted with `python -m db.migrations`
+    TIMESTAMP_STORAGE: TimestampStorage = TimestampStorage.TEXT
+
+    # Measurements as one row per reading, or as compressed chunks, see db.chunks
+    # NOTE: the compaction (see db.rollups) only rolls up the row storage
+    MEASUREMENT_STORAGE: MeasurementStorage = MeasurementStorage.ROWS
+    CHUNK_SECONDS: int = 6 * 3600
+
+    # Measurements split by component over this many files, see db.shards
+    # NOTE: existing data must be moved with `python -m db.migrations shards`
+    SHARDS: int = 1
+
+    # Raw readings older than this are replaced by rollups, see db.rollups
+    # NOTE: None keeps every raw reading; the compaction runs every interval
+    RETENTION_DAYS: int | None = None
+    ROLLUP_SECONDS: int = 3600
+    COMPACTION_INTERVAL_S: int = 3600
+
+    # Report jobs read a copy of the database refreshed in the background at
+    # this interval, see db.replica
+    # NOTE: None reads the live database; 0 refreshes it back to back, within
+    # the bound of db.replica.COPY_DUTY_CYCLE
+    REPLICA_MAX_AGE_S: float | None = None
+
+    # Reports reading up to this many rows are computed inline by the request
+    INLINE_REPORT_MAX_ROWS: int = 20_000
+
+    # Rows deleted per transaction by bulk deletions, bounds the writer lock time
+    DELETE_CHUNK_SIZE: int = 10_000
+
     model_config = SettingsConfigDict(
         env_prefix="DB",
     )
@@ -0,0 +1,312 @@
+"""
+SQL instrumentation: statement timing, slow-query log and per-shape counters.
+
+Every statement issued through an instrumented SQLAlchemy engine, or through
+the ADBC reader below, is timed and accounted under its "shape" (the statement
+with literals stripped). Statements slower than `settings.SLOW_QUERY_MS` are
+logged together with their `EXPLAIN QUERY PLAN` output; their bound
+parameters (user data) only at the DEBUG level.
+
+ADBC links a SQLite library of its own and POSIX file locks are held per
+process, so the two libraries do not see each other's locks on a file: an
+ADBC connection opened during a write transaction of the engine can take its
+journal for a hot one and roll it back, and closing it drops the locks of
+the engine's connections. ADBC reads are therefore kept apart, within the
+process, from the write transactions of the instrumented engines on the
+same database file.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from typing import Any
+
+import polars as pl
+from sqlalchemy import Engine, event
+
+from core.utils import get_logger
+from db.config import settings
+
+logger = get_logger("sql", "DEBUG")
+
+# REF: https://www.sqlite.org/eqp.html
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_READ_ONLY = ("SELECT", "EXPLAIN")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so that executions differing only by literals match."""
+    shape = _LITERALS.sub("?", statement)
+    shape = _WHITESPACE.sub(" ", shape).strip()
+    return _IN_LIST.sub("(?, ...)", shape)
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    slow_count: int = 0
+
+    @property
+    def avg_s(self) -> float:
+        return self.total_s / self.count if self.count else 0.0
+
+
+@dataclass
+class SlowQuery:
+    statement: str
+    parameters: Any
+    elapsed_s: float
+    plan: list[str] = field(default_factory=list)
+
+
+class QueryStatsRegistry:
+    """Thread-safe counters keyed by statement shape, plus the latest slow queries."""
+
+    def __init__(self, max_slow_queries: int = 100):
+        self._lock = threading.Lock()
+        self._stats: dict[str, StatementStats] = {}
+        self.slow_queries: deque[SlowQuery] = deque(maxlen=max_slow_queries)
+
+    def record(self, statement: str, elapsed_s: float) -> bool:
+        """Account one execution and return whether it crossed the slow threshold."""
+        slow = elapsed_s * 1000 >= settings.SLOW_QUERY_MS
+        shape = statement_shape(statement)
+        with self._lock:
+            stats = self._stats.setdefault(shape, StatementStats())
+            stats.count += 1
+            stats.total_s += elapsed_s
+            stats.max_s = max(stats.max_s, elapsed_s)
+            stats.slow_count += slow
+        return slow
+
+    def snapshot(self) -> dict[str, StatementStats]:
+        with self._lock:
+            return {shape: replace(stats) for shape, stats in self._stats.items()}
+
+    def top(self, n: int = 10) -> list[tuple[str, StatementStats]]:
+        """Return the `n` shapes with the highest cumulative execution time."""
+        stats = self.snapshot().items()
+        return sorted(stats, key=lambda item: item[1].total_s, reverse=True)[:n]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.slow_queries.clear()
+
+
+query_stats = QueryStatsRegistry()
+
+
+def format_query_plan(rows: list[tuple]) -> list[str]:
+    """Render `EXPLAIN QUERY PLAN` rows (id, parent, notused, detail) as an indented tree."""
+    depth: dict[int, int] = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
+
+
+def explain_query_plan(dbapi_connection, statement: str, parameters=None) -> list[str]:
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return []
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ())
+        return format_query_plan(cursor.fetchall())
+    # NOTE: a raw DBAPI cursor, its errors are not wrapped by SQLAlchemy
+    except sqlite3.Error as e:
+        logger.debug(f"Could not explain statement: {e}")
+        return []
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(slow_query: SlowQuery):
+    query_stats.slow_queries.append(slow_query)
+    plan = "\n".join(f"    {line}" for line in slow_query.plan)
+    logger.warning(
+        f"Slow query ({slow_query.elapsed_s * 1000:.1f} ms): "
+        f"{_WHITESPACE.sub(' ', slow_query.statement).strip()}"
+        + (f"\n{plan}" if plan else "")
+    )
+    if slow_query.parameters is not None:
+        logger.debug(f"Slow query params={slow_query.parameters}")
+
+
+class _FileGuard:
+    """
+    Readers-writers exclusion between the ADBC reads and the write transactions
+    of the engines on one database file. A write section starts at the first
+    statement that is not a read on a pooled connection and ends when the
+    connection is returned to the pool (the transaction is over by then).
+    Waiting writers hold off new readers: writes are short, reads can be long.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._waiting_writers = 0
+        # connection record (id of its info dict) -> thread of the transaction
+        self._writers: dict[int, int] = {}
+
+    @contextmanager
+    def reading(self) -> Iterator[None]:
+        with self._condition:
+            if threading.get_ident() in self._writers.values():
+                raise RuntimeError(
+                    "ADBC read within a write transaction of the same thread"
+                )
+            self._condition.wait_for(
+                lambda: not self._writers and not self._waiting_writers
+            )
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                self._condition.notify_all()
+
+    def begin_write(self, key: int):
+        with self._condition:
+            if key in self._writers:
+                return
+            self._waiting_writers += 1
+            try:
+                self._condition.wait_for(lambda: not self._readers)
+            finally:
+                self._waiting_writers -= 1
+                self._condition.notify_all()
+            self._writers[key] = threading.get_ident()
+
+    def end_write(self, key: int):
+        with self._condition:
+            if self._writers.pop(key, None) is not None:
+                self._condition.notify_all()
+
+
+_file_guards: dict[str, _FileGuard] = {}
+_file_guards_lock = threading.Lock()
+
+
+def _file_guard(engine: Engine) -> _FileGuard | None:
+    """The guard of the database file of `engine`, None for in-memory databases."""
+    database = engine.url.database
+    if not database or database == ":memory:":
+        return None
+    with _file_guards_lock:
+        if database not in _file_guards:
+            path = os.path.realpath(database)
+            _file_guards[database] = _file_guards.setdefault(path, _FileGuard())
+        return _file_guards[database]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not statement.lstrip()[:7].upper().startswith(_READ_ONLY):
+        if (guard := _file_guard(conn.engine)) is not None:
+            guard.begin_write(id(conn.info))
+            conn.info["write_guard"] = guard
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    if not query_stats.record(statement, elapsed):
+        return
+    plan = []
+    if settings.EXPLAIN_SLOW_QUERIES and not executemany:
+        plan = explain_query_plan(cursor.connection, statement, parameters)
+    _log_slow_query(SlowQuery(statement, parameters, elapsed, plan))
+
+
+def _end_write(dbapi_connection, connection_record, *args):
+    # NOTE: checked in, invalidated or closed, no transaction is open anymore
+    if (guard := connection_record.info.pop("write_guard", None)) is not None:
+        guard.end_write(id(connection_record.info))
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Attach the timing and write-section hooks to an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        for identifier in ("checkin", "invalidate", "close"):
+            event.listen(engine, identifier, _end_write)
+    return engine
+
+
+def _record_adbc_query(query: str, engine: Engine, elapsed: float):
+    if not query_stats.record(query, elapsed):
+        return
+    plan = []
+    if settings.EXPLAIN_SLOW_QUERIES:
+        dbapi_connection = engine.raw_connection()
+        try:
+            plan = explain_query_plan(dbapi_connection, query)
+        finally:
+            dbapi_connection.close()
+    _log_slow_query(SlowQuery(query, None, elapsed, plan))
+
+
+class ReadCounter:
+    """Rows and bytes of Arrow data read through `read_database_adbc`."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, df: pl.DataFrame):
+        with self._lock:
+            self.rows += df.height
+            self.bytes += int(df.estimated_size())
+
+
+_read_counter: ContextVar[ReadCounter | None] = ContextVar("read_counter", default=None)
+
+
+@contextmanager
+def count_reads() -> Iterator[ReadCounter]:
+    """
+    Count the data read by `read_database_adbc` within the block, including
+    by threads running in a copy of the current context (`copy_context().run`).
+    """
+    counter = ReadCounter()
+    token = _read_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _read_counter.reset(token)
+
+
+def read_database_adbc(query: str, engine: Engine, **kwargs) -> pl.DataFrame:
+    """
+    Run a query through the ADBC driver of Polars with the same accounting
+    as the instrumented engines. Slow queries are explained through `engine`,
+    which must point to the same database. The read waits for the write
+    transactions on the file to end, and must not run within one of its thread.
+    """
+    uri = engine.url.render_as_string(hide_password=False)
+    guard = _file_guard(engine)
+    start = time.perf_counter()
+    try:
+        with guard.reading() if guard is not None else nullcontext():
+            df = pl.read_database_uri(query=query, uri=uri, engine="adbc", **kwargs)
+    finally:
+        _record_adbc_query(query, engine, time.perf_counter() - start)
+    if counter := _read_counter.get():
+        counter.add(df)
+    return df
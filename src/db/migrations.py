@@ -0,0 +1,275 @@
+"""
+Offline data migrations of existing databases.
+
+Usage (from the repository root, with the application stopped):
+    PYTHONPATH=src python -m db.migrations upgrade --db database.db
+    PYTHONPATH=src python -m db.migrations timestamps --to epoch_us --db database.db
+    PYTHONPATH=src python -m db.migrations chunks --db database.db --delete-rows
+    PYTHONPATH=src python -m db.migrations shards --db database.db --from 1 --to 4
+    PYTHONPATH=src python -m db.migrations compact --db database.db --retention-days 30
+
+then start the application with the matching `TIMESTAMP_STORAGE`,
+`MEASUREMENT_STORAGE`, `SHARDS` or `RETENTION_DAYS` setting. The `upgrade`
+brings the schema of the files up to the version of the application, which
+refuses to start on older ones (see db.schema).
+"""
+
+import argparse
+
+import polars as pl
+from sqlalchemy import Engine, create_engine, inspect, text
+from sqlmodel import Session, SQLModel, col
+
+from core.services.compaction import CompactionService
+from core.utils import get_logger
+from db.chunks import ChunkStore
+from db.config import TimestampStorage, settings
+from db.instrumentation import read_database_adbc
+from db.models import MeasurementChunkDB, MeasurementDB, table_of
+from db.operations import chunked, delete_in_chunks
+from db.schema import upgrade_schema
+from db.shards import SHARDED_TABLES, rebalance, shard_engines, sharded
+from db.timestamps import (
+    UTCTimestamp,
+    parse_timestamp,
+    sql_epoch_us_to_text,
+    sql_text_to_epoch_us,
+)
+
+logger = get_logger("app", "DEBUG")
+
+# Text "YYYY-MM-DD HH:MM:SS[.ffffff]" <-> integer microseconds since the epoch
+_CONVERSIONS = {
+    TimestampStorage.EPOCH_US: ("text", sql_text_to_epoch_us),
+    TimestampStorage.TEXT: ("integer", sql_epoch_us_to_text),
+}
+
+
+def _timestamp_columns() -> dict[str, list[str]]:
+    """The `UTCTimestamp` columns of the models, by table."""
+    return {
+        table.name: columns
+        for table in SQLModel.metadata.sorted_tables
+        if (
+            columns := [
+                column.name
+                for column in table.columns
+                if isinstance(column.type, UTCTimestamp)
+            ]
+        )
+    }
+
+
+def _migrate_table(
+    engine: Engine,
+    table: str,
+    columns: list[str],
+    target: TimestampStorage,
+    batch_size: int,
+) -> int:
+    source, conversion = _CONVERSIONS[target]
+    with engine.connect() as conn:
+        max_id = conn.execute(text(f"SELECT max(id) FROM {table}")).scalar() or 0
+
+    converted = 0
+    for first in range(0, max_id + 1, batch_size):
+        with engine.begin() as conn:
+            for column in columns:
+                converted += conn.execute(
+                    text(
+                        f"UPDATE {table} SET {column} = {conversion(column)}"
+                        f" WHERE id >= :first AND id < :last"
+                        f" AND typeof({column}) = '{source}'"
+                    ),
+                    {"first": first, "last": first + batch_size},
+                ).rowcount
+        logger.debug(
+            f"Converted {converted} timestamps of {table} (up to id {first + batch_size})"
+        )
+    return converted
+
+
+def migrate_timestamps(
+    engine: Engine, target: TimestampStorage, batch_size: int = 100_000
+) -> int:
+    """
+    Convert the timestamps (every `UTCTimestamp` column: readings, chunks,
+    rollups) to the `target` encoding in place, in the database and in its
+    shards (see db.shards).
+
+    Rows are converted by id ranges, one transaction per batch, and only if
+    not converted yet: the migration can be interrupted and resumed.
+    The declared column type is left unchanged, SQLite keeps the values of
+    both encodings as they are under its NUMERIC affinity.
+
+    Returns:
+        Number of converted values
+    """
+    target = TimestampStorage(target)
+    converted = 0
+    for db in [engine, *shard_engines()] if sharded() else [engine]:
+        existing = set(inspect(db).get_table_names())
+        for table, columns in _timestamp_columns().items():
+            if table in existing:
+                converted += _migrate_table(db, table, columns, target, batch_size)
+
+    logger.info(f"Converted {converted} timestamps to {target.value}")
+    return converted
+
+
+def _copy_to_chunks(
+    engine: Engine, components_per_batch: int, delete_rows: bool
+) -> int:
+    """Copy the measurement rows of one database (or shard) into its chunks."""
+    table_of(MeasurementChunkDB).create(engine, checkfirst=True)
+    with engine.connect() as conn:
+        pending = (
+            conn.execute(
+                text("SELECT DISTINCT component_id FROM measurements ORDER BY 1")
+            )
+            .scalars()
+            .all()
+        )
+
+    store = ChunkStore()
+    copied = 0
+    for ids in chunked(pending, components_per_batch):
+        df = read_database_adbc(
+            f"""
+            SELECT id, component_id, measurement_type, timestamp, value
+            FROM measurements
+            WHERE component_id IN ({", ".join(str(i) for i in ids)})
+            """,
+            engine,
+        ).with_columns(parse_timestamp())
+        # NOTE: the readings already in chunks, copied by an interrupted run or
+        # appended by the ingestion, are skipped
+        first, last = df.select(
+            first=pl.col("timestamp").min(), last=pl.col("timestamp").max()
+        ).row(0)
+        stored = ChunkStore.read(engine, first, last, ids)
+        new = df.drop("id").join(
+            stored.cast({"component_id": df.schema["component_id"]}),
+            on=["component_id", "measurement_type", "timestamp"],
+            how="anti",
+        )
+        with Session(engine) as session:
+            copied += store.append(session, new)
+            if delete_rows:
+                # NOTE: only the rows read above, the later ones have greater ids
+                delete_in_chunks(
+                    session,
+                    MeasurementDB,
+                    col(MeasurementDB.component_id).in_(ids),
+                    col(MeasurementDB.id) <= df["id"].max(),
+                )
+        logger.debug(f"Copied {copied} readings (up to component {ids[-1]})")
+    return copied
+
+
+def migrate_to_chunks(
+    engine: Engine, components_per_batch: int = 50, delete_rows: bool = False
+) -> int:
+    """
+    Copy the measurement rows into compressed chunks, in every shard, one
+    transaction per batch of components. The readings already in chunks are
+    skipped, so the migration can be interrupted and resumed, and merges
+    with the chunks written by the ingestion meanwhile.
+    With `delete_rows`, the rows of each batch are deleted once copied.
+
+    Returns:
+        Number of copied readings
+    """
+    copied = 0
+    for db in [engine, *shard_engines()] if sharded() else [engine]:
+        copied += _copy_to_chunks(db, components_per_batch, delete_rows)
+    logger.info(f"Copied {copied} measurements into chunks")
+    return copied
+
+
+def upgrade(engine: Engine) -> int:
+    """
+    Apply the pending schema migrations to the database and to its shards.
+
+    Returns:
+        Number of applied steps, over all the files
+    """
+    applied = upgrade_schema(engine, SQLModel.metadata.sorted_tables)
+    if sharded():
+        for db in shard_engines():
+            applied += upgrade_schema(db, SHARDED_TABLES)
+    logger.info(f"Applied {applied} schema migrations")
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrading = commands.add_parser(
+        "upgrade", help="Apply the pending schema migrations"
+    )
+    upgrading.add_argument("--db", required=True, help="Main SQLite database file")
+    timestamps = commands.add_parser(
+        "timestamps", help="Convert the encoding of the stored timestamps"
+    )
+    timestamps.add_argument("--to", type=TimestampStorage, required=True, dest="target")
+    timestamps.add_argument("--db", required=True, help="SQLite database file")
+    timestamps.add_argument("--batch-size", type=int, default=100_000)
+    timestamps.add_argument(
+        "--vacuum", action="store_true", help="Reclaim the freed space afterwards"
+    )
+    chunks = commands.add_parser(
+        "chunks", help="Copy the measurement rows into compressed chunks"
+    )
+    chunks.add_argument("--db", required=True, help="SQLite database file")
+    chunks.add_argument(
+        "--delete-rows", action="store_true", help="Delete the rows once copied"
+    )
+    chunks.add_argument(
+        "--vacuum", action="store_true", help="Reclaim the freed space afterwards"
+    )
+    shards = commands.add_parser(
+        "shards", help="Move the measurements to a different number of shards"
+    )
+    shards.add_argument("--db", required=True, help="Main SQLite database file")
+    shards.add_argument("--from", type=int, required=True, dest="source")
+    shards.add_argument("--to", type=int, required=True, dest="target")
+    shards.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Reclaim the freed space of the main database",
+    )
+    compaction = commands.add_parser(
+        "compact", help="Replace the old raw measurements with rollups"
+    )
+    compaction.add_argument("--db", required=True, help="Main SQLite database file")
+    compaction.add_argument("--retention-days", type=int, required=True)
+    compaction.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Reclaim the freed space of the main database",
+    )
+    args = parser.parse_args()
+
+    settings.URI = f"sqlite:///{args.db}"
+    engine = create_engine(settings.URI)
+    if args.command == "upgrade":
+        upgrade(engine)
+    elif args.command == "timestamps":
+        migrate_timestamps(engine, args.target, args.batch_size)
+    elif args.command == "chunks":
+        migrate_to_chunks(engine, delete_rows=args.delete_rows)
+    elif args.command == "compact":
+        CompactionService(args.retention_days).run()
+    else:
+        rebalance(args.source, args.target)
+    if getattr(args, "vacuum", False):
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # NOTE: the VACUUM also switches to incremental vacuums, see db.rollups
+            conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+            conn.execute(text("VACUUM"))
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
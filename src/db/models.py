@@ -4,9 +4,12 @@ These are the ORM models that map directly to database tables.
 """
 
 from datetime import datetime, UTC
+from typing import cast
 from core.models import ComponentType, MeasurementType, SwitchStatus
-from sqlalchemy import UniqueConstraint
+from sqlalchemy import Column, Index, LargeBinary, Table, UniqueConstraint
+from sqlalchemy.orm import class_mapper
 from sqlmodel import Field, Relationship, SQLModel
+from db.timestamps import UTCTimestamp
 
 
 # Component Models
@@ -38,8 +41,10 @@ class ComponentDB(SQLModel, table=True):
     status: SwitchStatus | None = Field(default=None)
 
     # Relationships
+    # NOTE: passive deletes, the ORM never loads the measurements to delete them;
+    # see core.services.component for the set-based deletion
     measurements: list["MeasurementDB"] = Relationship(
-        back_populates="component", cascade_delete=True
+        back_populates="component", cascade_delete=True, passive_deletes=True
     )
 
     # Handle duplicates
@@ -54,17 +59,24 @@ class MeasurementDB(SQLModel, table=True):
     __tablename__ = "measurements"
 
     id: int | None = Field(default=None, primary_key=True)
-    timestamp: datetime = Field(index=True, default_factory=lambda: datetime.now(UTC))
+    # NOTE: stored as text or epoch microseconds, see db.timestamps
+    timestamp: datetime = Field(
+        default_factory=lambda: datetime.now(UTC),
+        sa_column=Column(UTCTimestamp, index=True, nullable=False),
+    )
     value: float
     measurement_type: MeasurementType = Field(index=True)
 
     # Foreign key to component
-    component_id: int = Field(foreign_key="components.id", index=True)
+    component_id: int = Field(
+        foreign_key="components.id", index=True, ondelete="CASCADE"
+    )
 
     # Relationship
     component: ComponentDB = Relationship(back_populates="measurements")
 
     # Handle duplicates
+    # NOTE: the composite index serves per-component time range scans
     __table_args__ = (
         UniqueConstraint(
             "timestamp",
@@ -72,6 +84,82 @@ class MeasurementDB(SQLModel, table=True):
             "measurement_type",
             name="uq_meas_time_comp_type",
         ),
+        Index(
+            "ix_measurements_component_type_time",
+            "component_id",
+            "measurement_type",
+            "timestamp",
+        ),
+    )
+
+
+class MeasurementChunkDB(SQLModel, table=True):
+    """
+    Compressed readings of one component and measurement type over a time bucket.
+    See db.chunks for the encoding of the data columns.
+    """
+
+    __tablename__ = "measurement_chunks"
+
+    id: int | None = Field(default=None, primary_key=True)
+    component_id: int = Field(
+        foreign_key="components.id", index=True, ondelete="CASCADE"
+    )
+    measurement_type: MeasurementType
+    bucket_start: datetime = Field(sa_column=Column(UTCTimestamp, nullable=False))
+
+    # Actual time range of the readings, used to select the chunks to decode
+    first_timestamp: datetime = Field(
+        sa_column=Column(UTCTimestamp, index=True, nullable=False)
+    )
+    last_timestamp: datetime = Field(sa_column=Column(UTCTimestamp, nullable=False))
+    count: int
+
+    timestamp_data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    value_data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "component_id",
+            "measurement_type",
+            "bucket_start",
+            name="uq_chunk_comp_type_bucket",
+        ),
+    )
+
+
+class MeasurementRollupDB(SQLModel, table=True):
+    """
+    Aggregated readings of one component and measurement type over a time
+    bucket (`settings.ROLLUP_SECONDS`), replacing the raw rows older than the
+    retention. See db.rollups.
+    """
+
+    __tablename__ = "measurement_rollups"
+
+    id: int | None = Field(default=None, primary_key=True)
+    component_id: int = Field(
+        foreign_key="components.id", index=True, ondelete="CASCADE"
+    )
+    measurement_type: MeasurementType
+    bucket_start: datetime = Field(
+        sa_column=Column(UTCTimestamp, index=True, nullable=False)
+    )
+    value_sum: float
+    value_count: int
+    value_min: float
+    value_max: float
+    # Quantile sketch of the values (see db.sketches), null for the rollups
+    # compacted before the sketches were introduced
+    sketch: bytes | None = Field(default=None, sa_column=Column(LargeBinary))
+
+    __table_args__ = (
+        UniqueConstraint(
+            "component_id",
+            "measurement_type",
+            "bucket_start",
+            name="uq_rollup_comp_type_bucket",
+        ),
     )
 
 
@@ -87,3 +175,30 @@ class ReportDB(SQLModel, table=True):
     status: str = Field(default="pending")  # pending, processing, completed, failed
     result_json: str | None = Field(default=None)  # JSON string of report data
     error_message: str | None = Field(default=None)
+    # JSON filters of the report (ReportScope), null for the whole grid
+    scope: str | None = Field(default=None)
+
+    # Id of the first report of the batch the report was created in, if any
+    batch_id: int | None = Field(default=None)
+
+    # Resource accounting of the job, see core.profiling
+    # NOTE: the reports of a batch (same batch_id) share the stats of the batch
+    # job, they are its totals and not the resources of each report
+    rows_extracted: int | None = Field(default=None)
+    bytes_extracted: int | None = Field(default=None)  # Arrow data read from SQLite
+    extract_wall_s: float | None = Field(default=None)
+    extract_cpu_s: float | None = Field(default=None)
+    transform_wall_s: float | None = Field(default=None)
+    transform_cpu_s: float | None = Field(default=None)
+    load_wall_s: float | None = Field(default=None)
+    load_cpu_s: float | None = Field(default=None)
+    peak_rss_bytes: int | None = Field(default=None)
+    peak_traced_bytes: int | None = Field(default=None)
+    polars_threads: int | None = Field(default=None)
+    # Debug reports only: JSON plans and timings of the KPI queries
+    query_profile: str | None = Field(default=None)
+
+
+def table_of(model: type[SQLModel]) -> Table:
+    """The table of a table model (its `__table__`, which SQLModel leaves untyped)."""
+    return cast(Table, class_mapper(model).local_table)
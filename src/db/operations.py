@@ -0,0 +1,44 @@
+"""
+Set-based write operations shared by the services.
+"""
+
+from collections.abc import Iterator, Sequence
+
+from sqlalchemy import delete, select
+from sqlmodel import Session, SQLModel
+
+from db.config import settings
+from db.models import table_of
+
+
+def chunked(values: Sequence, size: int = 500) -> Iterator[Sequence]:
+    """Split a sequence, e.g. to bound the number of SQL variables of an IN clause."""
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+def delete_in_chunks(
+    session: Session,
+    model: type[SQLModel],
+    *criteria,
+    chunk_size: int | None = None,
+) -> int:
+    """
+    Delete the rows of `model` matching `criteria`, committing every `chunk_size`
+    rows so that the writer lock is released between chunks.
+
+    Returns:
+        Number of deleted rows
+    """
+    chunk_size = chunk_size or settings.DELETE_CHUNK_SIZE
+    table = table_of(model)
+    ids = select(table.c.id).where(*criteria).limit(chunk_size).scalar_subquery()
+    statement = delete(table).where(table.c.id.in_(ids))
+
+    total = 0
+    while True:
+        deleted = session.connection().execute(statement).rowcount
+        session.commit()
+        total += deleted
+        if deleted < chunk_size:
+            return total
@@ -0,0 +1,202 @@
+"""
+Read replicas of the SQLite files, for the report jobs.
+
+A replica is a copy of a database (`database.db` -> `database.replica.db`,
+the shards alike), which the report jobs scan for as long as they need
+without holding any lock on the live database. The copy is written to a
+temporary file and renamed over the replica, so that the reads in progress
+keep the previous copy.
+
+The copy is made with the online backup API in one step, i.e. within a
+single read transaction of the live database: a point-in-time snapshot, in
+which every reading is either raw or in a rollup (see db.rollups), never
+both nor neither. The writers wait for the copy, at disk speed (the
+backup API cannot copy in steps while other connections write: it restarts
+from scratch after each of their commits).
+A background thread per database refreshes the replica every
+`settings.REPLICA_MAX_AGE_S` seconds while it is read, and the jobs read the
+last completed copy: they never wait for a refresh, but for the first copy
+(or the first one after a pause of the refreshes, with no job reading).
+Only the ADBC readers open the replicas: unlike the live database, they are
+never written through the other SQLite library of the process (pysqlite),
+whose file locks do not exclude the ones of ADBC within the process.
+REF: https://www.sqlite.org/backup.html
+REF: https://www.sqlite.org/howtocorrupt.html#multiple_copies_of_sqlite_linked_into_the_same_application
+
+NOTE: for the same reason the live database cannot switch to WAL: a closing
+ADBC connection believes it is the last one and checkpoints and deletes the
+WAL under the pysqlite connections.
+
+NOTE: the shards and the main database are copied one after the other, a
+report may see a component without its latest readings, as when reading live.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+from sqlalchemy import Engine, create_engine
+
+from core.utils import get_logger
+from db.config import settings
+from db.instrumentation import instrument_engine
+
+logger = get_logger("app", "DEBUG")
+
+
+@dataclass
+class _Replica:
+    # Files of the live database and of its replica
+    source: str
+    path: str
+    engine: Engine
+    # Copies completed by the refresher, the jobs waiting for a copy watch it
+    copies: int = 0
+    read_at: float = 0.0
+    refresher: threading.Thread | None = None
+    error: Exception | None = None
+    stopped: bool = False
+    condition: threading.Condition = field(default_factory=threading.Condition)
+
+
+# Bound of the fraction of the time the refreshes hold the read lock of the
+# live database, i.e. of the ingestion waiting for them (REPLICA_MAX_AGE_S=0)
+COPY_DUTY_CYCLE = 0.1
+
+_lock = threading.Lock()
+_replicas: dict[str, _Replica] = {}
+
+
+def replica_path(database: str) -> str:
+    path = PurePosixPath(database)
+    return str(path.with_name(f"{path.stem}.replica{path.suffix}"))
+
+
+def replica_age(path: str) -> float | None:
+    """Seconds since the replica at `path` was written, by any process."""
+    try:
+        return time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return None
+
+
+def copy_database(source_path: str, target_path: str):
+    """Consistent copy of the database `source_path`, atomically replacing `target_path`."""
+    # NOTE: per process, the workers may refresh the same replica
+    temporary_path = f"{target_path}.{os.getpid()}.tmp"
+    if os.path.exists(temporary_path):
+        os.remove(temporary_path)
+    # NOTE: the busy timeout waits for the commits of the writers
+    source_connection = sqlite3.connect(source_path, timeout=30)
+    try:
+        target = sqlite3.connect(temporary_path)
+        try:
+            # NOTE: a temporary file, removed if the copy is interrupted;
+            # halves the time the copy holds the read lock of the source
+            target.execute("PRAGMA journal_mode = OFF")
+            target.execute("PRAGMA synchronous = OFF")
+            # NOTE: all the pages in one step, a restart-free consistent snapshot
+            source_connection.backup(target)
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+    finally:
+        source_connection.close()
+    os.replace(temporary_path, target_path)
+
+
+def _refresh(replica: _Replica, max_age_s: float):
+    """
+    Refresher thread: copy the database every `max_age_s` seconds (unless
+    another process did), until a whole period goes by without a job reading
+    the replica.
+    """
+    path = replica.path
+    copy_s = 0.0
+    while True:
+        started_at = time.monotonic()
+        age = replica_age(path)
+        if age is None or age >= max_age_s:
+            start = time.perf_counter()
+            try:
+                copy_database(replica.source, path)
+            except Exception as e:
+                logger.error(f"Failed to refresh the replica {path}: {e}")
+                with replica.condition:
+                    replica.error = e
+                    replica.refresher = None
+                    replica.condition.notify_all()
+                return
+            copy_s = time.perf_counter() - start
+            age = 0.0
+            logger.info(f"Refreshed the replica {path} in {copy_s:.3f}s")
+        with replica.condition:
+            replica.copies += 1
+            replica.error = None
+            replica.condition.notify_all()
+            # NOTE: the copies hold the read lock at most COPY_DUTY_CYCLE of the time
+            wait_s = max(max_age_s - age, copy_s * (1 / COPY_DUTY_CYCLE - 1))
+            replica.condition.wait_for(lambda: replica.stopped, wait_s)
+            if replica.stopped or replica.read_at < started_at:
+                replica.refresher = None
+                return
+
+
+def replica_engine(engine: Engine, max_age_s: float | None = None) -> Engine:
+    """
+    Engine of the replica of the database of `engine`, refreshed in the
+    background every `max_age_s` seconds (`settings.REPLICA_MAX_AGE_S`);
+    `engine` itself if the replicas are disabled (or the database is in memory).
+    Only waits for a copy if the replica is missing, or older than `max_age_s`
+    while the refreshes are paused.
+    """
+    max_age_s = settings.REPLICA_MAX_AGE_S if max_age_s is None else max_age_s
+    database = engine.url.database
+    if max_age_s is None or not database:
+        return engine
+    with _lock:
+        replica = _replicas.get(database)
+        if replica is None:
+            path = replica_path(database)
+            replica = _replicas[database] = _Replica(
+                database,
+                path,
+                instrument_engine(
+                    create_engine(
+                        f"sqlite:///{path}", connect_args={"check_same_thread": False}
+                    )
+                ),
+            )
+    path = replica.path
+    with replica.condition:
+        replica.read_at = time.monotonic()
+        if replica.refresher is None:
+            replica.refresher = threading.Thread(
+                target=_refresh, args=(replica, max_age_s), daemon=True
+            )
+            replica.refresher.start()
+            age = replica_age(path)
+            if age is None or age >= max_age_s:
+                copies = replica.copies
+                replica.condition.wait_for(
+                    lambda: replica.copies > copies or replica.refresher is None
+                )
+                if replica.error and replica_age(path) is None:
+                    raise replica.error
+    return replica.engine
+
+
+def reset_replicas():
+    with _lock:
+        for replica in _replicas.values():
+            with replica.condition:
+                replica.stopped = True
+                replica.condition.notify_all()
+                refresher = replica.refresher
+            if refresher:
+                refresher.join()
+            replica.engine.dispose()
+        _replicas.clear()
@@ -0,0 +1,221 @@
+"""
+Downsampled tier of the measurements.
+
+The compaction replaces the raw readings older than the retention with their
+aggregates (sum, count, min, max) per component, measurement type and time
+bucket (`settings.ROLLUP_SECONDS`). Each time slice is rolled up and deleted
+in one transaction, so that every reading is counted exactly once, either
+raw or in a rollup: the readers combine both tiers without a watermark, and
+an interrupted compaction resumes where it stopped. Late readings older than
+the retention are merged into their rollup by the next compaction.
+
+Each rollup also stores the quantile sketch of its readings (see
+db.sketches), so that the percentiles of the reports survive the compaction.
+"""
+
+from collections.abc import Sequence
+from datetime import datetime, timedelta
+
+import polars as pl
+from sqlalchemy import Connection, Engine, text
+from sqlmodel import Session, func, select
+
+from core.models import MeasurementType
+from core.utils import get_logger
+from db.chunks import MEASUREMENT_SCHEMA, measurement_filters
+from db.config import settings
+from db.instrumentation import read_database_adbc
+from db.models import MeasurementDB
+from db.sketches import merge_bins, sketch_bin, sketch_bins
+from db.timestamps import (
+    from_epoch_us,
+    parse_timestamp,
+    sql_bucket_start,
+    sql_timestamp,
+    to_epoch_us,
+)
+
+logger = get_logger("app", "DEBUG")
+
+# Readings of both tiers: a rollup is its mean, weighted by its count, with
+# the sketch of its values (empty for the raw readings)
+WEIGHTED_SCHEMA = pl.Schema(
+    MEASUREMENT_SCHEMA | {"weight": pl.Int64, "sketch": pl.Binary}
+)
+
+_ROLLUP_KEY = ["component_id", "measurement_type", "bucket_start"]
+
+_ROLLUP_STATEMENT = """
+    INSERT INTO measurement_rollups (
+        component_id, measurement_type, bucket_start,
+        value_sum, value_count, value_min, value_max
+    )
+    SELECT component_id, measurement_type, {bucket} AS bucket,
+           sum(value), count(*), min(value), max(value)
+    FROM measurements
+    WHERE timestamp >= {start} AND timestamp < {end}
+    GROUP BY component_id, measurement_type, bucket
+    ON CONFLICT (component_id, measurement_type, bucket_start) DO UPDATE SET
+        value_sum = value_sum + excluded.value_sum,
+        value_count = value_count + excluded.value_count,
+        value_min = min(value_min, excluded.value_min),
+        value_max = max(value_max, excluded.value_max)
+"""
+
+
+def bucket_floor(value: datetime, bucket_seconds: int | None = None) -> datetime:
+    bucket_us = (bucket_seconds or settings.ROLLUP_SECONDS) * 1_000_000
+    epoch_us = to_epoch_us(value)
+    return from_epoch_us(epoch_us - epoch_us % bucket_us)
+
+
+def _slice_sketches(conn: Connection, bucket: str, start: str, end: str) -> list[dict]:
+    """
+    Sketches of the rollups of a time slice, the readings being compacted
+    merged with the sketch of their rollup if it exists (late readings).
+    The rollups without a sketch keep none, it would miss their older readings.
+
+    NOTE: read on the connection of the compaction, never through ADBC: its
+    own SQLite library closing its connection releases the (POSIX) locks of
+    the whole process on the file, the write lock of `conn` included.
+    """
+    raw = pl.read_database(
+        text(
+            f"SELECT component_id, measurement_type, {bucket} AS bucket_start, value"
+            f" FROM measurements WHERE timestamp >= {start} AND timestamp < {end}"
+        ),
+        conn,
+    )
+    if raw.is_empty():
+        return []
+    bins = raw.group_by(*_ROLLUP_KEY, bin=sketch_bin(pl.col("value"))).agg(
+        pl.len().cast(pl.Int64).alias("count")
+    )
+    rollups = pl.read_database(
+        text(
+            "SELECT component_id, measurement_type, bucket_start, sketch"
+            " FROM measurement_rollups"
+            f" WHERE bucket_start >= {start} AND bucket_start < {end}"
+        ),
+        conn,
+        schema_overrides={"sketch": pl.Binary},
+    )
+    if not rollups.is_empty():
+        rollups = rollups.cast({"bucket_start": raw.schema["bucket_start"]})
+        bins = pl.concat(
+            [
+                bins.join(
+                    rollups.filter(pl.col("sketch").is_null()),
+                    on=_ROLLUP_KEY,
+                    how="anti",
+                ),
+                rollups.filter(pl.col("sketch").is_not_null())
+                .select(*_ROLLUP_KEY, bins=sketch_bins(pl.col("sketch")))
+                .explode("bins")
+                .unnest("bins"),
+            ],
+            how="vertical_relaxed",
+        )
+    return merge_bins(bins, _ROLLUP_KEY).to_dicts()
+
+
+def compact(engine: Engine, cutoff: datetime, bucket_seconds: int | None = None) -> int:
+    """
+    Roll up and delete the raw readings before `cutoff` (rounded down to a
+    bucket), one day of readings (or one bucket, if longer) per transaction.
+
+    Returns:
+        Number of raw readings replaced by rollups
+    """
+    bucket_seconds = bucket_seconds or settings.ROLLUP_SECONDS
+    cutoff = bucket_floor(cutoff, bucket_seconds)
+    with Session(engine) as session:
+        first = session.exec(select(func.min(MeasurementDB.timestamp))).one()
+    if first is None or first >= cutoff:
+        return 0
+
+    span = timedelta(seconds=bucket_seconds * max(1, 86_400 // bucket_seconds))
+    start = bucket_floor(first, bucket_seconds)
+    compacted = 0
+    while start < cutoff:
+        end = min(start + span, cutoff)
+        bounds = {"start": sql_timestamp(start), "end": sql_timestamp(end)}
+        bucket = sql_bucket_start(bucket_seconds)
+        with engine.begin() as conn:
+            # NOTE: the write lock first, no other writer can then change the
+            # slice between its read by _slice_sketches and its deletion
+            conn.execute(text("DELETE FROM measurements WHERE 0"))
+            sketches = _slice_sketches(conn, bucket, **bounds)
+            conn.execute(text(_ROLLUP_STATEMENT.format(bucket=bucket, **bounds)))
+            if sketches:
+                conn.execute(
+                    text(
+                        "UPDATE measurement_rollups SET sketch = :sketch"
+                        " WHERE component_id = :component_id"
+                        " AND measurement_type = :measurement_type"
+                        " AND bucket_start = :bucket_start"
+                    ),
+                    sketches,
+                )
+            compacted += conn.execute(
+                text(
+                    "DELETE FROM measurements"
+                    " WHERE timestamp >= {start} AND timestamp < {end}".format(**bounds)
+                )
+            ).rowcount
+        logger.debug(f"Compacted {compacted} readings (up to {end})")
+        start = end
+    logger.info(f"Compacted {compacted} readings older than {cutoff} into rollups")
+    return compacted
+
+
+def read_rollups(
+    engine: Engine,
+    start: datetime,
+    end: datetime,
+    component_ids: Sequence[int] | None = None,
+    measurement_types: Sequence[MeasurementType] | None = None,
+) -> pl.DataFrame:
+    """
+    Rollups of the buckets starting in [start, end], as weighted readings
+    at the start of their bucket: old ranges resolve to the bucket size.
+    """
+    filters = [
+        (
+            f"bucket_start BETWEEN {sql_timestamp(bucket_floor(start))}"
+            f" AND {sql_timestamp(end)}"
+        ),
+        *measurement_filters(component_ids, measurement_types),
+    ]
+    query = f"""
+        SELECT component_id, measurement_type, bucket_start AS timestamp,
+               value_sum / value_count AS value, value_count AS weight,
+               coalesce(sketch, X'') AS sketch
+        FROM measurement_rollups
+        WHERE {" AND ".join(filters)}
+    """
+    df = read_database_adbc(query, engine)
+    if df.is_empty():
+        return pl.DataFrame(schema=WEIGHTED_SCHEMA)
+    return df.with_columns(parse_timestamp()).cast(WEIGHTED_SCHEMA)
+
+
+def incremental_vacuum(engine: Engine) -> bool:
+    """
+    Return the free pages to the file system, if the database is in the
+    incremental auto-vacuum mode (set on the new databases, or by a VACUUM).
+    Otherwise the pages freed by the compaction are reused by new rows.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # NOTE: 2 is INCREMENTAL, REF: https://www.sqlite.org/pragma.html#pragma_auto_vacuum
+        if conn.execute(text("PRAGMA auto_vacuum")).scalar() != 2:
+            return False
+        # NOTE: one page is freed per step, i.e. per row, but the rows have no
+        # columns and SQLAlchemy does not fetch them: use the DBAPI cursor
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute("PRAGMA incremental_vacuum")
+            cursor.fetchall()
+        finally:
+            cursor.close()
+    return True
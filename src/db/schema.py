@@ -0,0 +1,108 @@
+"""
+Versioned schema of the database files (main database and shards).
+
+The version of a file is kept in its `PRAGMA user_version`: new files are
+created at `SCHEMA_VERSION`, existing ones are only checked at startup and
+brought up to date offline, step by step, by `python -m db.migrations upgrade`.
+Files created before the versioning are at version 0.
+"""
+
+from collections.abc import Callable, Iterable
+
+from sqlalchemy import Connection, Engine, Table, inspect, text
+
+
+def _add_missing_columns(conn: Connection, table: Table):
+    """Add the nullable columns introduced later on to an existing table."""
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing and column.nullable:
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.execute(
+                text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+            )
+
+
+def _add_unversioned_changes(conn: Connection, tables: Iterable[Table]):
+    """Tables, nullable columns and indexes added before the versioning."""
+    for table in tables:
+        table.create(conn, checkfirst=True)
+        _add_missing_columns(conn, table)
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _add_report_batch_id(conn: Connection, tables: Iterable[Table]):
+    """ReportDB.batch_id, in the main database only."""
+    if "reports" not in {table.name for table in tables}:
+        return
+    columns = {column["name"] for column in inspect(conn).get_columns("reports")}
+    if "batch_id" not in columns:
+        conn.execute(text("ALTER TABLE reports ADD COLUMN batch_id INTEGER"))
+
+
+# NOTE: append only, step i upgrades a file from version i to i + 1.
+# Each step must be idempotent, an interrupted upgrade is run again.
+MIGRATIONS: tuple[Callable[[Connection, Iterable[Table]], None], ...] = (
+    _add_unversioned_changes,
+    _add_report_batch_id,
+)
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn: Connection) -> int:
+    return conn.execute(text("PRAGMA user_version")).scalar_one()
+
+
+def _set_schema_version(conn: Connection, version: int):
+    # NOTE: PRAGMA values cannot be bound parameters
+    conn.execute(text(f"PRAGMA user_version = {int(version)}"))
+
+
+def create_schema(engine: Engine, tables: Iterable[Table]):
+    """
+    Create `tables` in a new database file, at the current schema version.
+    Existing files are left untouched, and refused if not at that version.
+    """
+    with engine.begin() as conn:
+        version = schema_version(conn)
+        if inspect(conn).get_table_names():
+            if version < SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"{engine.url.database} is at schema version {version}, "
+                    f"expected {SCHEMA_VERSION}: stop the application and run "
+                    f"`python -m db.migrations upgrade --db {engine.url.database}`"
+                )
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(
+                    f"{engine.url.database} is at schema version {version}, "
+                    f"newer than {SCHEMA_VERSION}"
+                )
+            return
+        # NOTE: only effective on a new database, lets the compaction shrink it
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        for table in tables:
+            table.create(conn)
+        _set_schema_version(conn, SCHEMA_VERSION)
+
+
+def upgrade_schema(engine: Engine, tables: Iterable[Table]) -> int:
+    """
+    Apply the pending migrations to a database file, recording the version
+    reached after each step.
+
+    Returns:
+        Number of applied steps
+    """
+    tables = list(tables)
+    with engine.begin() as conn:
+        version = schema_version(conn)
+        if version > SCHEMA_VERSION:
+            raise RuntimeError(
+                f"{engine.url.database} is at schema version {version}, "
+                f"newer than {SCHEMA_VERSION}"
+            )
+        for step in range(version, SCHEMA_VERSION):
+            MIGRATIONS[step](conn, tables)
+            _set_schema_version(conn, step + 1)
+    return SCHEMA_VERSION - version
@@ -0,0 +1,179 @@
+"""
+Optional sharding of the measurements across several SQLite files.
+
+With `settings.SHARDS` = K > 1, the measurements (rows, chunks, rollups) of a
+component live in the shard file `component_id % K`, next to the main database
+(`database.db` -> `database.shard0.db`, ...). Each file has its own writer lock
+and I/O queue; the components and reports stay in the main database.
+With K = 1 (default) the main database holds everything.
+
+NOTE: ids are dense and assigned sequentially, so the modulo spreads the
+components evenly and is computable in SQL, which the rebalancing relies on.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import PurePosixPath
+
+from sqlalchemy import Engine, create_engine, text
+from sqlmodel import Session
+
+from core.utils import get_logger
+from db import get_engine
+from db.config import settings
+from db.instrumentation import instrument_engine
+from db.models import (
+    MeasurementChunkDB,
+    MeasurementDB,
+    MeasurementRollupDB,
+    table_of,
+)
+from db.schema import create_schema
+
+logger = get_logger("app", "DEBUG")
+
+SHARDED_TABLES = (
+    table_of(MeasurementDB),
+    table_of(MeasurementChunkDB),
+    table_of(MeasurementRollupDB),
+)
+
+# NOTE: cached per URI, as the main engine, and reset with it
+_shard_engines: dict[str, Engine] = {}
+
+
+def sharded() -> bool:
+    return settings.SHARDS > 1
+
+
+def shard_of(component_id: int, count: int | None = None) -> int:
+    return int(component_id) % (count or settings.SHARDS)
+
+
+def shard_uri(index: int, count: int | None = None) -> str:
+    """URI of a shard file; a single shard is the main database itself."""
+    if (count or settings.SHARDS) <= 1:
+        return settings.URI
+    prefix, _, path = settings.URI.partition(":///")
+    path = PurePosixPath(path)
+    return f"{prefix}:///{path.with_name(f'{path.stem}.shard{index}{path.suffix}')}"
+
+
+def get_shard_engine(index: int) -> Engine:
+    if not sharded():
+        return get_engine()
+    uri = shard_uri(index)
+    if uri not in _shard_engines:
+        _shard_engines[uri] = instrument_engine(
+            create_engine(uri, connect_args={"check_same_thread": False})
+        )
+    return _shard_engines[uri]
+
+
+def shard_engines() -> list[Engine]:
+    return [get_shard_engine(i) for i in range(max(1, settings.SHARDS))]
+
+
+def measurement_engines(
+    component_ids: Iterable[int], engine: Engine
+) -> dict[Engine, list[int]]:
+    """Group components by the engine of their measurements (`engine` if unsharded)."""
+    if not sharded():
+        return {engine: list(component_ids)}
+    groups: dict[Engine, list[int]] = defaultdict(list)
+    for component_id in component_ids:
+        groups[get_shard_engine(shard_of(component_id))].append(component_id)
+    return groups
+
+
+def measurement_sessions(
+    component_ids: Iterable[int], session: Session
+) -> Iterator[tuple[Session, list[int]]]:
+    """Sessions to access the measurements of the components (`session` if unsharded)."""
+    bind = session.get_bind().engine
+    for engine, ids in measurement_engines(component_ids, bind).items():
+        if engine is bind:
+            yield session, ids
+        else:
+            with Session(engine) as shard_session:
+                yield shard_session, ids
+
+
+@contextmanager
+def measurement_session(component_id: int, session: Session) -> Iterator[Session]:
+    for shard_session, _ in measurement_sessions([component_id], session):
+        yield shard_session
+
+
+def create_shard_tables():
+    if sharded():
+        for engine in shard_engines():
+            create_schema(engine, SHARDED_TABLES)
+
+
+def reset_shard_engines():
+    for engine in _shard_engines.values():
+        engine.dispose()
+    _shard_engines.clear()
+
+
+def _move(conn, target_uri: str, selection: str) -> int:
+    """Move the rows matching `selection` to the attached target, atomically."""
+    moved = 0
+    conn.execute(
+        text("ATTACH DATABASE :path AS target"),
+        {"path": target_uri.partition(":///")[2]},
+    )
+    try:
+        conn.execute(text("BEGIN"))
+        for table in SHARDED_TABLES:
+            columns = ", ".join(c.name for c in table.columns if c.name != "id")
+            moved += conn.execute(
+                text(
+                    f"INSERT INTO target.{table.name} ({columns})"
+                    f" SELECT {columns} FROM main.{table.name} WHERE {selection}"
+                )
+            ).rowcount
+            conn.execute(text(f"DELETE FROM main.{table.name} WHERE {selection}"))
+        conn.execute(text("COMMIT"))
+    except Exception:
+        conn.execute(text("ROLLBACK"))
+        raise
+    finally:
+        conn.execute(text("DETACH DATABASE target"))
+    return moved
+
+
+def rebalance(source_count: int, target_count: int) -> int:
+    """
+    Move the measurements from a layout of `source_count` shards to one of
+    `target_count`, file to file through `ATTACH`, one transaction per
+    (source, target) pair. Rows get new ids in their target file.
+    Shard files left empty can be deleted afterwards.
+
+    Returns:
+        Number of moved rows
+    """
+    source_uris = [shard_uri(i, source_count) for i in range(max(1, source_count))]
+    target_uris = [shard_uri(i, target_count) for i in range(max(1, target_count))]
+
+    for uri in target_uris:
+        engine = create_engine(uri)
+        create_schema(engine, SHARDED_TABLES)
+        engine.dispose()
+
+    moved = 0
+    for source_uri in source_uris:
+        engine = create_engine(source_uri)
+        # NOTE: ATTACH is not allowed within a transaction, manage them explicitly
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            for target, target_uri in enumerate(target_uris):
+                if target_uri != source_uri:
+                    selection = f"component_id % {max(1, target_count)} = {target}"
+                    moved += _move(conn, target_uri, selection)
+                    logger.debug(f"Moved {moved} rows ({source_uri} -> {target_uri})")
+        engine.dispose()
+
+    logger.info(f"Rebalanced {moved} rows from {source_count} to {target_count} shards")
+    return moved
@@ -0,0 +1,135 @@
+"""
+Mergeable quantile sketches of the measurement values.
+
+A sketch counts the values per logarithmic bin, as DDSketch
+(REF: https://arxiv.org/abs/1908.10693): the bin of a value `v > 0` is
+`ceil(log_gamma(v))` with `gamma = (1 + a) / (1 - a)`, mirrored for the
+negative values, and the values closer to zero than `MIN_INDEXABLE` share
+bin 0. Every value of a bin is within a relative distance `a`
+(`RELATIVE_ACCURACY`) of the bin value, so the quantiles answered from the
+bins are within `a` of the exact ones (lower interpolation).
+
+Sketches merge by adding the counts of the same bins: the rollups (see
+db.rollups) store the sketch of the readings they replace, and a report
+merges them with the bins of its raw readings for any window, the whole
+computation being Polars expressions.
+
+The signed bin numbers sort as the values they stand for; they are stored
+sorted, as delta-encoded int64 followed by the int64 counts, zlib compressed.
+"""
+
+import math
+import zlib
+
+import numpy as np
+import polars as pl
+
+# NOTE: part of the storage format, the stored sketches assume this accuracy
+RELATIVE_ACCURACY = 0.01
+MIN_INDEXABLE = 1e-9
+# Quantiles of the reports, by field name
+QUANTILES = {"p5": 0.05, "p50": 0.5, "p95": 0.95}
+
+_GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(_GAMMA)
+# Shift of the bin numbers, so that the bins of |v| >= MIN_INDEXABLE are > 0
+_OFFSET = 1 << 20
+
+SKETCH_BINS = pl.List(pl.Struct({"bin": pl.Int32, "count": pl.Int64}))
+
+
+def sketch_bin(value: pl.Expr) -> pl.Expr:
+    """Signed bin of the values: positive above zero, negative below."""
+    magnitude = value.abs()
+    index = (magnitude.clip(lower_bound=MIN_INDEXABLE).log() / _LOG_GAMMA).ceil()
+    return (
+        pl.when(magnitude < MIN_INDEXABLE)
+        .then(0)
+        .otherwise(value.sign() * (index + _OFFSET))
+        .cast(pl.Int32)
+    )
+
+
+def bin_value(bin: pl.Expr) -> pl.Expr:
+    """The value standing for a bin, at the same relative distance of its bounds."""
+    index = bin.abs().cast(pl.Float64) - _OFFSET
+    return (
+        pl.when(bin == 0)
+        .then(0.0)
+        .otherwise(bin.sign() * 2 * (index * _LOG_GAMMA).exp() / (_GAMMA + 1))
+    )
+
+
+def encode_sketch(bins: np.ndarray, counts: np.ndarray) -> bytes:
+    order = np.argsort(bins, kind="stable")
+    deltas = np.diff(bins[order].astype(np.int64), prepend=0)
+    return zlib.compress(np.concatenate([deltas, counts[order].astype(np.int64)]))
+
+
+def decode_sketch(data: bytes) -> tuple[np.ndarray, np.ndarray]:
+    """The sorted bins of a sketch, and their counts."""
+    words = np.frombuffer(zlib.decompress(data), dtype=np.int64)
+    size = len(words) // 2
+    return np.cumsum(words[:size]), words[size:]
+
+
+def sketch_bins(sketch: pl.Expr) -> pl.Expr:
+    """
+    The (bin, count) list of stored sketches, to explode and unnest.
+    NOTE: decoded in Python, one call per sketch (i.e. per rollup).
+    """
+    return sketch.map_elements(
+        lambda data: [
+            {"bin": b, "count": c}
+            for b, c in zip(*map(np.ndarray.tolist, decode_sketch(data)), strict=True)
+        ],
+        return_dtype=SKETCH_BINS,
+    )
+
+
+def merge_bins(bins: pl.DataFrame, by: list[str]) -> pl.DataFrame:
+    """One encoded sketch per group of `by` of the (bin, count) rows."""
+    merged = (
+        bins.group_by([*by, "bin"])
+        .agg(pl.col("count").sum())
+        .group_by(by)
+        .agg("bin", "count")
+    )
+    return merged.with_columns(
+        sketch=pl.Series(
+            [
+                encode_sketch(np.array(b), np.array(c))
+                for b, c in merged.select("bin", "count").iter_rows()
+            ],
+            dtype=pl.Binary,
+        )
+    ).drop("bin", "count")
+
+
+def quantiles(bins: pl.LazyFrame, by: list[str]) -> pl.LazyFrame:
+    """
+    The `QUANTILES` (and the count) of the values of every group of `by`,
+    from their (bin, count) rows.
+    """
+    ranked = (
+        bins.group_by([*by, "bin"])
+        .agg(pl.col("count").sum())
+        .sort([*by, "bin"])
+        .with_columns(
+            cumulated=pl.col("count").cum_sum().over(by),
+            total=pl.col("count").sum().over(by),
+        )
+    )
+    # NOTE: the bin of a quantile is the first one whose cumulated count
+    # exceeds its rank, i.e. the smallest, as the cumulated counts increase
+    return ranked.group_by(by).agg(
+        pl.col("total").first().alias("count"),
+        *(
+            bin_value(
+                pl.col("bin")
+                .filter(pl.col("cumulated") > q * (pl.col("total") - 1))
+                .min()
+            ).alias(name)
+            for name, q in QUANTILES.items()
+        ),
+    )
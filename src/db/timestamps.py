@@ -0,0 +1,120 @@
+"""
+Timestamp encoding shared by the ORM, the raw SQL read paths (ADBC) and Polars.
+
+Measurement timestamps are stored either as naive UTC text, the format of the
+SQLAlchemy SQLite `DateTime` type (default), or as integer microseconds since
+the Unix epoch (`DB_TIMESTAMP_STORAGE=epoch_us`), which compares as integers,
+indexes in less space and reads into a Polars `Datetime` without parsing.
+Both are exposed as timezone-aware UTC `datetime`s by the ORM; raw SQL must
+format its bounds and parse its results with the helpers below.
+"""
+
+from datetime import UTC, datetime, timedelta
+
+import polars as pl
+from sqlalchemy import BigInteger, DateTime
+from sqlalchemy.types import TypeDecorator
+
+from db.config import TimestampStorage, settings
+
+# NOTE: storage format of the SQLAlchemy SQLite DateTime type (always 6 digits)
+SQL_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def epoch_storage() -> bool:
+    return settings.TIMESTAMP_STORAGE == TimestampStorage.EPOCH_US
+
+
+def to_utc(value: datetime) -> datetime:
+    """Naive datetimes are assumed to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=UTC)
+    return value.astimezone(UTC)
+
+
+def to_epoch_us(value: datetime) -> int:
+    return (to_utc(value) - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def sql_timestamp(value: datetime) -> str:
+    """Render a datetime as a SQL literal comparable with the stored timestamps."""
+    if epoch_storage():
+        return str(to_epoch_us(value))
+    return f"'{to_utc(value).strftime(SQL_DATETIME_FORMAT)}'"
+
+
+def sql_text_to_epoch_us(column: str = "timestamp") -> str:
+    """SQL expression: text "YYYY-MM-DD HH:MM:SS[.ffffff]" -> epoch microseconds."""
+    # NOTE: the fraction is right-padded, SQLite date functions only keep milliseconds
+    return (
+        f"CAST(strftime('%s', substr({column}, 1, 19)) AS INTEGER) * 1000000"
+        f" + CAST(substr(substr({column}, 21) || '000000', 1, 6) AS INTEGER)"
+    )
+
+
+def sql_epoch_us_to_text(expression: str = "timestamp") -> str:
+    """SQL expression: epoch microseconds -> text in the stored format."""
+    return (
+        f"strftime('%Y-%m-%d %H:%M:%S', ({expression}) / 1000000, 'unixepoch')"
+        f" || printf('.%06d', ({expression}) % 1000000)"
+    )
+
+
+def sql_bucket_start(bucket_seconds: int, column: str = "timestamp") -> str:
+    """SQL expression: start of the time bucket of a stored timestamp, stored alike."""
+    epoch_us = column if epoch_storage() else f"({sql_text_to_epoch_us(column)})"
+    bucket_us = f"({epoch_us} - {epoch_us} % {bucket_seconds * 1_000_000})"
+    return bucket_us if epoch_storage() else sql_epoch_us_to_text(bucket_us)
+
+
+def parse_timestamp(column: str = "timestamp") -> pl.Expr:
+    """Polars expression turning a stored timestamp column into a UTC `Datetime`."""
+    if epoch_storage():
+        # NOTE: same physical representation, the cast does not copy
+        return pl.col(column).cast(pl.Int64).cast(pl.Datetime("us", "UTC"))
+    return pl.col(column).str.to_datetime(
+        "%Y-%m-%d %H:%M:%S%.f", time_unit="us", time_zone="UTC"
+    )
+
+
+def encode_timestamp(column: str = "timestamp") -> pl.Expr:
+    """Inverse of `parse_timestamp`, for bulk loads bypassing the ORM."""
+    utc = pl.col(column).dt.convert_time_zone("UTC")
+    if epoch_storage():
+        return utc.dt.epoch("us")
+    return utc.dt.strftime("%Y-%m-%d %H:%M:%S%.6f")
+
+
+class UTCTimestamp(TypeDecorator):
+    """
+    Column type storing timestamps with the configured encoding and returning
+    timezone-aware UTC datetimes. The encoding is resolved per dialect, i.e.
+    when an engine first uses the type.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if epoch_storage():
+            return dialect.type_descriptor(BigInteger())
+        return dialect.type_descriptor(DateTime())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if epoch_storage():
+            return to_epoch_us(value)
+        return to_utc(value).replace(tzinfo=None)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, int):
+            return from_epoch_us(value)
+        return to_utc(value)
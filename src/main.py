@@ -1,17 +1,37 @@
 from contextlib import asynccontextmanager
+import anyio
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlmodel import Session
 
+from api.middleware import ProfilingMiddleware
 from api.routes import router
-from core.utils import get_logger
-from db import create_db_and_tables
+from core.services.compaction import CompactionService
+from core.services.latest import last_values
+from core.utils import PROFILE, get_logger
+from db import create_db_and_tables, get_engine
+from db.config import settings as db_settings
+from db.instrumentation import query_stats
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     create_db_and_tables()
-    yield
+    with Session(get_engine()) as session:
+        last_values.warm(session)
+    async with anyio.create_task_group() as tasks:
+        if db_settings.RETENTION_DAYS:
+            tasks.start_soon(CompactionService().run_periodically)
+        yield
+        tasks.cancel_scope.cancel()
+    # Summary of the most expensive statement shapes seen by this process
+    for shape, stats in query_stats.top(10):
+        logger.log(
+            PROFILE,
+            f"{stats.count}x in {stats.total_s:.3f}s "
+            f"(max {stats.max_s * 1000:.1f} ms, slow {stats.slow_count}): {shape}",
+        )
 
 
 # setup logger
@@ -29,6 +49,7 @@ app = FastAPI(
 # add routes
 app.include_router(router)
 
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
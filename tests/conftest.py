@@ -8,6 +8,7 @@ from sqlmodel.pool import StaticPool
 from db import get_session
 from db.config import settings
 from db.models import ComponentDB, MeasurementDB
+from db.schema import create_schema
 from main import app
 from core.utils import get_logger
 from datetime import UTC, datetime
@@ -41,7 +42,7 @@ def session_fixture():
         settings.URI, connect_args={"check_same_thread": False}, poolclass=StaticPool
     )
     logger.info(f"Creating testing database engine: {engine.url}")
-    SQLModel.metadata.create_all(engine)
+    create_schema(engine, SQLModel.metadata.sorted_tables)
     with Session(engine) as session:
         populate_components(session)
         populate_measurements(session)
@@ -79,6 +80,17 @@ async def client_fixture(session: Session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(name="manager_headers")
+async def manager_headers_fixture(client: AsyncClient):
+    """Authorization headers of a manager token (both scopes)"""
+    response = await client.post(
+        "/auth/token",
+        data={"username": "manager", "password": "manager", "scope": "user manager"},
+    )
+    token = response.json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
 def populate_components(session):
     logger.info(f"Adding {NUM_COMPONENTS} components...")
 
@@ -0,0 +1,53 @@
+import pytest
+from sqlmodel import col, func, select
+
+from db.models import ComponentDB, MeasurementDB
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+
+def count(session, model, *criteria):
+    return session.exec(select(func.count()).select_from(model).where(*criteria)).one()
+
+
+@pytest.mark.anyio
+async def test_delete_component_removes_measurements(client, session, manager_headers):
+    response = await client.delete("/components/1", headers=manager_headers)
+    assert response.status_code == 204
+
+    assert session.get(ComponentDB, 1) is None
+    assert count(session, MeasurementDB, MeasurementDB.component_id == 1) == 0
+    assert count(session, MeasurementDB, MeasurementDB.component_id == 2) > 0
+
+    response = await client.delete("/components/1", headers=manager_headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_delete_components_by_filters(client, session, manager_headers):
+    criteria = (ComponentDB.substation == "SUB_1", ComponentDB.component_type == "LINE")
+    ids = session.exec(select(ComponentDB.id).where(*criteria)).all()
+    expected_measurements = count(
+        session, MeasurementDB, col(MeasurementDB.component_id).in_(ids)
+    )
+
+    response = await client.delete(
+        "/components",
+        params={"substation": "SUB_1", "component_type": "LINE"},
+        headers=manager_headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == {
+        "deleted_components": len(ids),
+        "deleted_measurements": expected_measurements,
+    }
+    assert count(session, ComponentDB) == NUM_COMPONENTS - len(ids)
+    assert count(session, MeasurementDB, col(MeasurementDB.component_id).in_(ids)) == 0
+    assert count(session, MeasurementDB) == (NUM_COMPONENTS - len(ids)) * (
+        NUM_MEASUREMENTS * 3
+    )
+
+
+@pytest.mark.anyio
+async def test_delete_components_requires_a_filter(client, manager_headers):
+    response = await client.delete("/components", headers=manager_headers)
+    assert response.status_code == 422
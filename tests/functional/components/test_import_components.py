@@ -0,0 +1,110 @@
+import pytest
+from sqlmodel import select
+
+from db.models import ComponentDB
+
+NEW_COMPONENTS = [
+    {
+        "name": "TR_NEW",
+        "substation": "SUB_NEW",
+        "component_type": "TRANSFORMER",
+        "capacity_mva": 40.0,
+        "voltage_kv": 132.0,
+    },
+    {
+        "name": "SW_NEW",
+        "substation": "SUB_NEW",
+        "component_type": "SWITCH",
+        "status": "OPEN",
+    },
+]
+
+
+async def existing_component(client, headers) -> dict:
+    response = await client.get("/components?limit=1", headers=headers)
+    return response.json()[0]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    "on_conflict, outcome", [("skip", "skipped"), ("update", "updated")]
+)
+async def test_import_components(
+    client, session, manager_headers, on_conflict, outcome
+):
+    existing = await existing_component(client, manager_headers)
+    replacement = {
+        "name": existing["name"],
+        "substation": existing["substation"],
+        "component_type": "LINE",
+        "length_km": 12.5,
+        "voltage_kv": 66.0,
+    }
+
+    response = await client.post(
+        "/components/bulk",
+        params={"on_conflict": on_conflict},
+        json=[*NEW_COMPONENTS, replacement],
+        headers=manager_headers,
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["created"], body[outcome]) == (2, 1)
+    assert [r["outcome"] for r in body["results"]] == ["created", "created", outcome]
+    assert body["results"][2]["id"] == existing["id"]
+
+    db_component = session.get(ComponentDB, existing["id"])
+    session.refresh(db_component)
+    if on_conflict == "update":
+        assert db_component.component_type == "LINE"
+        assert db_component.length_km == 12.5
+        assert db_component.capacity_mva is None
+    else:
+        assert db_component.component_type == existing["component_type"]
+
+
+@pytest.mark.anyio
+async def test_import_components_is_all_or_nothing(client, session, manager_headers):
+    invalid = {"name": "LN_BAD", "substation": "SUB_NEW", "component_type": "LINE"}
+    response = await client.post(
+        "/components/bulk", json=[*NEW_COMPONENTS, invalid], headers=manager_headers
+    )
+    assert response.status_code == 422
+
+    response = await client.post(
+        "/components/bulk",
+        json=[*NEW_COMPONENTS, NEW_COMPONENTS[0]],
+        headers=manager_headers,
+    )
+    assert response.status_code == 422
+
+    statement = select(ComponentDB).where(ComponentDB.substation == "SUB_NEW")
+    assert session.exec(statement).all() == []
+
+
+@pytest.mark.anyio
+async def test_import_components_csv(client, manager_headers):
+    content = (
+        "name,substation,component_type,capacity_mva,length_km,voltage_kv,status\n"
+        "TR_CSV,SUB_CSV,TRANSFORMER,40,,132,\n"
+        "LN_CSV,SUB_CSV,LINE,,3.5,66,\n"
+        "SW_CSV,SUB_CSV,SWITCH,,,,CLOSED\n"
+    )
+    files = {"file": ("components.csv", content, "text/csv")}
+    response = await client.post(
+        "/components/bulk/csv", files=files, headers=manager_headers
+    )
+    assert response.status_code == 200
+    assert response.json()["created"] == 3
+
+    response = await client.get(
+        "/components?substation=SUB_CSV", headers=manager_headers
+    )
+    assert {c["name"] for c in response.json()} == {"TR_CSV", "LN_CSV", "SW_CSV"}
+
+    files = {"file": ("components.csv", content.replace("66", "-1"), "text/csv")}
+    response = await client.post(
+        "/components/bulk/csv", files=files, headers=manager_headers
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:2] == ["file", 1]
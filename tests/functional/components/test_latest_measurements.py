@@ -0,0 +1,79 @@
+import pytest
+from sqlmodel import col, select
+
+from core.services.latest import last_values
+from db.models import MeasurementDB
+from tests.conftest import NUM_COMPONENTS
+
+LAST_TIMESTAMP = "2026-01-01T01:14:45Z"
+
+
+@pytest.fixture(name="warm_cache")
+def warm_cache_fixture(session):
+    last_values.warm(session)
+    yield
+    last_values.reset()
+
+
+def stored_value(session, component_id: int, measurement_type: str) -> float:
+    return session.exec(
+        select(MeasurementDB.value)
+        .where(
+            MeasurementDB.component_id == component_id,
+            MeasurementDB.measurement_type == measurement_type,
+        )
+        .order_by(col(MeasurementDB.timestamp).desc())
+    ).first()
+
+
+@pytest.mark.anyio
+async def test_latest_measurements(client, manager_headers, session, warm_cache):
+    response = await client.get("/components/latest", headers=manager_headers)
+    assert response.status_code == 200
+    data = response.json()
+
+    assert [item["component_id"] for item in data] == list(range(1, NUM_COMPONENTS + 1))
+    latest = data[6]["measurements"]
+    assert set(latest) == {"VOLTAGE", "CURRENT", "POWER"}
+    assert latest["POWER"]["timestamp"] == LAST_TIMESTAMP
+    assert latest["POWER"]["value"] == stored_value(session, 7, "POWER")
+
+
+@pytest.mark.anyio
+async def test_latest_measurements_follow_ingestion(
+    client, manager_headers, warm_cache
+):
+    async def latest_voltage():
+        response = await client.get(
+            "/components/latest", params={"component_id": 3}, headers=manager_headers
+        )
+        [item] = response.json()
+        return item["measurements"]["VOLTAGE"]
+
+    reading = {"component_id": 3, "value": 231.5, "measurement_type": "VOLTAGE"}
+    response = await client.post(
+        "/measurements",
+        json=reading | {"timestamp": "2026-01-01T02:00:00Z"},
+        headers=manager_headers,
+    )
+    assert response.status_code == 201
+    assert await latest_voltage() == {
+        "timestamp": "2026-01-01T02:00:00Z",
+        "value": 231.5,
+    }
+
+    # A late reading does not replace the latest one
+    response = await client.post(
+        "/measurements",
+        json=reading | {"timestamp": "2026-01-01T01:30:00Z", "value": 1.0},
+        headers=manager_headers,
+    )
+    assert response.status_code == 201
+    assert (await latest_voltage())["value"] == 231.5
+
+    response = await client.delete("/components/3", headers=manager_headers)
+    assert response.status_code == 204
+    response = await client.get(
+        "/components/latest", params={"component_id": 3}, headers=manager_headers
+    )
+    assert response.json() == []
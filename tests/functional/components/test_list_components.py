@@ -0,0 +1,40 @@
+import pytest
+from pydantic import TypeAdapter
+
+from api.schemas.component import ComponentResponse
+from tests.conftest import NUM_COMPONENTS
+
+adapter = TypeAdapter(list[ComponentResponse])
+
+
+@pytest.mark.anyio
+async def test_list_components_matches_response_model(client, manager_headers):
+    response = await client.get("/components?limit=1000", headers=manager_headers)
+    assert response.status_code == 200
+
+    # NOTE: the fast path must be byte-compatible with the validated response model
+    components = adapter.validate_json(response.content)
+    assert len(components) == NUM_COMPONENTS
+    assert adapter.dump_json(components) == response.content
+
+
+@pytest.mark.anyio
+async def test_list_components_filters(client, manager_headers):
+    response = await client.get(
+        "/components",
+        params={"component_type": "LINE", "substation": "SUB_1"},
+        headers=manager_headers,
+    )
+    assert response.status_code == 200
+    components = response.json()
+    assert components
+    assert all(c["component_type"] == "LINE" for c in components)
+    assert all(c["substation"] == "SUB_1" for c in components)
+    assert set(components[0]) == {
+        "id",
+        "name",
+        "substation",
+        "component_type",
+        "length_km",
+        "voltage_kv",
+    }
@@ -0,0 +1,95 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from db.config import MeasurementStorage, settings
+from db.migrations import migrate_to_chunks
+from db.rollups import compact
+from tests.conftest import NUM_MEASUREMENTS
+
+URL = "/components/1/measurements"
+PARAMS = {
+    "measurement_type": "VOLTAGE",
+    "start": "2026-01-01T00:00:00Z",
+    "end": "2026-01-02T00:00:00Z",
+}
+
+
+@pytest.mark.anyio
+async def test_measurement_series_buckets(client, manager_headers):
+    response = await client.get(
+        URL, params=PARAMS | {"points": 24}, headers=manager_headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+
+    assert data["raw_count"] == NUM_MEASUREMENTS
+    # NOTE: the fixture readings (15s apart) span the first two hourly buckets
+    buckets = data["buckets"]
+    assert [bucket["timestamp"][:19] for bucket in buckets] == [
+        "2026-01-01T00:00:00",
+        "2026-01-01T01:00:00",
+    ]
+    assert sum(bucket["count"] for bucket in buckets) == NUM_MEASUREMENTS
+    assert all(b["min"] <= b["avg"] <= b["max"] for b in buckets)
+
+
+@pytest.mark.anyio
+async def test_measurement_series_lttb(client, manager_headers):
+    response = await client.get(
+        URL, params=PARAMS | {"points": 50, "mode": "lttb"}, headers=manager_headers
+    )
+    assert response.status_code == 200
+    points = response.json()["points"]
+
+    assert len(points) == 50
+    timestamps = [point["timestamp"] for point in points]
+    assert timestamps == sorted(timestamps)
+    assert timestamps[0].startswith("2026-01-01T00:00:00")
+
+
+@pytest.mark.anyio
+async def test_measurement_series_unknown_component(client, manager_headers):
+    response = await client.get(
+        "/components/999999/measurements", params=PARAMS, headers=manager_headers
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_measurement_series_chunks(client, session, manager_headers, monkeypatch):
+    params = PARAMS | {"points": 50, "mode": "lttb"}
+    response = await client.get(URL, params=params, headers=manager_headers)
+    rows = response.json()
+
+    migrate_to_chunks(session.get_bind(), delete_rows=True)
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+    response = await client.get(URL, params=params, headers=manager_headers)
+    assert response.status_code == 200
+    assert response.json() == rows
+    assert rows["raw_count"] == NUM_MEASUREMENTS
+
+
+@pytest.mark.anyio
+async def test_measurement_series_rollups(client, session, manager_headers):
+    params = PARAMS | {"points": 24}
+    response = await client.get(URL, params=params, headers=manager_headers)
+    buckets = response.json()["buckets"]
+
+    # The first hour compacted into one rollup
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    compact(session.get_bind(), start + timedelta(hours=1), bucket_seconds=3600)
+    response = await client.get(URL, params=params, headers=manager_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["raw_count"] == NUM_MEASUREMENTS
+    assert data["buckets"] == [
+        bucket | {"avg": pytest.approx(bucket["avg"])} for bucket in buckets
+    ]
+
+    # Starting within the rollup bucket, the whole rollup counts
+    params = PARAMS | {"start": "2026-01-01T00:30:00Z", "mode": "lttb"}
+    response = await client.get(URL, params=params, headers=manager_headers)
+    points = response.json()["points"]
+    assert points[0]["timestamp"].startswith("2026-01-01T00:00:00")
+    assert response.json()["raw_count"] == NUM_MEASUREMENTS
@@ -0,0 +1,72 @@
+from datetime import UTC, datetime
+
+import polars as pl
+import pytest
+from sqlmodel import col, func, select
+
+from core.services.report import ReportService
+from db.chunks import ChunkStore
+from db.config import MeasurementStorage, settings
+from db.migrations import migrate_to_chunks
+from db.models import MeasurementDB
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+def report_rows(service: ReportService) -> list[tuple]:
+    df = service._extract_data(START, END)
+    columns = sorted(df.columns)
+    return df.select(columns).sort(columns).rows()
+
+
+@pytest.mark.anyio
+async def test_chunk_storage(client, session, manager_headers, monkeypatch):
+    service = ReportService()
+    rows = report_rows(service)
+
+    copied = migrate_to_chunks(session.get_bind(), delete_rows=True)
+    assert copied == NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+    assert report_rows(service) == rows
+
+    payload = {
+        "component_id": 1,
+        "timestamp": "2026-01-01T00:00:05Z",
+        "value": 42.0,
+        "measurement_type": "POWER",
+    }
+    response = await client.post("/measurements", json=payload, headers=manager_headers)
+    assert response.status_code == 201
+    assert response.json()["id"] is None
+
+    response = await client.post("/measurements", json=payload, headers=manager_headers)
+    assert response.status_code == 409
+
+    assert len(report_rows(service)) == len(rows) + 1
+
+
+def test_migrate_to_existing_chunks(session, monkeypatch):
+    engine = session.get_bind()
+    service = ReportService()
+    rows = report_rows(service)
+
+    # The ingestion already wrote chunks for the component
+    reading = {
+        "component_id": [1],
+        "measurement_type": ["POWER"],
+        "timestamp": [datetime(2026, 1, 1, 0, 0, 5, tzinfo=UTC)],
+        "value": [42.0],
+    }
+    ChunkStore().append(session, pl.DataFrame(reading))
+
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert migrate_to_chunks(engine, components_per_batch=7) == total
+    # Resumed, the readings already copied are skipped
+    assert migrate_to_chunks(engine, delete_rows=True) == 0
+    assert session.exec(select(func.count(col(MeasurementDB.id)))).one() == 0
+
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+    assert len(report_rows(service)) == len(rows) + 1
@@ -0,0 +1,50 @@
+from datetime import UTC, datetime
+
+import pytest
+from sqlmodel import col, func, select
+
+from core.services.compaction import CompactionService
+from core.services.report import ReportService
+from db.models import MeasurementDB, MeasurementRollupDB
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+def report(start: datetime, end: datetime) -> dict:
+    service = ReportService()
+    df = service._extract_data(start, end)
+    return service._transform_to_kpis(df.lazy()).model_dump()
+
+
+@pytest.mark.parametrize("rollup_seconds", [3600, 86_400])
+def test_reports_read_the_rollups(session, monkeypatch, rollup_seconds):
+    monkeypatch.setattr("db.config.settings.ROLLUP_SECONDS", rollup_seconds)
+    before = report(START, END)
+
+    # The readings of the first hour are older than the retention
+    now = datetime(2026, 1, 31, 1, 0, tzinfo=UTC)
+    compacted = CompactionService(retention_days=30).run(now)
+    raw = session.exec(select(func.count(col(MeasurementDB.id)))).one()
+    rollups = session.exec(select(func.count(col(MeasurementRollupDB.id)))).one()
+    if rollup_seconds == 3600:
+        assert compacted == NUM_COMPONENTS * 3 * 240
+        assert rollups == NUM_COMPONENTS * 3
+    else:
+        # The day is not over at the cutoff, nothing is compacted
+        assert compacted == rollups == 0
+    assert raw + compacted == NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+
+    after = report(START, END)
+    assert after["summary"] == before["summary"]
+    key = ("day", "measurement_type", "component_type")
+    before_avgs = {tuple(a[k] for k in key): a for a in before["daily_averages"]}
+    for avg in after["daily_averages"]:
+        expected = before_avgs[tuple(avg[k] for k in key)]
+        assert avg["avg_value"] == pytest.approx(expected["avg_value"])
+        # The rollups keep the bins of their readings: same percentiles
+        assert [avg[p] for p in ("p5", "p50", "p95")] == [
+            expected[p] for p in ("p5", "p50", "p95")
+        ]
+    assert after["value_quantiles"] == before["value_quantiles"]
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from core.services.report import ReportService
+from db.config import MeasurementStorage, TimestampStorage, settings
+from db.migrations import migrate_timestamps, migrate_to_chunks
+from db.shards import rebalance, reset_shard_engines, shard_engines, shard_uri
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+from tests.functional.measurements.test_chunk_storage import report_rows
+
+SHARDS = 3
+
+
+@pytest.fixture(name="shards")
+def shards_fixture(session):
+    yield
+    reset_shard_engines()
+    for i in range(SHARDS):
+        path = shard_uri(i, SHARDS).replace("sqlite:///", "")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def count_measurements(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT count(*) FROM measurements")).scalar()
+
+
+@pytest.mark.anyio
+async def test_sharded_measurements(
+    client, session, manager_headers, shards, monkeypatch
+):
+    service = ReportService()
+    rows = report_rows(service)
+
+    assert rebalance(1, SHARDS) == NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert count_measurements(session.get_bind()) == 0
+    monkeypatch.setattr(settings, "SHARDS", SHARDS)
+    counts = [count_measurements(engine) for engine in shard_engines()]
+    assert sum(counts) == NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert min(counts) > 0
+
+    # Reports fan out over the shards
+    assert report_rows(service) == rows
+
+    # Writes and reads are routed to the shard of the component
+    payload = {
+        "component_id": 4,
+        "timestamp": "2026-01-01T00:00:05Z",
+        "value": 42.0,
+        "measurement_type": "POWER",
+    }
+    response = await client.post("/measurements", json=payload, headers=manager_headers)
+    assert response.status_code == 201
+    assert count_measurements(shard_engines()[4 % SHARDS]) == counts[4 % SHARDS] + 1
+    response = await client.post("/measurements", json=payload, headers=manager_headers)
+    assert response.status_code == 409
+
+    params = {"component_id": [1, 2, 3], "start": "2026-01-01", "end": "2026-01-02"}
+    response = await client.get(
+        "/measurements/export", params=params, headers=manager_headers
+    )
+    assert len(response.text.splitlines()) == 3 * NUM_MEASUREMENTS * 3
+
+    response = await client.delete("/components/4", headers=manager_headers)
+    assert response.status_code == 204
+    assert count_measurements(shard_engines()[4 % SHARDS]) == counts[4 % SHARDS] - (
+        NUM_MEASUREMENTS * 3
+    )
+
+    # And back to a single database
+    reset_shard_engines()
+    monkeypatch.setattr(settings, "SHARDS", 1)
+    rebalance(SHARDS, 1)
+    assert count_measurements(session.get_bind()) == (NUM_COMPONENTS - 1) * (
+        NUM_MEASUREMENTS * 3
+    )
+
+
+def test_migrate_sharded_timestamps(session, shards, monkeypatch):
+    rows = report_rows(ReportService())
+    rebalance(1, SHARDS)
+    monkeypatch.setattr(settings, "SHARDS", SHARDS)
+
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert migrate_timestamps(session.get_bind(), TimestampStorage.EPOCH_US) == total
+    monkeypatch.setattr(settings, "TIMESTAMP_STORAGE", TimestampStorage.EPOCH_US)
+    reset_shard_engines()
+    assert report_rows(ReportService()) == rows
+
+
+def test_migrate_sharded_chunks(session, shards, monkeypatch):
+    rows = report_rows(ReportService())
+    rebalance(1, SHARDS)
+    monkeypatch.setattr(settings, "SHARDS", SHARDS)
+
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert migrate_to_chunks(session.get_bind(), delete_rows=True) == total
+    assert [count_measurements(engine) for engine in shard_engines()] == [0] * SHARDS
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+    assert report_rows(ReportService()) == rows
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from api.middleware import profile_limiter, profile_store
+
+# The whole fixture range: the report is long enough to be sampled
+PERIOD = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-02T00:00:00Z"}
+
+
+@pytest.fixture(autouse=True)
+def fresh_profiler():
+    profile_limiter.reset()
+    profile_store.reset()
+
+
+@pytest.fixture(name="user_headers")
+async def user_headers_fixture(client):
+    response = await client.post(
+        "/auth/token", data={"username": "user", "password": "user"}
+    )
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def busy_elsewhere(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.anyio
+async def test_profile_request(client, manager_headers):
+    headers = manager_headers | {"X-Profile": "1", "X-Request-ID": "slow-report"}
+    # A thread busy meanwhile, as a concurrent request or job would be
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_elsewhere, args=(stop,))
+    thread.start()
+    try:
+        response = await client.post("/reports", json=PERIOD, headers=headers)
+    finally:
+        stop.set()
+        thread.join()
+    assert response.status_code == 202
+    assert response.headers["X-Profile-Id"] == "slow-report"
+
+    response = await client.get("/profiles", headers=manager_headers)
+    assert [p["request_id"] for p in response.json()] == ["slow-report"]
+    assert response.json()[0]["samples"] > 0
+
+    response = await client.get("/profiles/slow-report", headers=manager_headers)
+    assert response.status_code == 200
+    stacks = response.text.splitlines()
+    assert stacks
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks)
+    # The background task of the request is sampled too
+    assert any("run_report_task" in line for line in stacks)
+    # But not the work of the other threads
+    assert not any("busy_elsewhere" in line for line in stacks)
+
+    response = await client.get("/profiles/unknown", headers=manager_headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_profile_request_restrictions(
+    client, manager_headers, user_headers, monkeypatch
+):
+    response = await client.get(
+        "/components", headers=user_headers | {"X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+
+    response = await client.get("/profiles", headers=user_headers)
+    assert response.status_code == 401
+
+    monkeypatch.setattr(profile_limiter, "limit", 1)
+    headers = manager_headers | {"X-Profile": "1"}
+    response = await client.get("/components", headers=headers)
+    assert "X-Profile-Id" in response.headers
+    response = await client.get("/components", headers=headers)
+    assert "X-Profile-Id" not in response.headers
@@ -0,0 +1,82 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from core.services.report import ReportService
+from db.models import ReportDB
+
+PERIODS = [
+    ("2026-01-01T00:00:00Z", "2026-01-01T00:29:59Z"),
+    # Overlaps the first and the third periods
+    ("2026-01-01T00:20:00Z", "2026-01-01T00:59:59Z"),
+    # Partly after the last measurements
+    ("2026-01-01T00:45:00Z", "2026-01-01T02:00:00Z"),
+    # No measurements
+    ("2026-02-01T00:00:00Z", "2026-02-02T00:00:00Z"),
+]
+
+
+def expected_report(start: str, end: str) -> dict:
+    service = ReportService()
+    df = service._extract_data(
+        datetime.fromisoformat(start), datetime.fromisoformat(end)
+    )
+    return json.loads(service._transform_to_kpis(df.lazy()).model_dump_json())
+
+
+def normalized(report: dict) -> dict:
+    key = ("day", "measurement_type", "component_type")
+    return {
+        "summary": {
+            name: sorted(rows, key=json.dumps)
+            for name, rows in report["summary"].items()
+        },
+        "daily_averages": sorted(
+            report["daily_averages"], key=lambda a: tuple(a[k] for k in key)
+        ),
+    }
+
+
+@pytest.mark.anyio
+async def test_batch_report(client, manager_headers, session):
+    payload = {"periods": [{"start_date": s, "end_date": e} for s, e in PERIODS]}
+    response = await client.post(
+        "/reports/batch", json=payload, headers=manager_headers
+    )
+    assert response.status_code == 202
+    reports = response.json()
+    assert [(r["start_date"][:19], r["end_date"][:19]) for r in reports] == [
+        (s[:19], e[:19]) for s, e in PERIODS
+    ]
+
+    for report, (start, end) in zip(reports[:3], PERIODS, strict=False):
+        response = await client.get(f"/reports/{report['id']}", headers=manager_headers)
+        assert response.status_code == 200
+        result = normalized(response.json()["result_json"])
+        expected = normalized(expected_report(start, end))
+        assert result["summary"] == expected["summary"]
+        assert [a.pop("avg_value") for a in result["daily_averages"]] == pytest.approx(
+            [a.pop("avg_value") for a in expected["daily_averages"]]
+        )
+        assert result["daily_averages"] == expected["daily_averages"]
+
+    # The empty period completes without results, as a single report would
+    session.expire_all()
+    assert session.get(ReportDB, reports[3]["id"]).status == "completed"
+
+    # The reports share the stats of the batch job, marked by the batch id
+    stats = [
+        (await client.get(f"/reports/{r['id']}/stats", headers=manager_headers)).json()
+        for r in reports
+    ]
+    assert all(s["batch_id"] == reports[0]["id"] for s in stats)
+    assert all(s == stats[0] for s in stats)
+
+
+@pytest.mark.anyio
+async def test_batch_report_validation(client, manager_headers):
+    response = await client.post(
+        "/reports/batch", json={"periods": []}, headers=manager_headers
+    )
+    assert response.status_code == 422
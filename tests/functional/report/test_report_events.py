@@ -0,0 +1,84 @@
+import json
+from datetime import UTC, datetime
+
+import anyio
+import anyio.to_thread
+import pytest
+
+from core.models import FinalReportSchema, ReportSummary
+from core.notifications import report_notifier
+from core.services.report import ReportService
+from db.models import ReportDB
+
+
+@pytest.fixture(name="pending_report")
+def pending_report_fixture(session) -> int:
+    report = ReportDB(
+        start_date=datetime(2026, 1, 1, tzinfo=UTC),
+        end_date=datetime(2026, 1, 2, tzinfo=UTC),
+    )
+    session.add(report)
+    session.commit()
+    assert report.id is not None
+    return report.id
+
+
+async def complete_when_awaited(report_id: int):
+    """Complete the report from a worker thread, as the report task does."""
+    while not report_notifier.waiters(report_id):
+        await anyio.sleep(0.01)
+    report = FinalReportSchema(
+        summary=ReportSummary(
+            components_by_type=[],
+            transformer_capacity_by_voltage=[],
+            line_length_by_voltage=[],
+        ),
+        daily_averages=[],
+    )
+    await anyio.to_thread.run_sync(
+        lambda: ReportService()._update_db_status(
+            report_id, "completed", report.model_dump_json()
+        )
+    )
+
+
+@pytest.mark.anyio
+async def test_long_poll(client, manager_headers, pending_report):
+    url = f"/reports/{pending_report}"
+    response = await client.get(url, params={"wait": 0.05}, headers=manager_headers)
+    assert response.status_code == 409
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(complete_when_awaited, pending_report)
+        with anyio.fail_after(5):
+            response = await client.get(
+                url, params={"wait": 30}, headers=manager_headers
+            )
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert report_notifier.waiters(pending_report) == 0
+
+
+@pytest.mark.anyio
+async def test_events(client, manager_headers, pending_report):
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(complete_when_awaited, pending_report)
+        with anyio.fail_after(5):
+            response = await client.get(
+                f"/reports/{pending_report}/events", headers=manager_headers
+            )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = [
+        dict(line.split(": ", 1) for line in block.splitlines())
+        for block in response.text.strip().split("\n\n")
+    ]
+    assert [e["event"] for e in events] == ["status", "status"]
+    statuses = [json.loads(e["data"]) for e in events]
+    assert statuses[0]["status"] == "pending"
+    assert statuses[1]["status"] == "completed"
+    assert statuses[1]["result_json"]["daily_averages"] == []
+
+    response = await client.get("/reports/0/events", headers=manager_headers)
+    assert response.status_code == 404
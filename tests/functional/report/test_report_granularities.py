@@ -0,0 +1,70 @@
+from datetime import UTC, datetime
+
+import polars as pl
+import pytest
+
+from core.models import ReportGranularity
+from core.services.report import ReportService
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+def test_every_granularity_from_one_pass(session):
+    service = ReportService()
+    df = service._extract_data(START, END)
+    granularities = [ReportGranularity.DAY, ReportGranularity.FIFTEEN_MINUTES]
+    report = service._transform_to_kpis(df.lazy(), granularities=granularities)
+
+    # Finest first, whatever the order of the request
+    assert [g.granularity for g in report.bucket_averages] == granularities[::-1]
+    for series in report.bucket_averages:
+        expected = {
+            (bucket, measurement_type, component_type): (avg_value, count)
+            for bucket, measurement_type, component_type, avg_value, count in (
+                df.group_by(
+                    pl.col("timestamp").dt.truncate(series.granularity.value),
+                    "measurement_type",
+                    "component_type",
+                )
+                .agg(pl.col("value").mean(), pl.len())
+                .iter_rows()
+            )
+        }
+        assert len(series.averages) == len(expected)
+        for average in series.averages:
+            avg_value, count = expected[
+                (average.bucket, average.measurement_type, average.component_type)
+            ]
+            assert average.avg_value == pytest.approx(avg_value)
+            assert average.count == count
+        assert sum(a.count for a in series.averages) == df.height
+
+    # 300 readings every 15 seconds, i.e. 5 buckets of 15 minutes
+    assert len(report.bucket_averages[0].averages) == 5 * 3 * 3
+    assert df.height == NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+
+
+@pytest.mark.anyio
+async def test_report_granularities(client, manager_headers):
+    payload = {
+        "start_date": "2026-01-01T00:00:00Z",
+        "end_date": "2026-01-01T00:09:59Z",
+        "granularities": ["1h", "1w"],
+    }
+    response = await client.post("/reports", json=payload, headers=manager_headers)
+    assert response.status_code == 201
+
+    result = response.json()["result_json"]
+    assert [g["granularity"] for g in result["bucket_averages"]] == ["1h", "1w"]
+    hourly, weekly = (g["averages"] for g in result["bucket_averages"])
+    assert {a["bucket"] for a in hourly} == {"2026-01-01T00:00:00Z"}
+    # 2026-01-01 is a Thursday, its week starts on Monday
+    assert {a["bucket"] for a in weekly} == {"2025-12-29T00:00:00Z"}
+    assert [a["avg_value"] for a in hourly] == [a["avg_value"] for a in weekly]
+
+    # Without granularities, no bucket averages
+    del payload["granularities"]
+    response = await client.post("/reports", json=payload, headers=manager_headers)
+    assert response.json()["result_json"]["bucket_averages"] == []
@@ -0,0 +1,87 @@
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from core.services.report import ReportService
+from db.config import MeasurementStorage, settings
+from db.migrations import migrate_to_chunks
+from db.rollups import compact
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+@pytest.mark.anyio
+async def test_small_report_is_computed_inline(client, manager_headers):
+    # 10 minutes of data: 40 timestamps x 3 types x 100 components
+    payload = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-01T00:09:59Z"}
+    response = await client.post("/reports", json=payload, headers=manager_headers)
+    assert response.status_code == 201
+
+    report = response.json()
+    assert report["status"] == "completed"
+    assert report["estimated_duration"] is None
+    assert {a["measurement_type"] for a in report["result_json"]["daily_averages"]} == {
+        "VOLTAGE",
+        "CURRENT",
+        "POWER",
+    }
+
+    response = await client.get(f"/reports/{report['id']}", headers=manager_headers)
+    assert response.json() == report
+
+
+@pytest.mark.anyio
+async def test_large_report_is_queued(client, manager_headers, monkeypatch):
+    monkeypatch.setattr(settings, "INLINE_REPORT_MAX_ROWS", 1000)
+    payload = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-01T00:09:59Z"}
+    response = await client.post("/reports", json=payload, headers=manager_headers)
+    assert response.status_code == 202
+    # 12000 readings, not the 1001 of the capped count
+    assert response.json()["estimated_duration"] == pytest.approx(
+        12000 / ReportService.ROWS_PER_SECOND, rel=0.2
+    )
+    assert "result_json" not in response.json()
+
+
+def test_estimate_is_capped(session, monkeypatch):
+    service = ReportService()
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert service.estimate_rows(START, END) == total
+    assert service.estimate_rows(START, END, limit=total) == total
+    assert service.estimate_rows(START, END, limit=1000) == 1001
+
+    # The first hour compacted: one rollup per component and type
+    compact(session.get_bind(), START + timedelta(hours=1), bucket_seconds=3600)
+    first_hour = NUM_COMPONENTS * 240 * 3
+    expected = total - first_hour + NUM_COMPONENTS * 3
+    assert service.estimate_rows(START, END) == expected
+    assert service.estimate_rows(START, END, limit=expected) == expected
+    assert service.estimate_rows(START, END, limit=expected - 1) == expected
+
+    # A chunk header counts all of its readings: past the cap, at most the total
+    migrate_to_chunks(session.get_bind(), delete_rows=True)
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+    assert service.estimate_rows(START, END) == expected
+    assert 1000 < service.estimate_rows(START, END, limit=1000) <= expected
+
+
+def test_estimate_is_extrapolated(session, monkeypatch):
+    service = ReportService()
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    # The period of the readings, one every 15 seconds
+    end = START + timedelta(seconds=15 * NUM_MEASUREMENTS)
+    assert service.extrapolate_rows(START, end, sample_rows=1000) == pytest.approx(
+        total, rel=0.1
+    )
+    # Slices widened up to the whole period: the exact count
+    assert service.extrapolate_rows(START, end, sample_rows=total + 1) == total
+
+    compact(session.get_bind(), START + timedelta(minutes=30), bucket_seconds=600)
+    expected = service.estimate_rows(START, end)
+    assert service.extrapolate_rows(START, end) == pytest.approx(expected, rel=0.1)
+
+    migrate_to_chunks(session.get_bind(), delete_rows=True)
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+    assert service.extrapolate_rows(START, end) == expected
@@ -0,0 +1,103 @@
+import asyncio
+import math
+from datetime import datetime
+
+import numpy as np
+import polars as pl
+import pytest
+
+from core.models import ReportSampling
+from core.services.report import ReportService
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+PERIOD = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-02T00:00:00Z"}
+
+
+async def run_report(client, headers, payload) -> dict:
+    response = await client.post("/reports", json=payload, headers=headers)
+    if response.status_code == 201:
+        return response.json()["result_json"]
+    assert response.status_code == 202
+    for _ in range(20):
+        response = await client.get(
+            f"/reports/{response.json()['id']}", headers=headers
+        )
+        if response.status_code == 200:
+            return response.json()["result_json"]
+        await asyncio.sleep(0.2)
+    raise AssertionError("Report timed out")
+
+
+@pytest.mark.anyio
+async def test_preview_report(client, manager_headers, monkeypatch):
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    monkeypatch.setattr(ReportService, "PREVIEW_SAMPLE_ROWS", total // 10)
+
+    exact = await run_report(client, manager_headers, PERIOD)
+    preview = await run_report(client, manager_headers, PERIOD | {"mode": "preview"})
+
+    assert exact["sampling"] is None
+    sampling = preview["sampling"]
+    assert sampling["stride"] == 10
+    assert sampling["estimated_rows"] == total
+    # NOTE: the hash sample is close to, not exactly, 1/stride of the rows
+    assert 0.8 * total / 10 < sampling["sampled_rows"] < 1.2 * total / 10
+
+    key = ("day", "measurement_type", "component_type")
+    exact_avgs = {tuple(a[k] for k in key): a for a in exact["daily_averages"]}
+    assert len(preview["daily_averages"]) == len(exact_avgs)
+    for avg in preview["daily_averages"]:
+        truth = exact_avgs[tuple(avg[k] for k in key)]["avg_value"]
+        assert avg["sample_size"] > 0
+        assert avg["ci_low"] < avg["avg_value"] < avg["ci_high"]
+        half_width = avg["ci_high"] - avg["avg_value"]
+        assert abs(avg["avg_value"] - truth) < 3 * half_width
+
+    # Every measurement type is sampled, whatever the insertion order
+    assert {a["measurement_type"] for a in preview["daily_averages"]} == {
+        "VOLTAGE",
+        "CURRENT",
+        "POWER",
+    }
+
+
+def test_preview_interval_of_weighted_readings(session):
+    service = ReportService()
+    start, end = (datetime.fromisoformat(PERIOD[k]) for k in PERIOD)
+    df = service._extract_data(start, end, stride=10)
+    sampling = ReportSampling(stride=10, estimated_rows=0, sampled_rows=df.height)
+    fpc = math.sqrt(1 - 1 / sampling.stride)
+    key = ("measurement_type", "component_type")
+
+    def half_widths(df: pl.DataFrame) -> dict[tuple, float]:
+        report = service._transform_to_kpis(df.lazy(), sampling=sampling)
+        widths = {}
+        for a in report.daily_averages:
+            assert a.ci_high is not None
+            widths[tuple(getattr(a, k) for k in key)] = a.ci_high - a.avg_value
+        return widths
+
+    # Readings of weight 1: the usual std / sqrt(n)
+    for (measurement_type, component_type), half_width in half_widths(df).items():
+        values = df.filter(
+            pl.col("measurement_type") == measurement_type,
+            pl.col("component_type") == component_type,
+        )["value"].to_numpy()
+        expected = (
+            ReportService.Z_95 * fpc * values.std(ddof=1) / math.sqrt(len(values))
+        )
+        assert half_width == pytest.approx(expected)
+
+    # As if some readings were rollups
+    weighted = df.with_columns(weight=pl.col("component_id") % 3 + 1)
+    for (measurement_type, component_type), half_width in half_widths(weighted).items():
+        group = weighted.filter(
+            pl.col("measurement_type") == measurement_type,
+            pl.col("component_type") == component_type,
+        )
+        values, weights = group["value"].to_numpy(), group["weight"].to_numpy()
+        mean = np.average(values, weights=weights)
+        variance = np.average((values - mean) ** 2, weights=weights)
+        effective_size = weights.sum() ** 2 / (weights**2).sum()
+        expected = ReportService.Z_95 * fpc * math.sqrt(variance / (effective_size - 1))
+        assert half_width == pytest.approx(expected)
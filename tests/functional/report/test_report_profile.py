@@ -0,0 +1,37 @@
+import pytest
+
+from core.services.report import KPI_QUERIES
+
+# 10 minutes of data, computed inline
+PERIOD = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-01T00:09:59Z"}
+
+
+@pytest.mark.anyio
+async def test_debug_report_profile(client, manager_headers):
+    response = await client.post(
+        "/reports", json=PERIOD | {"debug": True}, headers=manager_headers
+    )
+    report = response.json()
+    assert report["status"] == "completed"
+
+    response = await client.get(
+        f"/reports/{report['id']}/profile", headers=manager_headers
+    )
+    assert response.status_code == 200
+    profile = response.json()
+    assert [q["name"] for q in profile["queries"]] == list(KPI_QUERIES)
+    for query in profile["queries"]:
+        assert query["plan"]
+        assert query["nodes"]
+        assert all(n["end_us"] >= n["start_us"] >= 0 for n in query["nodes"])
+    # The unique components feed three of the queries, computed once jointly
+    assert "CACHE" in profile["combined_plan"]
+
+    # Same KPIs as without debug
+    response = await client.post("/reports", json=PERIOD, headers=manager_headers)
+    assert response.json()["result_json"] == report["result_json"]
+
+    response = await client.get(
+        f"/reports/{response.json()['id']}/profile", headers=manager_headers
+    )
+    assert response.status_code == 404
@@ -0,0 +1,37 @@
+from datetime import UTC, datetime
+
+import polars as pl
+import pytest
+
+from core.services.report import ReportService
+from db.sketches import QUANTILES
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+def test_quantiles_within_the_stated_accuracy(session):
+    service = ReportService()
+    df = service._extract_data(START, END)
+    report = service._transform_to_kpis(df.lazy())
+
+    exact = {
+        (row["measurement_type"], row["component_type"]): row
+        for row in df.group_by("measurement_type", "component_type")
+        .agg(
+            pl.len().alias("count"),
+            *(
+                pl.col("value").quantile(q, interpolation="lower").alias(name)
+                for name, q in QUANTILES.items()
+            ),
+        )
+        .iter_rows(named=True)
+    }
+    assert len(report.value_quantiles) == len(exact) == 9
+    for quantiles in report.value_quantiles:
+        expected = exact[(quantiles.measurement_type, quantiles.component_type)]
+        assert quantiles.count == expected["count"]
+        for name in QUANTILES:
+            assert getattr(quantiles, name) == pytest.approx(
+                expected[name], rel=report.quantile_accuracy
+            )
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from sqlmodel import col, func, select
+
+from core.services.report import ReportService
+from db.models import MeasurementDB
+from db.rollups import compact
+from db.replica import copy_database, replica_path, reset_replicas
+from tests.conftest import NUM_COMPONENTS, NUM_MEASUREMENTS
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+@pytest.fixture(name="replica")
+def replica_fixture(session, monkeypatch):
+    monkeypatch.setattr("db.config.settings.REPLICA_MAX_AGE_S", 3600)
+    reset_replicas()
+    path = replica_path(session.get_bind().url.database)
+    yield path
+    reset_replicas()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def add_reading(session):
+    session.add(
+        MeasurementDB(
+            component_id=1,
+            timestamp=datetime(2026, 1, 1, 12, tzinfo=UTC),
+            value=1.0,
+            measurement_type="VOLTAGE",
+        )
+    )
+    session.commit()
+
+
+def test_reports_read_the_last_copy(session, replica):
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert ReportService()._extract_data(START, END).height == total
+    assert os.path.exists(replica)
+
+    # Readings after the copy are not seen until the replica is refreshed
+    add_reading(session)
+    assert ReportService()._extract_data(START, END).height == total
+
+
+def test_replica_refreshed_in_background(session, replica, monkeypatch):
+    monkeypatch.setattr("db.config.settings.REPLICA_MAX_AGE_S", 0.1)
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    assert ReportService()._extract_data(START, END).height == total
+
+    add_reading(session)
+    deadline = time.monotonic() + 10
+    while ReportService()._extract_data(START, END).height == total:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_reports_read_live_without_replica(session):
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+    add_reading(session)
+    assert ReportService()._extract_data(START, END).height == total + 1
+    assert not os.path.exists(replica_path(session.get_bind().url.database))
+
+
+def test_copy_is_a_snapshot_during_compaction(session, replica):
+    engine = session.get_bind()
+    total = NUM_COMPONENTS * NUM_MEASUREMENTS * 3
+
+    # Another connection compacts a minute of readings per transaction meanwhile
+    def run_compaction():
+        for minutes in range(1, NUM_MEASUREMENTS // 4 + 2):
+            compact(engine, START + timedelta(minutes=minutes), bucket_seconds=60)
+
+    compaction = threading.Thread(target=run_compaction)
+    compaction.start()
+    counts = []
+    try:
+        while compaction.is_alive():
+            copy_database(engine.url.database, replica)
+            with sqlite3.connect(replica) as conn:
+                counts.append(
+                    conn.execute(
+                        "SELECT (SELECT count(*) FROM measurements)"
+                        " + (SELECT coalesce(sum(value_count), 0)"
+                        " FROM measurement_rollups)"
+                    ).fetchone()[0]
+                )
+    finally:
+        compaction.join()
+
+    # Every copy has each reading exactly once, raw or rolled up
+    assert session.exec(select(func.count(col(MeasurementDB.id)))).one() == 0
+    assert counts
+    assert set(counts) == {total}
@@ -0,0 +1,49 @@
+from datetime import UTC, datetime
+
+import pytest
+
+from core.models import ReportGranularity, ReportSampling, ReportScope
+from core.services.report import ReportService
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+END = datetime(2026, 1, 2, tzinfo=UTC)
+
+
+@pytest.mark.parametrize(
+    ("stride", "scope", "granularities"),
+    [
+        (1, None, None),
+        (7, None, list(ReportGranularity)),
+        # No transformer: an all-null capacity column
+        (1, ReportScope(component_type=["LINE"]), [ReportGranularity.HOUR]),
+    ],
+)
+def test_report_json_matches_the_domain_model(session, stride, scope, granularities):
+    service = ReportService()
+    df = service._extract_data(START, END, stride, scope)
+    sampling = (
+        ReportSampling(
+            stride=stride, estimated_rows=df.height * stride, sampled_rows=df.height
+        )
+        if stride > 1
+        else None
+    )
+    results = service._collect_kpis(df.lazy(), sampling, granularities)
+    assert (
+        service._to_report_json(results, sampling)
+        == service._to_report(results, sampling).model_dump_json()
+    )
+
+
+def test_batch_report_json(session):
+    service = ReportService()
+    windows = [
+        (1, START, datetime(2026, 1, 1, 0, 30, tzinfo=UTC)),
+        (2, datetime(2026, 1, 1, 0, 30, tzinfo=UTC), END),
+    ]
+    tagged = service._tag_windows(service._extract_data(START, END), windows)
+    for results in service._transform_windows(tagged).values():
+        assert (
+            service._to_report_json(results)
+            == service._to_report(results).model_dump_json()
+        )
@@ -0,0 +1,47 @@
+import pytest
+
+from core.services.report import ReportService
+
+# 10 minutes of data: 40 timestamps x 3 types x 100 components
+PERIOD = {"start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-01T00:09:59Z"}
+
+
+@pytest.mark.anyio
+async def test_report_stats(client, manager_headers):
+    response = await client.post("/reports", json=PERIOD, headers=manager_headers)
+    report_id = response.json()["id"]
+
+    response = await client.get(f"/reports/{report_id}/stats", headers=manager_headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["rows_extracted"] == 40 * 3 * 100
+    assert stats["bytes_extracted"] > 0
+    for stage in ("extract", "transform", "load"):
+        assert stats[f"{stage}_wall_s"] > 0
+        assert stats[f"{stage}_cpu_s"] >= 0
+    assert stats["peak_rss_bytes"] > 0
+    assert stats["polars_threads"] >= 1
+    assert stats["batch_id"] is None
+
+    response = await client.get("/reports", headers=manager_headers)
+    listed = next(r for r in response.json() if r["id"] == report_id)
+    assert listed["stats"] == stats
+
+    response = await client.get("/reports/0/stats", headers=manager_headers)
+    assert response.status_code == 404
+
+
+@pytest.mark.anyio
+async def test_failed_report(client, manager_headers, monkeypatch):
+    def fail(*args, **kwargs):
+        raise ValueError("boom")
+
+    monkeypatch.setattr(ReportService, "_collect_kpis", fail)
+    response = await client.post("/reports", json=PERIOD, headers=manager_headers)
+    report = response.json()
+    assert report["status"] == "failed"
+    assert report["error_message"] == "boom"
+
+    response = await client.get(f"/reports/{report['id']}", headers=manager_headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Report failed: boom"
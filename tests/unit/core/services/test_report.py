@@ -1,7 +1,13 @@
 import polars as pl
+import pytest
 from core.services.report import ReportService
 from core.models import ComponentType
-from core.models import FinalReportSchema, TransformerCapacity, DailyAverage
+from core.models import (
+    DailyAverage,
+    FinalReportSchema,
+    SubstationAverage,
+    TransformerCapacity,
+)
 
 
 def test_transform_to_kpis_logic():
@@ -21,6 +27,7 @@ def test_transform_to_kpis_logic():
                 ComponentType.TRANSFORMER.value,
                 ComponentType.LINE.value,
             ],
+            "substation": ["SUB_1", "SUB_1", "SUB_2"],
             "voltage_kv": [110.0, 110.0, 220.0],
             "capacity_mva": [63.0, 63.0, None],
             "length_km": [None, None, 42.5],
@@ -48,7 +55,7 @@ def test_transform_to_kpis_logic():
     assert trans_cap == TransformerCapacity(voltage_kv=110.0, total_capacity_mva=63.0)
 
     # KPI 4: Daily Averages
-    # NOTE: sorted by day and component type
+    # NOTE: sorted by day, component type and measurement type
     daily_avg_truth = [
         DailyAverage(
             day="2026-01-01",
@@ -63,4 +70,34 @@ def test_transform_to_kpis_logic():
             avg_value=15.0,
         ),
     ]
-    assert daily_avg_truth == report.daily_averages
+    percentiles = {"p5", "p50", "p95"}
+    assert [a.model_dump(exclude=percentiles) for a in daily_avg_truth] == [
+        a.model_dump(exclude=percentiles) for a in report.daily_averages
+    ]
+    assert report.daily_averages[0].p50 == pytest.approx(100.0, rel=0.01)
+
+    # KPI 5: Substation averages
+    assert report.substation_averages == [
+        SubstationAverage(
+            substation="SUB_1",
+            measurement_type="voltage",
+            component_count=1,
+            avg_value=15.0,
+        ),
+        SubstationAverage(
+            substation="SUB_2",
+            measurement_type="current",
+            component_count=1,
+            avg_value=100.0,
+        ),
+    ]
+
+    # KPI 6: Percentiles over the period, within the stated relative accuracy
+    quantiles = {
+        (q.measurement_type, q.component_type): q for q in report.value_quantiles
+    }
+    voltage = quantiles[("voltage", ComponentType.TRANSFORMER.value)]
+    assert voltage.count == 2
+    # NOTE: lower quantiles, below the maximum those of 2 readings are the first
+    for value in (voltage.p5, voltage.p50, voltage.p95):
+        assert value == pytest.approx(10.0, rel=report.quantile_accuracy)
@@ -0,0 +1,46 @@
+import time
+
+import anyio
+import anyio.to_thread
+import pytest
+
+from core.profiling import StackSampler, sampled_thread
+
+
+def busy_first(duration_s: float):
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+def busy_second(duration_s: float):
+    deadline = time.perf_counter() + duration_s
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+
+
+@pytest.mark.anyio
+async def test_sampler_keeps_the_threads_of_its_calls():
+    samplers = {}
+
+    async def profiled(func):
+        with StackSampler(0.002) as sampler:
+            await anyio.to_thread.run_sync(sampled_thread(func), 0.2)
+        samplers[func.__name__] = sampler
+
+    # Concurrent calls, each in a worker thread of its own
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(profiled, busy_first)
+        tg.start_soon(profiled, busy_second)
+
+    first = samplers["busy_first"].collapsed()
+    second = samplers["busy_second"].collapsed()
+    assert "busy_first" in first and "busy_second" not in first
+    assert "busy_second" in second and "busy_first" not in second
+
+
+@pytest.mark.anyio
+async def test_sampler_skips_the_unregistered_threads():
+    with StackSampler(0.002) as sampler:
+        await anyio.to_thread.run_sync(busy_first, 0.1)
+    assert "busy_first" not in sampler.collapsed()
@@ -0,0 +1,91 @@
+from datetime import UTC, date, datetime
+
+import polars as pl
+import pytest
+from pydantic import BaseModel, TypeAdapter
+
+from core.models import ReportGranularity
+from core.serialization import frame_json, model_json
+
+
+class Row(BaseModel):
+    day: date
+    at: datetime
+    granularity: ReportGranularity
+    name: str
+    count: int
+    value: float
+    low: float | None = None
+    flag: bool = False
+
+
+FRAME = pl.DataFrame(
+    {
+        "day": [datetime(2026, 1, 1, tzinfo=UTC), datetime(2026, 1, 2, tzinfo=UTC)],
+        "at": [
+            datetime(2026, 1, 1, tzinfo=UTC),
+            datetime(2026, 1, 1, 0, 0, 0, 500, tzinfo=UTC),
+        ],
+        "granularity": ["15m", "1w"],
+        "name": ['é "quoted"\n', "SUB_1"],
+        # NOTE: integers of a float field, e.g. an all-null column typed by ADBC
+        "count": pl.Series([3, 4], dtype=pl.UInt32),
+        "value": pl.Series([63, 1], dtype=pl.Int64),
+        "low": [None, 1e-7],
+    }
+)
+
+
+def test_frame_json_matches_pydantic():
+    expected = TypeAdapter(list[Row]).dump_json(
+        [Row.model_validate(row) for row in FRAME.to_dicts()]
+    )
+    assert frame_json(FRAME, Row) == expected.decode()
+    assert frame_json(FRAME.clear(), Row) == "[]"
+
+
+def test_frame_json_matches_pydantic_extreme_floats():
+    values = [
+        1e16,
+        -1.5e16,
+        1.2345678901234568e17,
+        1e20,
+        1.7976931348623157e308,
+        9999999999999998.0,
+        5e-324,
+        -2.2250738585072014e-308,
+        2.5e-10,
+        float("inf"),
+    ]
+    frame = FRAME.head(1).select(pl.exclude("value", "low", "name"))
+    frame = frame.select(pl.all().repeat_by(len(values)).explode()).with_columns(
+        value=pl.Series(values),
+        low=pl.Series(values[::-1]),
+        # NOTE: a number within a string is left as is
+        name=pl.lit('"value":1e+20'),
+    )
+    expected = TypeAdapter(list[Row]).dump_json(
+        [Row.model_validate(row) for row in frame.to_dicts()]
+    )
+    assert frame_json(frame, Row) == expected.decode()
+
+
+def test_frame_json_validates_the_columns():
+    with pytest.raises(ValueError, match="count"):
+        frame_json(FRAME.drop("count"), Row)
+    with pytest.raises(ValueError, match="value"):
+        frame_json(FRAME.with_columns(value=pl.lit(None, pl.Float64)), Row)
+    with pytest.raises(pl.exceptions.InvalidOperationError):
+        frame_json(FRAME.with_columns(granularity=pl.lit("2h")), Row)
+
+
+def test_model_json_needs_every_field():
+    class Pair(BaseModel):
+        a: int
+        b: list[int]
+
+    assert (
+        model_json(Pair, {"b": "[1]", "a": "1"}) == Pair(a=1, b=[1]).model_dump_json()
+    )
+    with pytest.raises(ValueError, match="Pair"):
+        model_json(Pair, {"a": "1"})
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from db.chunks import decode_timestamps, decode_values, encode_timestamps, encode_values
+
+
+@pytest.mark.parametrize("n", [1, 2, 3, 1440])
+def test_codec_round_trip(n):
+    rng = np.random.default_rng(n)
+    # Regular sampling with some jitter and gaps
+    t = 1_767_225_600_000_000 + np.cumsum(
+        rng.choice([15_000_000, 15_000_000, 14_999_999, 60_000_000], n)
+    )
+    v = np.round(rng.normal(230, 5, n), 3)
+    # NOTE: special values must survive bit-exact
+    v[0] = np.nan
+    v[-1] = -0.0
+
+    assert np.array_equal(decode_timestamps(encode_timestamps(t)), t)
+    assert np.array_equal(
+        decode_values(encode_values(v)).view(np.uint64), v.view(np.uint64)
+    )
+
+
+def test_regular_series_compresses():
+    n = 1440
+    t = 1_767_225_600_000_000 + np.arange(n, dtype=np.int64) * 15_000_000
+    v = np.full(n, 230.0)
+    assert len(encode_timestamps(t)) + len(encode_values(v)) < n
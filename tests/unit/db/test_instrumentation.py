@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from db.config import settings
+from db.instrumentation import (
+    instrument_engine,
+    query_stats,
+    read_database_adbc,
+    statement_shape,
+)
+
+
+def test_statement_shape_strips_literals():
+    shape = statement_shape(
+        "SELECT * FROM measurements\n  WHERE timestamp BETWEEN '2026-01-01' AND '2026-01-02'"
+        " AND component_id IN (?, ?, ?) LIMIT 10"
+    )
+    assert shape == (
+        "SELECT * FROM measurements WHERE timestamp BETWEEN ? AND ?"
+        " AND component_id IN (?, ...) LIMIT ?"
+    )
+
+
+def test_slow_query_is_explained(monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SLOW_QUERY_MS", 0.0)
+    query_stats.reset()
+    engine = instrument_engine(create_engine("sqlite://"))
+
+    with engine.connect() as conn, caplog.at_level("DEBUG", logger="sql.py"):
+        conn.execute(
+            text("CREATE TABLE components (id INTEGER PRIMARY KEY, name TEXT)")
+        )
+        conn.execute(
+            text("SELECT id FROM components WHERE name LIKE :name"), {"name": "%TR%"}
+        )
+
+    slow = query_stats.slow_queries[-1]
+    assert slow.parameters == ("%TR%",)
+    assert any(line.startswith("SCAN") for line in slow.plan)
+    # The bound parameters are user data, only logged at the DEBUG level
+    assert not any(
+        "%TR%" in r.message for r in caplog.records if r.levelname != "DEBUG"
+    )
+    assert any("%TR%" in r.message for r in caplog.records if r.levelname == "DEBUG")
+
+    stats = query_stats.snapshot()
+    assert stats["SELECT id FROM components WHERE name LIKE ?"].count == 1
+    engine.dispose()
+
+
+def test_adbc_reads_wait_for_the_write_transactions(tmp_path):
+    engine = instrument_engine(create_engine(f"sqlite:///{tmp_path / 'test.db'}"))
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+
+    read = threading.Event()
+
+    def read_table():
+        read_database_adbc("SELECT x FROM t", engine)
+        read.set()
+
+    reader = threading.Thread(target=read_table)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+        # An ADBC connection would take the journal of the transaction for a hot one
+        with pytest.raises(RuntimeError):
+            read_database_adbc("SELECT x FROM t", engine)
+        reader.start()
+        assert not read.wait(0.2)
+    # Until the connection is back in the pool, the transaction over
+    reader.join(5)
+    assert read.is_set()
+    assert read_database_adbc("SELECT x FROM t", engine)["x"].to_list() == [1]
+    engine.dispose()
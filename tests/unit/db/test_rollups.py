@@ -0,0 +1,133 @@
+import subprocess
+import sys
+from datetime import UTC, datetime, timedelta
+
+import polars as pl
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import Session, SQLModel, col, func, select
+
+from db.config import TimestampStorage, settings
+from db.models import ComponentDB, MeasurementDB, MeasurementRollupDB
+from db import rollups
+from db.rollups import compact, read_rollups
+from db.sketches import bin_value, decode_sketch
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+# 3 hours of readings every 15 minutes, valued by their index
+READINGS = 12
+
+
+@pytest.fixture(name="engine", params=list(TimestampStorage))
+def engine_fixture(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TIMESTAMP_STORAGE", request.param)
+    monkeypatch.setattr(settings, "ROLLUP_SECONDS", 3600)
+    engine = create_engine(f"sqlite:///{tmp_path / 'rollups.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            ComponentDB(
+                id=1, name="SW", substation="S", component_type="SWITCH", status="OPEN"
+            )
+        )
+        session.add_all(
+            MeasurementDB(
+                component_id=1,
+                timestamp=START + i * timedelta(minutes=15),
+                value=float(i),
+                measurement_type="POWER",
+            )
+            for i in range(READINGS)
+        )
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def count_rows(engine) -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count(col(MeasurementDB.id)))).one()
+
+
+def test_compact(engine):
+    # Rounded down to the hour: the first two hours are compacted
+    cutoff = START + timedelta(hours=2, minutes=20)
+    assert compact(engine, cutoff) == 8
+    assert count_rows(engine) == READINGS - 8
+
+    with Session(engine) as session:
+        rollups = session.exec(
+            select(MeasurementRollupDB).order_by(col(MeasurementRollupDB.bucket_start))
+        ).all()
+    assert [
+        (r.bucket_start, r.value_sum, r.value_count, r.value_min, r.value_max)
+        for r in rollups
+    ] == [
+        (START, 0.0 + 1 + 2 + 3, 4, 0.0, 3.0),
+        (START + timedelta(hours=1), 4.0 + 5 + 6 + 7, 4, 4.0, 7.0),
+    ]
+
+    # Nothing left to compact, then a late reading merges into its rollup
+    assert compact(engine, cutoff) == 0
+    with Session(engine) as session:
+        session.add(
+            MeasurementDB(
+                component_id=1,
+                timestamp=START + timedelta(minutes=50),
+                value=10.0,
+                measurement_type="POWER",
+            )
+        )
+        session.commit()
+    assert compact(engine, cutoff) == 1
+    df = read_rollups(engine, START + timedelta(minutes=30), START + timedelta(hours=1))
+    assert df.drop("sketch").rows() == [
+        (1, "POWER", START, 16.0 / 5, 5),
+        (1, "POWER", START + timedelta(hours=1), 22.0 / 4, 4),
+    ]
+
+    # The sketch of the first hour counts the late reading too
+    bins, counts = decode_sketch(df["sketch"][0])
+    assert counts.sum() == 5
+    values = pl.select(bin_value(pl.lit(pl.Series(bins)))).to_series()
+    assert values.to_list() == pytest.approx([0.0, 1.0, 2.0, 3.0, 10.0], rel=0.01)
+
+
+def test_compact_keeps_the_write_lock(engine, monkeypatch):
+    slice_sketches = rollups._slice_sketches
+    locked = []
+
+    def check_lock(conn, *args, **kwargs):
+        sketches = slice_sketches(conn, *args, **kwargs)
+        # Another process cannot write between the read and the rollup
+        writer = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sqlite3, sys;"
+                "sqlite3.connect(sys.argv[1], timeout=0).execute('BEGIN IMMEDIATE')",
+                engine.url.database,
+            ],
+            capture_output=True,
+        )
+        locked.append(b"database is locked" in writer.stderr)
+        return sketches
+
+    monkeypatch.setattr(rollups, "_slice_sketches", check_lock)
+    assert compact(engine, START + timedelta(hours=2)) == 8
+    assert locked == [True]
+
+
+def test_incremental_vacuum(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vacuum.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("PRAGMA auto_vacuum = INCREMENTAL"))
+        conn.execute(text("CREATE TABLE blobs (data BLOB)"))
+        conn.execute(text("INSERT INTO blobs VALUES (zeroblob(1000000))"))
+        conn.execute(text("DELETE FROM blobs"))
+        assert conn.execute(text("PRAGMA freelist_count")).scalar_one() > 100
+
+    assert rollups.incremental_vacuum(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA freelist_count")).scalar() == 0
+    engine.dispose()
@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlmodel import SQLModel
+
+from db.models import ReportDB, table_of
+from db.schema import (
+    SCHEMA_VERSION,
+    _add_missing_columns,
+    create_schema,
+    schema_version,
+    upgrade_schema,
+)
+
+
+def test_add_missing_columns():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # Reports table as created before the resource accounting
+        conn.execute(
+            text(
+                "CREATE TABLE reports (id INTEGER PRIMARY KEY, created_at DATETIME,"
+                " start_date DATETIME, end_date DATETIME, status VARCHAR,"
+                " result_json VARCHAR, error_message VARCHAR)"
+            )
+        )
+        conn.execute(text("INSERT INTO reports (status) VALUES ('completed')"))
+        _add_missing_columns(conn, table_of(ReportDB))
+        # Idempotent
+        _add_missing_columns(conn, table_of(ReportDB))
+
+    columns = {column["name"] for column in inspect(engine).get_columns("reports")}
+    assert columns == set(table_of(ReportDB).columns.keys())
+    with engine.connect() as conn:
+        row = conn.execute(text("SELECT status, rows_extracted FROM reports")).one()
+    assert tuple(row) == ("completed", None)
+
+
+def test_unversioned_database_is_upgraded_explicitly(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE reports (id INTEGER PRIMARY KEY, created_at DATETIME,"
+                " start_date DATETIME, end_date DATETIME, status VARCHAR,"
+                " result_json VARCHAR, error_message VARCHAR)"
+            )
+        )
+    tables = SQLModel.metadata.sorted_tables
+
+    # The startup refuses it, and leaves it untouched
+    with pytest.raises(RuntimeError, match="db.migrations upgrade"):
+        create_schema(engine, tables)
+    assert inspect(engine).get_table_names() == ["reports"]
+
+    assert upgrade_schema(engine, tables) == SCHEMA_VERSION
+    assert upgrade_schema(engine, tables) == 0
+    with engine.connect() as conn:
+        assert schema_version(conn) == SCHEMA_VERSION
+    assert set(inspect(engine).get_table_names()) == {table.name for table in tables}
+    create_schema(engine, tables)
+    engine.dispose()
+
+
+def test_new_database_is_created_at_the_current_version():
+    engine = create_engine("sqlite://")
+    create_schema(engine, SQLModel.metadata.sorted_tables)
+    with engine.connect() as conn:
+        assert schema_version(conn) == SCHEMA_VERSION
+    # Existing and up to date, nothing to do
+    create_schema(engine, SQLModel.metadata.sorted_tables)
+    assert upgrade_schema(engine, SQLModel.metadata.sorted_tables) == 0
+
+
+def test_upgrade_applies_the_pending_steps_only():
+    engine = create_engine("sqlite://")
+    tables = SQLModel.metadata.sorted_tables
+    create_schema(engine, tables)
+    with engine.begin() as conn:
+        # A database at version 1, before the batches of reports
+        conn.execute(text("ALTER TABLE reports DROP COLUMN batch_id"))
+        conn.execute(text("PRAGMA user_version = 1"))
+
+    assert upgrade_schema(engine, tables) == SCHEMA_VERSION - 1
+    columns = {column["name"] for column in inspect(engine).get_columns("reports")}
+    assert "batch_id" in columns
@@ -0,0 +1,118 @@
+from datetime import UTC, datetime, timedelta, timezone
+
+import polars as pl
+import pytest
+from sqlalchemy import create_engine, text
+from sqlmodel import Session, SQLModel, col, select
+
+from core.services.report import ReportService
+from db.config import MeasurementStorage, TimestampStorage, settings
+from db.instrumentation import read_database_adbc
+from db.migrations import migrate_timestamps, migrate_to_chunks
+from db.models import ComponentDB, MeasurementDB
+from db.rollups import compact
+from db.timestamps import parse_timestamp, sql_timestamp
+
+TIMESTAMPS = [
+    datetime(2026, 1, 1, 10, 0, 0, 123456, tzinfo=UTC),
+    datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone(timedelta(hours=1))),
+]
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TIMESTAMP_STORAGE", TimestampStorage.TEXT)
+    engine = create_engine(f"sqlite:///{tmp_path / 'timestamps.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(
+            ComponentDB(
+                id=1, name="SW", substation="S", component_type="SWITCH", status="OPEN"
+            )
+        )
+        session.add_all(
+            MeasurementDB(
+                component_id=1, timestamp=t, value=1.0, measurement_type="POWER"
+            )
+            for t in TIMESTAMPS
+        )
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def read_timestamps(engine) -> tuple[list, pl.Series]:
+    with Session(engine) as session:
+        orm = session.exec(
+            select(MeasurementDB.timestamp).order_by(col(MeasurementDB.id))
+        ).all()
+    df = read_database_adbc(
+        f"SELECT timestamp FROM measurements WHERE timestamp >= {sql_timestamp(TIMESTAMPS[0])}"
+        " ORDER BY id",
+        engine,
+    )
+    return list(orm), df.select(parse_timestamp())["timestamp"]
+
+
+def test_epoch_storage_round_trip(engine, monkeypatch):
+    orm, series = read_timestamps(engine)
+    assert orm == TIMESTAMPS
+    assert all(t.tzinfo == UTC for t in orm)
+    assert series.to_list() == TIMESTAMPS
+
+    assert migrate_timestamps(engine, TimestampStorage.EPOCH_US, batch_size=1) == 2
+    with engine.connect() as conn:
+        stored = conn.execute(
+            text("SELECT typeof(timestamp) FROM measurements")
+        ).scalars()
+        assert set(stored) == {"integer"}
+
+    # NOTE: the encoding is bound per engine, open a new one with the new setting
+    monkeypatch.setattr(settings, "TIMESTAMP_STORAGE", TimestampStorage.EPOCH_US)
+    epoch_engine = create_engine(engine.url)
+    orm, series = read_timestamps(epoch_engine)
+    assert orm == TIMESTAMPS
+    assert series.dtype == pl.Datetime("us", "UTC")
+    assert series.to_list() == TIMESTAMPS
+    epoch_engine.dispose()
+
+    # Already converted rows are left alone, and the conversion is reversible
+    assert migrate_timestamps(engine, TimestampStorage.EPOCH_US) == 0
+    assert migrate_timestamps(engine, TimestampStorage.TEXT) == 2
+    monkeypatch.setattr(settings, "TIMESTAMP_STORAGE", TimestampStorage.TEXT)
+    assert read_timestamps(create_engine(engine.url))[0] == TIMESTAMPS
+
+
+def test_migrate_chunks_and_rollups(session, monkeypatch):
+    engine = session.get_bind()
+    start = datetime(2026, 1, 1, tzinfo=UTC)
+    # The first hour rolled up, the rest in chunks
+    compact(engine, start + timedelta(hours=1), bucket_seconds=3600)
+    migrate_to_chunks(engine, delete_rows=True)
+    monkeypatch.setattr(settings, "MEASUREMENT_STORAGE", MeasurementStorage.CHUNKS)
+
+    def report(start: datetime, end: datetime) -> dict:
+        service = ReportService()
+        df = service._extract_data(start, end)
+        service.engine.dispose()
+        return service._transform_to_kpis(df.lazy()).model_dump()
+
+    windows = [
+        (start, start + timedelta(days=1)),
+        (start + timedelta(minutes=50), start + timedelta(minutes=70)),
+    ]
+    expected = [report(*window) for window in windows]
+
+    assert migrate_timestamps(engine, TimestampStorage.EPOCH_US) > 0
+    with engine.connect() as conn:
+        for table, column in [
+            ("measurement_chunks", "bucket_start"),
+            ("measurement_chunks", "first_timestamp"),
+            ("measurement_chunks", "last_timestamp"),
+            ("measurement_rollups", "bucket_start"),
+        ]:
+            stored = conn.execute(text(f"SELECT typeof({column}) FROM {table}"))
+            assert set(stored.scalars()) == {"integer"}
+
+    monkeypatch.setattr(settings, "TIMESTAMP_STORAGE", TimestampStorage.EPOCH_US)
+    assert [report(*window) for window in windows] == expected